@@ -0,0 +1,146 @@
+import heapq
+import time
+import solvers
+
+# Anytime Repairing A* (ARA*, Likhachev et al.): a weighted A* ordered by
+# gn + weight * hn finds a first solution fast, then the search is repeated with
+# lower weights down to 1, reusing its work instead of starting over:
+#   - the open list is kept and only re-sorted for the new weight;
+#   - a state reached with a lower gn after being expanded in the current
+#     iteration is not reopened at once but put in the INCONS list, which joins
+#     the open list at the next iteration.
+# An iteration stops when the incumbent (best solution so far) costs at most the
+# lowest weighted priority of the open list. The incumbent then costs at most
+# `bound` times the optimal cost, with
+#   bound = min(weight, incumbent cost / lowest gn + hn of the open and INCONS states)
+# (the heuristic is admissible, so every cheaper solution passes through one of
+# them; the weight only bounds the cost for a consistent heuristic and after a
+# complete iteration). States with gn + hn >= incumbent cost are never pushed.
+# The search ends when bound reaches 1 (the incumbent is optimal) or when the
+# deadline passes.
+INITIAL_WEIGHT = 3.0
+WEIGHT_STEP = 0.5
+DEADLINE_CHECK = 64   # expansions between two checks of the deadline
+
+# Lowest gn + hn of a collection of states (inf when empty)
+def _lowest_f(states):
+    return min((state.gn + state.hn for state in states), default=float('inf'))
+
+# ARA* solver (bitboard backend)
+#   heuristic: see HEURISTICS; moves, slide_cost: action model, see create_initial_state
+#   deadline: seconds after which the best solution so far is returned (None: run
+#   until the solution is optimal)
+#   on_solution: called as on_solution(result, bound) after every iteration that
+#   has a solution, with the SearchResult so far (result.stats is the live
+#   statistics of the search) and the suboptimality bound of its cost
+#   initial_weight, weight_step: weight schedule (initial_weight, then lowered by
+#   weight_step per iteration down to 1)
+# The returned result also has result.bound (1 when the solution is optimal,
+# inf when none was found before the deadline). Statistics (metrics, see
+# METRICS): phases are not timed; reopened counts the states put in INCONS.
+def ara_star_solver(game_map, heuristic='blocking', moves='step', slide_cost='length', deadline=None,
+                    on_solution=None, initial_weight=INITIAL_WEIGHT, weight_step=WEIGHT_STEP,
+                    metrics='counters', progress=None):
+    if initial_weight < 1 or weight_step <= 0:
+        raise ValueError("ARA* needs initial_weight >= 1 and weight_step > 0")
+    stats = solvers.SearchStats(metrics, progress)
+    stats.start()
+    reporting = stats.reporting
+    end_time = time.perf_counter() + deadline if deadline is not None else None
+
+    goal_pos = solvers.get_puzzle_spec(game_map).goal_position
+    initial_state, generate_children = solvers.create_initial_state(game_map, 'bitboard', moves, slide_cost)
+    priority = solvers.make_a_star_priority(game_map, heuristic, moves, slide_cost)
+    # the blocker graph bound is not always consistent (see A_star_solver)
+    consistent = heuristic not in ('blockers', 'max')
+    priority(initial_state, goal_pos)
+
+    best = {initial_state: initial_state}   # (key: state, value: the same state with its lowest gn)
+    closed = set()
+    incons = set()
+    heap = []
+    counter = 0
+    incumbent = initial_state if initial_state.is_goal(goal_pos) else None
+    incumbent_cost = incumbent.gn if incumbent is not None else float('inf')
+    weight = float(initial_weight)
+    if incumbent is None:
+        heap.append((weight * initial_state.hn, counter, initial_state))
+
+    def path_to(state):
+        solution_steps = []
+        while state:
+            solution_steps.append(state)
+            state = state.parent
+        solution_steps.reverse()
+        return solution_steps
+
+    bound = float('inf')
+    while True:
+        # improve the incumbent with the current weight
+        timed_out = False
+        while heap and heap[0][0] < incumbent_cost:
+            entry = heapq.heappop(heap)
+            state = entry[2]
+            if best[state] is not state or state in closed:
+                continue
+            if end_time is not None and not (stats.expanded + 1) % DEADLINE_CHECK and time.perf_counter() >= end_time:
+                # not expanded: back in the open list, so the bound below accounts for it
+                heapq.heappush(heap, entry)
+                timed_out = True
+                break
+            closed.add(state)
+            stats.expanded += 1
+            if reporting and not stats.expanded % solvers.REPORT_INTERVAL:
+                stats.report(len(heap))
+            for child in generate_children(state):
+                stats.generated += 1
+                known = best.get(child)
+                if known is not None and known.gn <= child.gn:
+                    stats.duplicates += 1
+                    continue
+                priority(child, goal_pos)
+                if child.gn + child.hn >= incumbent_cost:
+                    continue
+                best[child] = child
+                if child.is_goal(goal_pos):
+                    incumbent, incumbent_cost = child, child.gn
+                elif child in closed:
+                    incons.add(child)
+                    stats.reopened += 1
+                else:
+                    counter += 1
+                    heapq.heappush(heap, (child.gn + weight * child.hn, counter, child))
+            if len(heap) > stats.peak_frontier:
+                stats.peak_frontier = len(heap)
+
+        # states left to expand: the open list (without stale entries) and INCONS
+        open_states = {state for _, _, state in heap if best[state] is state and state not in closed}
+        pending = open_states | {best[state] for state in incons}
+        if incumbent is not None:
+            lowest = _lowest_f(pending)
+            if lowest >= incumbent_cost:
+                bound = 1.0
+            else:
+                bound = incumbent_cost / lowest if lowest > 0 else float('inf')
+                if consistent and not timed_out:
+                    bound = min(bound, weight)
+            if on_solution is not None:
+                on_solution(stats.result(path_to(incumbent)), bound)
+        if bound <= 1 or timed_out or not pending:
+            break
+
+        # next iteration: lower weight, INCONS joins the open list, nothing is closed
+        weight = max(1.0, weight - weight_step)
+        heap = []
+        for state in pending:
+            counter += 1
+            heap.append((state.gn + weight * state.hn, counter, state))
+        heapq.heapify(heap)
+        incons.clear()
+        closed.clear()
+
+    stats.closed_size = len(best)
+    stats.stop()
+    result = stats.result(path_to(incumbent) if incumbent is not None else [])
+    result.bound = bound if incumbent is not None else float('inf')
+    return result
@@ -0,0 +1,118 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
+import json
+import math
+import os
+import sys
+import time
+import solvers
+
+# Headless batch solver: runs a set of algorithms over every map of one or more
+# corpus files (same JSON format as Map/maps.txt) in a process pool, and streams
+# one JSON line or CSV row per (map, algorithm). Does not import pygame (psutil
+# only with --metrics rss). Records have a peak memory by default (--metrics
+# tracemalloc); --metrics counters or off trade it for faster searches.
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Map", "maps.txt")
+DEFAULT_ALGORITHMS = ["BFS", "DFS", "UCS", "A*"]
+# bound: suboptimality bound of the cost ('ARA*' only, see anytime.ara_star_solver)
+FIELDS = ["map", "algorithm", "solved", "path_length", "cost", "bound", "expanded_nodes",
+          "wall_time", "search_time", "peak_memory", "error"]
+# counters of solvers.SearchStats added to every record
+STATS_FIELDS = ["generated", "duplicates", "reopened", "pruned", "peak_frontier", "closed_size"] + \
+               ["time_" + phase for phase in solvers.PHASES]
+
+def load_corpus(paths):
+    """Read every (name, map) pair of the given corpus files."""
+    corpus = []
+    for path in paths:
+        with open(path, 'r', encoding="utf-8") as file:
+            data = json.load(file)
+        for index, map_item in enumerate(data):
+            corpus.append((map_item.get("name", f"{os.path.basename(path)}#{index}"), map_item["data"]))
+    return corpus
+
+def solve_record(map_name, game_map, algorithm, options):
+    """Solve one map with one algorithm and return its record (runs in a worker process)."""
+    record = dict.fromkeys(FIELDS + STATS_FIELDS)
+    record.update({"map": map_name, "algorithm": algorithm, "solved": False})
+    start_time = time.perf_counter()
+    try:
+        # every record is a real search: 'PORTFOLIO' workers do not answer from the solution cache
+        result = solvers.solve(game_map, algorithm, use_cache=False, **options)
+        if result is None:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        solution_steps, expanded_nodes, search_time, peak_memory = result
+        record.update({
+            "solved": bool(solution_steps),
+            "path_length": len(solution_steps) - 1 if solution_steps else None,
+            "cost": solution_steps[-1].gn if solution_steps else None,
+            "expanded_nodes": expanded_nodes,
+            "search_time": search_time,
+            "peak_memory": peak_memory,
+        })
+        bound = getattr(result, "bound", None)
+        if bound is not None and math.isfinite(bound):
+            record["bound"] = bound
+        stats = result.stats.as_dict()
+        record.update({field: stats[field] for field in STATS_FIELDS})
+    except Exception as error:
+        record["error"] = f"{type(error).__name__}: {error}"
+    record["wall_time"] = time.perf_counter() - start_time
+    return record
+
+def run_batch(corpus, algorithms, options=None, workers=None):
+    """Yield the records of every (map, algorithm) as soon as they are done."""
+    options = options or {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(solve_record, map_name, game_map, algorithm, options)
+                   for map_name, game_map in corpus for algorithm in algorithms]
+        for future in as_completed(futures):
+            yield future.result()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve every map of a corpus with several algorithms, without the GUI.")
+    parser.add_argument("corpus", nargs="*", default=[DEFAULT_CORPUS], help="corpus files (default: Map/maps.txt)")
+    parser.add_argument("-a", "--algorithms", default=",".join(DEFAULT_ALGORITHMS),
+                        help="comma-separated algorithms of solvers.solve (default: %(default)s)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("-f", "--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--backend", default="bitboard")
+    parser.add_argument("--moves", choices=["step", "slide"], default="step")
+    parser.add_argument("--slide-cost", choices=["length", "unit"], default="length")
+    parser.add_argument("--heuristic", choices=solvers.HEURISTICS, default="blocking")
+    parser.add_argument("--metrics", choices=solvers.METRICS, default="tracemalloc",
+                        help="instrumentation mode, 'rss' needs psutil (default: %(default)s)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes of one HDA* search (default: CPU count)")
+    parser.add_argument("--pruning", choices=solvers.PRUNINGS, default="none",
+                        help="partial-order pruning of BFS, UCS and A* (default: %(default)s)")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="seconds after which ARA* returns its best solution so far (default: none)")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    algorithms = [algorithm.strip() for algorithm in args.algorithms.split(",") if algorithm.strip()]
+    options = {"backend": args.backend, "moves": args.moves, "slide_cost": args.slide_cost,
+               "heuristic": args.heuristic, "metrics": args.metrics, "processes": args.processes,
+               "pruning": args.pruning, "deadline": args.deadline}
+
+    output = open(args.output, 'w', newline='', encoding="utf-8") if args.output else sys.stdout
+    try:
+        writer = None
+        if args.format == "csv":
+            writer = csv.DictWriter(output, fieldnames=FIELDS + STATS_FIELDS)
+            writer.writeheader()
+        for record in run_batch(corpus, algorithms, options, args.workers):
+            if writer:
+                writer.writerow(record)
+            else:
+                output.write(json.dumps(record) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == '__main__':
+    main()
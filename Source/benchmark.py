@@ -0,0 +1,294 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from batch import DEFAULT_CORPUS, load_corpus
+from portfolio import optimal_algorithms
+import solvers
+
+# Benchmark and regression suite: runs algorithms of solvers.solve over one or
+# more corpus files (Map/maps.txt by default), repeats every (map, algorithm)
+# case for several trials, compares the results with a stored baseline, and
+# checks that algorithms with the same optimality guarantee agree.
+# Every case runs in a fresh worker process (spawn), so cases do not share
+# memory or caches and a case over the timeout is killed: a first trial with the
+# memory metrics mode gives the peak memory (see solvers.METRICS), then the
+# timed trials run with metrics='off' and are measured with time.perf_counter.
+# The solution cache is not used, not even by the workers of 'PORTFOLIO'
+# (use_cache=False).
+# Comparison with the baseline (same solver options only):
+#   - wall time: regression or improvement when the medians differ by more than
+#     MIN_EFFECT and a one-sided Welch t-test gives p < ALPHA, both on the trial
+#     times and on the trial times in units of a fixed calibration workload run
+#     before each trial (so a shared machine running slower than when the
+#     baseline was recorded is not taken for a regression)
+#   - peak memory: regression when it grows by more than MIN_EFFECT plus MEMORY_FLOOR
+#   - cost, solved: any change is an error; expanded nodes: any change is
+#     reported (except for 'HDA*' and 'PORTFOLIO', whose counters vary from run to run)
+# Agreement: cost-optimal algorithms (portfolio.optimal_algorithms, plus HDA*
+# and PORTFOLIO) must find the same cost, and the move-optimal ones (BFS,
+# BI-BFS) the same number of moves. BFS is only cost-optimal when every slide
+# costs 1 (moves='slide', slide_cost='unit').
+# The exit status is 1 when a regression, an error or a disagreement is found.
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Benchmark", "baseline.json")
+BASELINE_VERSION = 1
+# IDA* is not in the default set: it times out on Map 4 and Map 9 (-a IDA* to run it)
+DEFAULT_ALGORITHMS = ["BFS", "DFS", "UCS", "A*", "BI-BFS", "BI-UCS", "HDA*", "PORTFOLIO"]
+MOVE_OPTIMAL = {"BFS", "BI-BFS"}
+NONDETERMINISTIC = {"HDA*", "PORTFOLIO"}
+TRIALS = 5
+TIMEOUT = 120.0
+ALPHA = 0.01
+MIN_EFFECT = 0.10
+CALIBRATION_ROUNDS = 100000
+# memory growth always ignored (RSS samples are not exact)
+MEMORY_FLOOR = 1 << 20
+
+def calibration_time():
+    """Time of a fixed pure Python workload (hashing, dict and integer operations,
+    none of the solvers' code) measuring the current speed of the machine."""
+    start_time = time.perf_counter()
+    table = {}
+    value = 1
+    for _ in range(CALIBRATION_ROUNDS):
+        value = (value * 1103515245 + 12345) & 0xFFFFFFFF
+        key = value.to_bytes(4, 'little')
+        table[key] = table.get(key, 0) + 1
+    return time.perf_counter() - start_time
+
+def _run_case(connection, game_map, algorithm, trials, memory, options):
+    """Entry point of the worker process of one case."""
+    try:
+        record = {}
+        if memory != 'off':
+            result = solvers.solve(game_map, algorithm, metrics=memory, use_cache=False, **options)
+            if result is None:
+                raise ValueError(f"Unknown algorithm: {algorithm}")
+            record["peak_memory"] = result.peak_memory
+        wall_times = []
+        calibration_times = []
+        for _ in range(trials):
+            calibration_times.append(calibration_time())
+            start_time = time.perf_counter()
+            result = solvers.solve(game_map, algorithm, metrics='off', use_cache=False, **options)
+            wall_times.append(time.perf_counter() - start_time)
+            if result is None:
+                raise ValueError(f"Unknown algorithm: {algorithm}")
+        solution_steps = result.solution_steps
+        median = statistics.median(wall_times)
+        record.update({
+            "solved": bool(solution_steps),
+            "path_length": len(solution_steps) - 1 if solution_steps else None,
+            "cost": solution_steps[-1].gn if solution_steps else None,
+            "expanded_nodes": result.expanded_nodes,
+            "wall_times": wall_times,
+            "calibration_times": calibration_times,
+            # trial times in units of the calibration workload run just before
+            "relative_times": [wall_time / calibration for wall_time, calibration in zip(wall_times, calibration_times)],
+            "wall_time": median,
+            "stdev": statistics.stdev(wall_times) if trials > 1 else 0.0,
+            "nodes_per_sec": result.expanded_nodes / median if median else None,
+        })
+        connection.send(record)
+    except Exception as error:
+        connection.send({"error": f"{type(error).__name__}: {error}"})
+    finally:
+        connection.close()
+
+def run_case(game_map, algorithm, trials=TRIALS, memory='rss', timeout=TIMEOUT, **options):
+    """Benchmark one (map, algorithm) in a fresh process and return its record."""
+    context = multiprocessing.get_context('spawn')
+    connection, child_connection = context.Pipe(duplex=False)
+    # not daemonic: 'HDA*' and 'PORTFOLIO' start processes of their own
+    process = context.Process(target=_run_case, args=(child_connection, game_map, algorithm, trials, memory, options))
+    process.start()
+    child_connection.close()
+    try:
+        if connection.poll(timeout):
+            return connection.recv()
+        return {"error": f"Timed out after {timeout} s", "timed_out": True}
+    except EOFError:
+        return {"error": "Benchmark process exited unexpectedly"}
+    finally:
+        process.kill()
+        process.join()
+        connection.close()
+
+def run_benchmark(corpus, algorithms, trials=TRIALS, memory='rss', timeout=TIMEOUT, options=None, report=None):
+    """Records of every case: {map name: {algorithm: record}}; report(map name, algorithm, record) is called after each case."""
+    results = {}
+    for map_name, game_map in corpus:
+        for algorithm in algorithms:
+            record = run_case(game_map, algorithm, trials, memory, timeout, **(options or {}))
+            results.setdefault(map_name, {})[algorithm] = record
+            if report is not None:
+                report(map_name, algorithm, record)
+    return results
+
+def _continued_fraction(a, b, x):
+    """Continued fraction of the incomplete beta function (modified Lentz)."""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    fraction = d
+    for m in range(1, 300):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            fraction *= c * d
+        if abs(c * d - 1) < 1e-12:
+            break
+    return fraction
+
+def regularized_beta(x, a, b):
+    """Regularized incomplete beta function I_x(a, b)."""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1 - x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _continued_fraction(a, b, x) / a
+    return 1 - front * _continued_fraction(b, a, 1 - x) / b
+
+def welch_test(sample, baseline):
+    """One-sided Welch t-test: p-value of "sample has a larger mean than baseline"."""
+    n1, n2 = len(sample), len(baseline)
+    mean1, mean2 = statistics.fmean(sample), statistics.fmean(baseline)
+    var1 = statistics.variance(sample) / n1 if n1 > 1 else 0.0
+    var2 = statistics.variance(baseline) / n2 if n2 > 1 else 0.0
+    if var1 + var2 == 0:
+        return 0.0 if mean1 > mean2 else 1.0
+    t = (mean1 - mean2) / math.sqrt(var1 + var2)
+    df = (var1 + var2) ** 2 / ((var1 ** 2 / (n1 - 1) if n1 > 1 else 0) + (var2 ** 2 / (n2 - 1) if n2 > 1 else 0))
+    # survival function of Student's t distribution
+    tail = 0.5 * regularized_beta(df / (df + t * t), df / 2, 0.5)
+    return tail if t > 0 else 1 - tail
+
+def compare(results, baseline, alpha=ALPHA, min_effect=MIN_EFFECT):
+    """Findings (severity, map, algorithm, message) of results against baseline results;
+    severity is 'error', 'regression', 'improvement' or 'note'."""
+    findings = []
+    for map_name, records in results.items():
+        for algorithm, record in records.items():
+            old = baseline.get(map_name, {}).get(algorithm)
+            if old is None:
+                findings.append(("note", map_name, algorithm, "not in the baseline"))
+                continue
+            if "error" in record or "error" in old:
+                if "error" in record and "error" not in old:
+                    findings.append(("error", map_name, algorithm, record["error"]))
+                elif "error" in old and "error" not in record:
+                    findings.append(("note", map_name, algorithm, f"failed in the baseline ({old['error']})"))
+                continue
+            for field in ("solved", "cost"):
+                if record[field] != old[field]:
+                    findings.append(("error", map_name, algorithm, f"{field} changed: {old[field]} -> {record[field]}"))
+            if algorithm not in NONDETERMINISTIC and record["expanded_nodes"] != old["expanded_nodes"]:
+                findings.append(("note", map_name, algorithm,
+                                 f"expanded nodes changed: {old['expanded_nodes']} -> {record['expanded_nodes']}"))
+            # raw trial times and times relative to the calibration workload must
+            # both change, so that a machine running faster or slower than when
+            # the baseline was recorded (or a noisy calibration) is not reported
+            samples = ((record["wall_times"], old["wall_times"]), (record["relative_times"], old["relative_times"]))
+            changes = [statistics.median(times) / statistics.median(old_times) - 1 for times, old_times in samples]
+            for severity, sign in (("regression", 1), ("improvement", -1)):
+                if all(sign * change > min_effect for change in changes):
+                    p_value = max(welch_test(times, old_times) if sign > 0 else welch_test(old_times, times)
+                                  for times, old_times in samples)
+                    if p_value < alpha:
+                        findings.append((severity, map_name, algorithm, f"wall time {changes[1]:+.1%} (p={p_value:.2g})"))
+            if record.get("peak_memory") and old.get("peak_memory") and \
+                    record["peak_memory"] > old["peak_memory"] * (1 + min_effect) + MEMORY_FLOOR:
+                findings.append(("regression", map_name, algorithm,
+                                 f"peak memory {record['peak_memory'] / old['peak_memory'] - 1:+.1%}"))
+    return findings
+
+def check_agreement(results, moves='step', slide_cost='length'):
+    """Findings of the maps where algorithms with the same guarantee disagree."""
+    findings = []
+    # 'PORTFOLIO' uses guarantee='optimal' here
+    cost_optimal = optimal_algorithms(moves, slide_cost) | {"HDA*", "PORTFOLIO"}
+    for map_name, records in results.items():
+        for group, field in ((cost_optimal, "cost"), (MOVE_OPTIMAL, "path_length")):
+            values = {algorithm: record[field] for algorithm, record in records.items()
+                      if algorithm in group and "error" not in record}
+            if len(set(values.values())) > 1:
+                detail = ", ".join(f"{algorithm}: {value}" for algorithm, value in sorted(values.items()))
+                findings.append(("error", map_name, "*", f"optimal algorithms disagree on {field} ({detail})"))
+    return findings
+
+def format_record(map_name, algorithm, record):
+    if "error" in record:
+        return f"{map_name:<12} {algorithm:<10} {record['error']}"
+    memory = f"{record['peak_memory'] / 2 ** 20:8.1f} MB" if record.get("peak_memory") is not None else "       - MB"
+    rate = f"{record['nodes_per_sec']:>11,.0f}/s" if record["nodes_per_sec"] else "          -/s"
+    return (f"{map_name:<12} {algorithm:<10} {record['wall_time'] * 1000:10.1f} ms ±{record['stdev'] * 1000:7.1f}"
+            f" {record['expanded_nodes']:>10,} nodes {rate} {memory}  cost {record['cost']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the solvers and compare the results with a baseline.")
+    parser.add_argument("corpus", nargs="*", default=[DEFAULT_CORPUS], help="corpus files (default: Map/maps.txt)")
+    parser.add_argument("-a", "--algorithms", default=",".join(DEFAULT_ALGORITHMS),
+                        help="comma-separated algorithms of solvers.solve (default: %(default)s)")
+    parser.add_argument("-n", "--trials", type=int, default=TRIALS, help="timed trials per case (default: %(default)s)")
+    parser.add_argument("-t", "--timeout", type=float, default=TIMEOUT,
+                        help="seconds allowed per case, all trials included (default: %(default)s)")
+    parser.add_argument("--memory", choices=["rss", "tracemalloc", "off"], default="rss",
+                        help="metrics mode of the memory trial (default: %(default)s)")
+    parser.add_argument("--moves", choices=["step", "slide"], default="step")
+    parser.add_argument("--slide-cost", choices=["length", "unit"], default="length")
+    parser.add_argument("--heuristic", choices=solvers.HEURISTICS, default="blocking")
+    parser.add_argument("-b", "--baseline", default=BASELINE_PATH, help="baseline file (default: Benchmark/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("-o", "--output", help="also write the results to this file")
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="significance level (default: %(default)s)")
+    parser.add_argument("--min-effect", type=float, default=MIN_EFFECT,
+                        help="smallest relative change reported (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    algorithms = [algorithm.strip() for algorithm in args.algorithms.split(",") if algorithm.strip()]
+    options = {"moves": args.moves, "slide_cost": args.slide_cost, "heuristic": args.heuristic}
+    results = run_benchmark(corpus, algorithms, args.trials, args.memory, args.timeout, options,
+                            lambda map_name, algorithm, record: print(format_record(map_name, algorithm, record), flush=True))
+    document = {
+        "version": BASELINE_VERSION,
+        "solver_version": solvers.SOLVER_VERSION,
+        "options": options,
+        "trials": args.trials,
+        "memory": args.memory,
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+
+    findings = check_agreement(results, args.moves, args.slide_cost)
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("options") != options:
+            print(f"Baseline options {baseline.get('options')} differ, not compared", file=sys.stderr)
+        else:
+            if baseline.get("machine") != document["machine"]:
+                print("Baseline recorded on another machine, wall times may not be comparable", file=sys.stderr)
+            findings += compare(results, baseline["results"], args.alpha, args.min_effect)
+    for severity, map_name, algorithm, message in findings:
+        print(f"{severity.upper():<11} {map_name:<12} {algorithm:<10} {message}")
+
+    for path in filter(None, (args.output, args.baseline if args.save_baseline else None)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding="utf-8") as file:
+            json.dump(document, file, indent=1)
+            file.write("\n")
+    return 1 if any(severity in ("error", "regression") for severity, *_ in findings) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import solvers
+from solution import Solution
+
+# Solution cache: an in-memory LRU in front of a sqlite file. Entries are keyed
+# by a hash of the canonical map (see solvers.canonical_map), the algorithm, the
+# solver options and solvers.SOLVER_VERSION, and hold the compact move list (in
+# canonical ids) plus the result and statistics of the search that found it.
+# Rows of other solver versions are deleted when the file is opened.
+# metrics, progress, collect and processes only change the statistics, so they are
+# not part of the key: a cached solution keeps the statistics of the search that
+# produced it. Neither are deadline and on_solution ('ARA*'): a solution is only
+# stored once proven optimal (result.bound of 1), which no deadline changes.
+# Nor is use_cache ('PORTFOLIO' workers bypassing the cache).
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cache", "solutions.sqlite")
+MEMORY_ENTRIES = 256
+# solver options of solvers.solve with their defaults
+SOLVE_OPTIONS = {name: parameter.default for name, parameter in inspect.signature(solvers.solve).parameters.items()
+                 if name not in ("game_map", "algorithm", "metrics", "progress", "collect", "processes",
+                                 "deadline", "on_solution", "use_cache")}
+
+def cache_key(game_map, algorithm, options):
+    """Return (key, {canonical id: original id}) of a solve call."""
+    map_tuple, ids = solvers.canonical_map(game_map)
+    options = {**SOLVE_OPTIONS, **{name: value for name, value in options.items() if name in SOLVE_OPTIONS}}
+    payload = json.dumps([map_tuple, algorithm, sorted(options.items()), solvers.SOLVER_VERSION])
+    return hashlib.sha1(payload.encode()).hexdigest(), ids
+
+class SolutionCache:
+    """Two-level (memory, then sqlite) store of solve results, safe to share between threads."""
+
+    def __init__(self, path=CACHE_PATH, memory_entries=MEMORY_ENTRIES):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, version INTEGER, entry TEXT)")
+            self.connection.execute("DELETE FROM solutions WHERE version != ?", (solvers.SOLVER_VERSION,))
+
+    def get(self, key):
+        """Entry of a key, or None."""
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                return entry
+            row = self.connection.execute("SELECT entry FROM solutions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            entry = json.loads(row[0])
+            self._remember(key, entry)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self._remember(key, entry)
+            with self.connection:
+                self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)",
+                                        (key, solvers.SOLVER_VERSION, json.dumps(entry)))
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            with self.connection:
+                self.connection.execute("DELETE FROM solutions")
+
+    def close(self):
+        self.connection.close()
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+_default_cache = None
+
+def get_cache():
+    """Cache stored at CACHE_PATH, opened on first use."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SolutionCache()
+    return _default_cache
+
+def cached_result(game_map, algorithm='A*', cache=None, compact=False, **options):
+    """SearchResult of a known puzzle rebuilt from its cached moves, or None (no search is run).
+
+    compact: solution_steps is a solution.Solution instead of a list of State.
+    """
+    cache = cache or get_cache()
+    key, ids = cache_key(game_map, algorithm, options)
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    solution_steps = []
+    if entry["solved"]:
+        moves = [(ids[object_id], direction, distance) for object_id, direction, distance in entry["moves"]]
+        unit_cost = options.get("moves") == 'slide' and options.get("slide_cost") == 'unit'
+        solution_steps = Solution(game_map, moves, unit_cost) if compact else solvers.apply_moves(game_map, moves, unit_cost)
+    result = solvers.SearchResult(solution_steps, entry["expanded_nodes"], entry["search_time"], entry["peak_memory"])
+    result.stats = solvers.SearchStats.from_dict(entry["stats"])
+    result.cached = True
+    return result
+
+def cached_solve(game_map, algorithm='A*', cache=None, **options):
+    """solvers.solve through the cache: a known puzzle is rebuilt from its moves instead of searched.
+
+    Returns the same SearchResult as solvers.solve (None for an unknown algorithm);
+    result.cached tells whether it came from the cache.
+    """
+    cache = cache or get_cache()
+    result = cached_result(game_map, algorithm, cache, **options)
+    if result is not None:
+        return result
+    result = solvers.solve(game_map, algorithm, **options)
+    if result is None:
+        return None
+    result.cached = False
+    if getattr(result, 'bound', 1.0) > 1:
+        # anytime search stopped by its deadline: the solution may not be optimal
+        return result
+    key, ids = cache_key(game_map, algorithm, options)
+    renumber = {old_id: new_id for new_id, old_id in ids.items()}
+    cache.put(key, {
+        "solved": bool(result.solution_steps),
+        "moves": [[renumber[object_id], direction, distance]
+                  for object_id, direction, distance in solvers.extract_moves(result.solution_steps)],
+        "expanded_nodes": result.expanded_nodes,
+        "search_time": result.search_time,
+        "peak_memory": result.peak_memory,
+        "stats": result.stats.as_dict(),
+    })
+    return result
@@ -0,0 +1,146 @@
+import os
+import tempfile
+import solvers
+import vectorized
+from vectorized import np
+
+# External-memory BFS (backend='disk' of bfs_solver), after Korf's delayed
+# duplicate detection. Every depth layer is a file of sorted state keys (see
+# vectorized.LayerEncoding: packed offsets, or the row bytes when they do not fit
+# in 64 bits), read through np.memmap, so only a few blocks of keys are in memory
+# at a time:
+#   1. the layer is expanded CHUNK_SIZE states at a time, and the sorted, unique
+#      keys of the children of each chunk are written to a run file;
+#   2. the runs are merged BLOCK_SIZE keys at a time (every key up to the
+#      smallest last key of the loaded blocks is final), and each merged block is
+#      checked against the matching window of the current and previous layers
+#      (moves are reversible, so older layers cannot hold a child);
+#   3. the new keys are appended to the file of the next layer, in order.
+# No parent is stored: once a goal is found, the path is rebuilt backwards by
+# looking up, in each previous layer, a state that one move turns into the
+# current one.
+CHUNK_SIZE = 1 << 16   # states expanded at once
+BLOCK_SIZE = 1 << 16   # keys read at once from each run while merging
+
+def _load(path, dtype):
+    """Read-only memory map of a file of keys (an empty array for an empty file)."""
+    if not os.path.getsize(path):
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+def _window_contains(layer_keys, block):
+    """Whether each key of a sorted block is in a sorted layer, reading only the
+    slice of the layer that spans the block."""
+    start = np.searchsorted(layer_keys, block[0])
+    stop = np.searchsorted(layer_keys, block[-1], side='right')
+    return vectorized.sorted_contains(layer_keys[start:stop], block)
+
+def _merge_runs(runs, dtype):
+    """Merged, sorted and unique blocks of keys of sorted run files."""
+    runs = [run for run in runs if len(run)]
+    cursors = [0] * len(runs)
+    while runs:
+        blocks = [run[cursor:cursor + BLOCK_SIZE] for run, cursor in zip(runs, cursors)]
+        # a run whose block does not reach its end bounds the keys that are final
+        bounds = [block[-1] for run, cursor, block in zip(runs, cursors, blocks) if cursor + len(block) < len(run)]
+        bound = np.sort(np.array(bounds, dtype=dtype))[0] if bounds else None
+        parts = []
+        for index, block in enumerate(blocks):
+            count = np.searchsorted(block, bound, side='right') if bounds else len(block)
+            parts.append(block[:count])
+            cursors[index] += count
+        yield np.unique(np.concatenate(parts))
+        active = [index for index, run in enumerate(runs) if cursors[index] < len(run)]
+        runs = [runs[index] for index in active]
+        cursors = [cursors[index] for index in active]
+
+# External-memory BFS solver (same result as bfs_solver: fewest moves)
+# moves, slide_cost: action model, see create_initial_state
+# directory: where the layer files are written (default: the system temporary
+# directory); they are removed when the search ends
+# Statistics (metrics, see METRICS): as layer_bfs_solver; peak_memory only
+# covers what is in memory, not the layer files.
+def external_bfs_solver(game_map, moves='step', slide_cost='length', metrics='counters', progress=None,
+                        directory=None):
+    if np is None:
+        raise ImportError("backend='disk' needs numpy")
+    if moves not in ('step', 'slide'):
+        raise ValueError(f"Unknown action model: {moves}")
+    stats = solvers.SearchStats(metrics, progress)
+    stats.start()
+    timed = stats.timed
+    spec = solvers.get_puzzle_spec(game_map)
+    encoding = vectorized.LayerEncoding(spec)
+    dtype = encoding.key_dtype
+    slide = moves == 'slide'
+    boat = spec.boat_index
+
+    with tempfile.TemporaryDirectory(prefix='rushhour-bfs-', dir=directory, ignore_cleanup_errors=True) as folder:
+        def layer_path(depth):
+            return os.path.join(folder, f'layer{depth}.keys')
+
+        initial = np.frombuffer(spec.initial_offsets, dtype=np.uint8).reshape(1, -1)
+        encoding.keys(initial).tofile(layer_path(0))
+        depth = 0
+        goal_key = encoding.keys(initial)[0] if encoding.goal_offsets[initial[0, boat]] else None
+        layer_size = 1
+        while goal_key is None and layer_size:
+            current = _load(layer_path(depth), dtype)
+            previous = _load(layer_path(depth - 1), dtype) if depth else current[:0]
+
+            # 1. sorted runs of the children of each chunk
+            if timed:
+                lap = solvers.time.perf_counter()
+            run_paths = []
+            generated = 0
+            for start in range(0, len(current), CHUNK_SIZE):
+                children, _ = encoding.children(encoding.rows(current[start:start + CHUNK_SIZE]), slide)
+                stats.expanded += min(CHUNK_SIZE, len(current) - start)
+                generated += len(children)
+                run_paths.append(os.path.join(folder, f'run{len(run_paths)}.keys'))
+                np.unique(encoding.keys(children)).tofile(run_paths[-1])
+                if stats.reporting:
+                    stats.report(len(current) - start)
+            if timed:
+                lap = stats.lap('generate', lap)
+
+            # 2-3. merge the runs, drop the duplicates and write the next layer
+            runs = [_load(path, dtype) for path in run_paths]
+            layer_size = 0
+            with open(layer_path(depth + 1), 'wb') as layer_file:
+                for block in _merge_runs(runs, dtype):
+                    block = block[~(_window_contains(current, block) | _window_contains(previous, block))]
+                    if not len(block):
+                        continue
+                    block.tofile(layer_file)
+                    layer_size += len(block)
+                    goals = np.flatnonzero(encoding.goal_offsets[encoding.rows(block)[:, boat]])
+                    if len(goals):
+                        goal_key = block[goals[0]]
+                        break
+            stats.generated += generated
+            stats.duplicates += generated - layer_size
+            stats.closed_size += layer_size
+            stats.peak_frontier = max(stats.peak_frontier, layer_size)
+            del runs, current, previous
+            for path in run_paths:
+                os.remove(path)
+            depth += 1
+            if timed:
+                stats.lap('hashing', lap)
+
+        solution_steps = []
+        if goal_key is not None:
+            # backward pass: a neighbour of the state in the previous layer
+            row = encoding.rows(np.array([goal_key], dtype=dtype))
+            offsets_path = [row[0].tobytes()]
+            for layer_depth in range(depth - 1, -1, -1):
+                layer_keys = _load(layer_path(layer_depth), dtype)
+                neighbours = np.unique(encoding.keys(encoding.children(row, slide)[0]))
+                row = encoding.rows(neighbours[vectorized.sorted_contains(layer_keys, neighbours)][:1])
+                offsets_path.append(row[0].tobytes())
+                del layer_keys
+            offsets_path.reverse()
+            solution_steps = solvers.path_from_offsets(spec, offsets_path, slide and slide_cost == 'unit')
+    stats.stop()
+    return stats.result(solution_steps)
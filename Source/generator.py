@@ -0,0 +1,314 @@
+import argparse
+from collections import deque
+import json
+import random
+import sys
+import solvers
+
+# Puzzle generator for boards of any size (a size x size playfield inside a
+# border of walls, with the gate on the border, same format as Map/maps.txt).
+# A puzzle is built backward from a goal configuration: the boat is placed on
+# the gate and the other pieces at random, then every configuration reachable
+# from it is enumerated (moves are reversible, so each of them can reach a goal)
+# and a breadth-first search started from every goal configuration of that set
+# gives the exact optimal depth (number of moves) of each configuration. On
+# boards with more than max_states configurations, the puzzle is one of the
+# configurations farthest from the goal in a bounded walk instead, and its depth
+# is measured by a forward search. The puzzle is a configuration at the
+# requested depth, or the deepest one found over several attempts; most attempts
+# add, remove or move one piece of the best board so far (local search), random
+# boards being rarely hard.
+#   moves: 'slide' (any distance per move, the usual Rush Hour move count) or
+#          'step' (one cell per move), see solvers.create_initial_state
+# Depths count moves: the cost-optimal solutions of the solvers (object.length
+# per cell by default) may use more moves.
+# A requested depth can be out of reach of the boards tried (many random boards
+# have shallow solutions): the puzzle is then the closest one found, reported on
+# stderr, and the exit status is 1.
+DEFAULT_LENGTHS = {2: 3, 3: 1}
+MAX_STATES = 300000
+ATTEMPTS = 40
+# share of the attempts spent on mutations of the best board instead of new boards
+MUTATION_RATE = 0.75
+SIDES = ('left', 'right', 'top', 'bottom')
+
+def parse_lengths(text):
+    """Length mix "2:3,3:1" -> {2: 3, 3: 1} (piece length: relative weight)."""
+    lengths = {}
+    for item in text.split(","):
+        length, _, weight = item.partition(":")
+        lengths[int(length)] = float(weight) if weight else 1.0
+    if not lengths or min(lengths) < 2:
+        raise ValueError(f"Invalid length mix: {text}")
+    return lengths
+
+def random_board(size, pieces, lengths=DEFAULT_LENGTHS, boat_length=2, rng=random):
+    """Random map with the boat right next to the gate and up to pieces - 1 other pieces."""
+    if not 2 <= boat_length <= size or max(lengths) > size:
+        raise ValueError("Pieces must fit in the board")
+    width = size + 2
+    game_map = [[-1] * width for _ in range(width)]
+    for i in range(1, size + 1):
+        for j in range(1, size + 1):
+            game_map[i][j] = 0
+
+    # gate on a random side, the boat in its lane against it
+    lane = rng.randrange(1, size + 1)
+    side = rng.choice(SIDES)
+    if side == 'left':
+        game_map[lane][0] = -2
+        boat_cells = [(lane, 1 + k) for k in range(boat_length)]
+    elif side == 'right':
+        game_map[lane][width - 1] = -2
+        boat_cells = [(lane, size - k) for k in range(boat_length)]
+    elif side == 'top':
+        game_map[0][lane] = -2
+        boat_cells = [(1 + k, lane) for k in range(boat_length)]
+    else:
+        game_map[width - 1][lane] = -2
+        boat_cells = [(size - k, lane) for k in range(boat_length)]
+    for row, col in boat_cells:
+        game_map[row][col] = 1
+
+    for object_id in range(2, pieces + 1):
+        add_piece(game_map, object_id, lengths, rng)
+    return game_map
+
+def add_piece(game_map, object_id, lengths=DEFAULT_LENGTHS, rng=random, tries=100):
+    """Place a piece of a random length and orientation on free cells of the playfield; return whether it fit."""
+    size = len(game_map) - 2
+    length_choices, weights = zip(*lengths.items())
+    length = rng.choices(length_choices, weights)[0]
+    for _ in range(tries):
+        if rng.random() < 0.5:
+            row, col = rng.randrange(1, size + 1), rng.randrange(1, size - length + 2)
+            cells = [(row, col + k) for k in range(length)]
+        else:
+            row, col = rng.randrange(1, size - length + 2), rng.randrange(1, size + 1)
+            cells = [(row + k, col) for k in range(length)]
+        if all(game_map[r][c] == 0 for r, c in cells):
+            for r, c in cells:
+                game_map[r][c] = object_id
+            return True
+    return False
+
+def mutate_board(game_map, lengths=DEFAULT_LENGTHS, rng=random):
+    """Copy of a board with one piece (never the boat) added, removed or placed elsewhere."""
+    game_map = [list(row) for row in game_map]
+    object_ids = sorted({cell for row in game_map for cell in row if cell > 1})
+    operation = rng.choice(('add', 'remove', 'move')) if object_ids else 'add'
+    if operation == 'add':
+        add_piece(game_map, max(object_ids, default=1) + 1, lengths, rng)
+        return game_map
+    object_id = rng.choice(object_ids)
+    for row in game_map:
+        for j, cell in enumerate(row):
+            if cell == object_id:
+                row[j] = 0
+    if operation == 'move':
+        add_piece(game_map, object_id, lengths, rng)
+    return game_map
+
+def successors(spec, offsets, slide=True):
+    """Offsets of every configuration one move away (see solvers.PuzzleSpec)."""
+    children = []
+    occupancy = spec.occupancy(offsets)
+    for index, offset in enumerate(offsets):
+        masks = spec.masks[index]
+        others = occupancy ^ masks[offset]
+        head, tail = offsets[:index], offsets[index + 1:]
+        new_offset = offset - 1
+        while new_offset >= 0 and not masks[new_offset] & others:
+            children.append(head + bytes((new_offset,)) + tail)
+            if not slide:
+                break
+            new_offset -= 1
+        limit = spec.limits[index]
+        new_offset = offset + 1
+        while new_offset <= limit and not masks[new_offset] & others:
+            children.append(head + bytes((new_offset,)) + tail)
+            if not slide:
+                break
+            new_offset += 1
+    return children
+
+def configuration_depths(spec, start, slide=True, max_states=MAX_STATES):
+    """Optimal depth of every configuration reachable from a goal configuration.
+
+    Returns (depths, None), or (None, layer) when there are more than
+    max_states configurations, layer being the deepest complete layer of the
+    breadth-first walk from start (configurations at most that deep).
+    """
+    boat = spec.boat_index
+    # every configuration reachable from start, numbered in breadth-first order,
+    # with the numbers of its neighbours and its distance from start
+    numbers = {start: 0}
+    states = [start]
+    distances = [0]
+    neighbours = []
+    for number, offsets in enumerate(states):
+        adjacent = []
+        for child in successors(spec, offsets, slide):
+            child_number = numbers.get(child)
+            if child_number is None:
+                if len(states) == max_states:
+                    # the layer being expanded is complete
+                    return None, [layer_offsets for layer_offsets, distance in zip(states, distances)
+                                  if distance == distances[number]]
+                child_number = numbers[child] = len(states)
+                states.append(child)
+                distances.append(distances[number] + 1)
+            adjacent.append(child_number)
+        neighbours.append(adjacent)
+
+    # breadth-first search from every goal configuration
+    depths = [None] * len(states)
+    queue = deque(number for number, offsets in enumerate(states) if spec.masks[boat][offsets[boat]] & spec.goal_bit)
+    for number in queue:
+        depths[number] = 0
+    while queue:
+        number = queue.popleft()
+        depth = depths[number] + 1
+        for child in neighbours[number]:
+            if depths[child] is None:
+                depths[child] = depth
+                queue.append(child)
+    return dict(zip(states, depths)), None
+
+def blocking_estimate(spec, offsets, slide=True):
+    """Heuristic depth of a configuration (see BitboardState.calc_heuristic)."""
+    state = solvers.BitboardState(spec, offsets)
+    state.calc_heuristic(spec.goal_position, unit_cost=slide)
+    return state.hn
+
+def solution_depth(spec, offsets, slide=True, max_states=MAX_STATES):
+    """Optimal depth of one configuration (breadth-first search up to the first
+    goal), or None after max_states configurations."""
+    boat = spec.boat_index
+    goal = lambda offsets: spec.masks[boat][offsets[boat]] & spec.goal_bit
+    if goal(offsets):
+        return 0
+    seen = {offsets}
+    layer = [offsets]
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for offsets in layer:
+            for child in successors(spec, offsets, slide):
+                if child in seen:
+                    continue
+                if goal(child):
+                    return depth
+                seen.add(child)
+                next_layer.append(child)
+                if len(seen) > max_states:
+                    return None
+        layer = next_layer
+    return None
+
+def generate_puzzle(size=6, pieces=12, lengths=DEFAULT_LENGTHS, depth=None, moves='slide', boat_length=2,
+                    attempts=ATTEMPTS, max_states=MAX_STATES, rng=random):
+    """Generate a puzzle whose optimal solution takes depth moves (the deepest
+    one found when depth is None or not reached in attempts boards).
+
+    Returns (game_map, depth, reachable configurations), or None when no board
+    could be measured. Boards with more than max_states reachable configurations
+    get a configuration far from the goal instead (reachable configurations is
+    then None).
+    """
+    if moves not in ('step', 'slide'):
+        raise ValueError(f"Unknown action model: {moves}")
+    best = best_score = best_board = None
+    for _ in range(attempts):
+        # new random boards and mutations of the best board so far, in turn
+        if best_board is not None and rng.random() < MUTATION_RATE:
+            board = mutate_board(best_board, lengths, rng)
+        else:
+            board = random_board(size, pieces, lengths, boat_length, rng)
+        spec = solvers.get_puzzle_spec(board)
+        boat = spec.boat_index
+        # move the boat onto the gate
+        start = bytearray(spec.initial_offsets)
+        start[boat] = next(offset for offset in (start[boat] - 1, start[boat] + 1)
+                           if 0 <= offset <= spec.limits[boat] and spec.masks[boat][offset] & spec.goal_bit)
+        slide = moves == 'slide'
+        depths, layer = configuration_depths(spec, bytes(start), slide, max_states)
+        if depths is not None:
+            deepest = max(depths.values())
+            found = depth if depth is not None and depth <= deepest else deepest
+            candidates = [offsets for offsets, offsets_depth in depths.items() if offsets_depth == found]
+            offsets, states = rng.choice(candidates), len(depths)
+        else:
+            # too many configurations: the configuration of the walk farthest
+            # from start with the most blocked boat, and its exact depth
+            offsets, states = max(layer, key=lambda offsets: (blocking_estimate(spec, offsets, slide), rng.random())), None
+            found = solution_depth(spec, offsets, slide, max_states)
+            if found is None:
+                continue
+        # closest to the requested depth, or deepest
+        score = abs(found - depth) if depth is not None else -found
+        if best is not None and score > best_score:
+            continue
+        # equal scores move the search to the new board as well
+        best_score, best_board = score, board
+        game_map, _ = spec.decode(offsets)
+        best = (game_map, found, states)
+        if depth is not None and found == depth:
+            break
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate solvable puzzles of any board size at a target optimal depth.")
+    parser.add_argument("-n", "--count", type=int, default=10, help="puzzles to generate (default: %(default)s)")
+    parser.add_argument("-s", "--size", type=int, default=6, help="playfield size, without the border (default: %(default)s)")
+    parser.add_argument("-p", "--pieces", type=int, default=12, help="pieces, boat included (default: %(default)s)")
+    parser.add_argument("-l", "--lengths", type=parse_lengths, default=DEFAULT_LENGTHS,
+                        help="length mix as length:weight pairs (default: 2:3,3:1)")
+    parser.add_argument("-d", "--depth", type=int, default=None,
+                        help="optimal solution depth in moves (default: as deep as possible)")
+    parser.add_argument("--moves", choices=["slide", "step"], default="slide", help="moves counted by the depth")
+    parser.add_argument("--boat-length", type=int, default=2)
+    parser.add_argument("--attempts", type=int, default=ATTEMPTS, help="boards tried per puzzle (default: %(default)s)")
+    parser.add_argument("--max-states", type=int, default=MAX_STATES,
+                        help="boards with more reachable configurations get a configuration far from the goal "
+                             "instead of an exact depth, found with at most this many configurations "
+                             "(default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("-o", "--output", help="output corpus file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    corpus = []
+    missed = 0
+    for number in range(1, args.count + 1):
+        puzzle = generate_puzzle(args.size, args.pieces, args.lengths, args.depth, args.moves, args.boat_length,
+                                 args.attempts, args.max_states, rng)
+        if puzzle is None:
+            print(f"Puzzle {number}: no board could be measured within --max-states", file=sys.stderr)
+            continue
+        game_map, depth, states = puzzle
+        name = f"{args.size}x{args.size} #{number}"
+        corpus.append({"name": name, "data": game_map, "depth": depth, "moves": args.moves, "states": states})
+        note = ""
+        if args.depth is not None and depth != args.depth:
+            missed += 1
+            note = f" (target depth {args.depth} not reached in {args.attempts} attempts)"
+        print(f"{name}: depth {depth}, {states or 'too many'} configurations{note}", file=sys.stderr)
+
+    text = json.dumps(corpus)
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+    if missed or len(corpus) < args.count:
+        if missed:
+            print(f"{missed} of {args.count} puzzles missed depth {args.depth}: "
+                  "try more --attempts, fewer --pieces or a smaller -d", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
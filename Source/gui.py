@@ -3,6 +3,8 @@ import os
 import time
 import psutil
 import solvers
+import cache
+import worker
 
 # --- CẤU HÌNH TOÀN CỤC ---
 # Kích thước màn hình
@@ -17,6 +19,10 @@ DEFAULT_STEP_DELAY = 500
 MIN_DELAY = 50
 MAX_DELAY = 1000
 
+# Giới hạn số khung hình mỗi giây và số dòng chữ đã render được lưu lại
+FPS = 60
+TEXT_CACHE_SIZE = 256
+
 # Tên file hình ảnh
 ASSETS_DIR = "Photos"
 ASSETS = {
@@ -26,15 +32,25 @@ ASSETS = {
 
 # Danh sách các map và thuật toán
 MAPS = ["Map 1", "Map 2", "Map 3", "Map 4", "Map 5", "Map 6", "Map 7", "Map 8", "Map 9", "Map 10"]
-ALGORITHMS = ["BFS", "DFS", "UCS", "A*"]
+# PORTFOLIO: chạy song song nhiều thuật toán, lấy lời giải tối ưu đầu tiên
+ALGORITHMS = ["BFS", "DFS", "UCS", "A*", "HDA*", "ARA*", "PORTFOLIO"]
 
 
 class UI:
     """Chịu trách nhiệm vẽ tất cả các thành phần giao diện."""
-    def __init__(self, screen, state):
+    def __init__(self, screen, state, dirty_rendering=True):
         self.screen = screen
         self.state = state
         self.panel_x = 800
+        self.board_rect = pygame.Rect(20, 20, CELL_SIZE * MAP_SIZE, CELL_SIZE * MAP_SIZE)
+
+        # dirty_rendering: chỉ vẽ lại các vùng thay đổi (xem render)
+        self.dirty_rendering = dirty_rendering
+        self._drawn_state = None
+        self._drawn_regions = {}
+        self._static_board = None
+        self._static_surface = None
+        self._text_cache = {}
 
         self.font = pygame.font.SysFont("Segoe UI", 30)
         self.title_font = pygame.font.SysFont("Segoe UI Bold", 36)
@@ -90,6 +106,7 @@ class UI:
         self.map_text_pos = (px + (SCREEN_WIDTH - px) / 2, current_y + ELEMENT_SPACING)
         self.buttons["map_left"] = pygame.Rect(px + PANEL_PADDING_X, current_y, 40, 40)
         self.buttons["map_right"] = pygame.Rect(SCREEN_WIDTH - PANEL_PADDING_X - 40, current_y, 40, 40)
+        self.map_text_rect = (px + PANEL_PADDING_X + 45, current_y - 8, (SCREEN_WIDTH - px) - 2 * PANEL_PADDING_X - 90, 56)
         current_y += GROUP_SPACING
 
         self.algo_title_pos = (px + PANEL_PADDING_X, current_y)
@@ -97,6 +114,7 @@ class UI:
         self.algo_text_pos = (px + (SCREEN_WIDTH - px) / 2, current_y + ELEMENT_SPACING)
         self.buttons["algo_left"] = pygame.Rect(px + PANEL_PADDING_X, current_y, 40, 40)
         self.buttons["algo_right"] = pygame.Rect(SCREEN_WIDTH - PANEL_PADDING_X - 40, current_y, 40, 40)
+        self.algo_text_rect = (px + PANEL_PADDING_X + 45, current_y - 8, (SCREEN_WIDTH - px) - 2 * PANEL_PADDING_X - 90, 56)
         current_y += GROUP_SPACING + 10
 
         self.buttons["Solve"] = pygame.Rect(px + PANEL_PADDING_X, current_y, (SCREEN_WIDTH - px) - 2 * PANEL_PADDING_X, 50)
@@ -106,6 +124,7 @@ class UI:
         self.stats_start_y = current_y + 50
         
         controls_y = SCREEN_HEIGHT - 160
+        self.stats_rect = (px + 1, self.stats_start_y - 5, SCREEN_WIDTH - px - 1, controls_y - self.stats_start_y - 5)
         controls = ["Back", "Play", "Pause", "Next", "Reset"]
         control_button_width = 50
         total_controls_width = len(controls) * control_button_width + (len(controls) - 1) * 10
@@ -115,35 +134,113 @@ class UI:
 
         slider_y = controls_y + 60
         self.slider_rect = pygame.Rect(start_x, slider_y, total_controls_width, 20)
+        # vùng của thanh trượt và nhãn "Speed" bên trái
+        self.slider_area = (px + 1, slider_y - 10, SCREEN_WIDTH - px - 1, 40)
         pos_ratio = (self.state.step_delay - MIN_DELAY) / (MAX_DELAY - MIN_DELAY)
         self.slider_handle_x = self.slider_rect.left + (1 - pos_ratio) * self.slider_rect.width
 
     def draw(self):
+        """Vẽ lại toàn bộ màn hình."""
         self.draw_board()
         self.draw_panel()
         self.draw_buttons()
         self.draw_slider()
 
-    def draw_board(self):
-        current_state_obj = self.state.current_state
-        board_config = self.state.board
+    def render(self):
+        """Vẽ một khung hình; trả về danh sách vùng (Rect) cần đưa lên màn hình bằng pygame.display.update.
+
+        Ở chế độ dirty_rendering chỉ các vùng có nội dung thay đổi (quân cờ di chuyển,
+        thống kê, nút, thanh trượt) được vẽ lại; còn lại thì vẽ lại toàn bộ mỗi khung hình.
+        """
+        regions = self._regions()
+        if not self.dirty_rendering or self.state is not self._drawn_state:
+            self.draw()
+            self._drawn_state = self.state
+            self._drawn_regions = regions
+            return [self.screen.get_rect()]
+
+        dirty = []
+        for name, (signature, rect, draw) in regions.items():
+            old_signature, old_rect, _ = self._drawn_regions.get(name, (None, None, None))
+            if signature == old_signature:
+                continue
+            for area in {rect, old_rect} - {None}:
+                # chỉ vẽ trong vùng này: nền tĩnh rồi đến nội dung
+                area = pygame.Rect(area)
+                self.screen.set_clip(area)
+                self.screen.blit(self._static_layer(), area, area)
+                draw()
+                self.screen.set_clip(None)
+                dirty.append(area)
+        self._drawn_regions = regions
+        return dirty
+
+    def _regions(self):
+        """Các vùng vẽ lại được: tên -> (chữ ký nội dung, vùng, hàm vẽ)."""
+        regions = {}
+        for v in self.state.current_state.objects.values():
+            rect = self._piece_rect(v)
+            regions[('piece', v.id)] = (rect, rect, self.draw_board)
+        regions['map'] = (self.state.map_index, self.map_text_rect, self.draw_panel)
+        regions['algo'] = (self.state.algo_index, self.algo_text_rect, self.draw_panel)
+        regions['stats'] = (tuple(self._stats_lines()), self.stats_rect, self.draw_panel)
+        for name, rect in self.buttons.items():
+            regions[('button', name)] = (self._button_look(name), tuple(rect), self.draw_buttons)
+        regions['slider'] = (self.state.step_delay, self.slider_area, self.draw_slider)
+        return regions
 
-        self.screen.blit(self.images.get('bg_forest'), (0, 0))
-        area = pygame.Rect(20, 20, CELL_SIZE * MAP_SIZE, CELL_SIZE * MAP_SIZE)
-        self.screen.blit(self.images.get('bg_water', pygame.Surface(area.size)), area.topleft)
+    def _static_layer(self):
+        """Lớp nền tĩnh (rừng, nước, lưới, cổng, nền bảng điều khiển), dựng lại khi đổi map."""
+        board_config = self.state.board
+        if self._static_board is board_config:
+            return self._static_surface
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        if 'bg_forest' in self.images:
+            layer.blit(self.images['bg_forest'], (0, 0))
+        else:
+            layer.fill((34, 80, 34))
+        area = self.board_rect
+        layer.blit(self.images.get('bg_water', pygame.Surface(area.size)), area.topleft)
 
         for r in range(MAP_SIZE):
             for c in range(MAP_SIZE):
-                pygame.draw.rect(self.screen, (0, 0, 0, 50), (area.x + c * CELL_SIZE, area.y + r * CELL_SIZE, CELL_SIZE, CELL_SIZE), 1)
+                pygame.draw.rect(layer, (0, 0, 0, 50), (area.x + c * CELL_SIZE, area.y + r * CELL_SIZE, CELL_SIZE, CELL_SIZE), 1)
 
         exit_x = area.x + (board_config.goal_position[1] - 1) * CELL_SIZE
         exit_y = area.y + (board_config.goal_position[0] - 1) * CELL_SIZE
-        self.screen.blit(self.images.get('gate', pygame.Surface((CELL_SIZE, CELL_SIZE))), (exit_x, exit_y))
+        layer.blit(self.images.get('gate', pygame.Surface((CELL_SIZE, CELL_SIZE))), (exit_x, exit_y))
+
+        px = self.panel_x
+        pygame.draw.rect(layer, (240, 240, 240), (px, 0, SCREEN_WIDTH - px, SCREEN_HEIGHT))
+        pygame.draw.line(layer, (200, 200, 200), (px, 0), (px, SCREEN_HEIGHT), 1)
+
+        self._static_board = board_config
+        self._static_surface = layer
+        return layer
+
+    def _text(self, font, text, color):
+        """Surface của một dòng chữ, được lưu lại để không phải render lại mỗi khung hình."""
+        key = (id(font), text, color)
+        surface = self._text_cache.get(key)
+        if surface is None:
+            if len(self._text_cache) >= TEXT_CACHE_SIZE:
+                self._text_cache.clear()
+            surface = self._text_cache[key] = font.render(text, True, color)
+        return surface
+
+    def _piece_rect(self, v):
+        top, left = min(v.positions)
+        w = CELL_SIZE * v.length if v.orientation == 1 else CELL_SIZE
+        h = CELL_SIZE if v.orientation == 1 else CELL_SIZE * v.length
+        return (self.board_rect.x + (left - 1) * CELL_SIZE, self.board_rect.y + (top - 1) * CELL_SIZE, w, h)
+
+    def draw_board(self):
+        current_state_obj = self.state.current_state
+        self.screen.blit(self._static_layer(), (0, 0), (0, 0, self.panel_x, SCREEN_HEIGHT))
 
         for v in current_state_obj.objects.values():
             car_id = v.id
-            top, left = min(v.positions)
-            px, py = area.x + (left - 1)* CELL_SIZE, area.y + (top - 1) * CELL_SIZE
+            px, py, w, h = self._piece_rect(v)
             img_key = 1 if car_id == 1 else 'wood'
             orientation_key = "V" if v.orientation == 0 else "H"
             img = self.images.get(img_key, {}).get(orientation_key, {}).get(v.length)
@@ -152,56 +249,78 @@ class UI:
                 self.screen.blit(img, (px, py))
             else:
                 color = (255, 80, 80) if car_id == 1 else (139, 69, 19)
-                w = CELL_SIZE * v.length if orientation_key == "H" else CELL_SIZE
-                h = CELL_SIZE if orientation_key == "H" else CELL_SIZE * v.length
                 pygame.draw.rect(self.screen, color, (px, py, w, h))
 
     def draw_panel(self):
         px = self.panel_x
-        pygame.draw.rect(self.screen, (240, 240, 240), (px, 0, SCREEN_WIDTH - px, SCREEN_HEIGHT))
-        pygame.draw.line(self.screen, (200, 200, 200), (px, 0), (px, SCREEN_HEIGHT), 1)
+        self.screen.blit(self._static_layer(), (px, 0), (px, 0, SCREEN_WIDTH - px, SCREEN_HEIGHT))
 
-        self.screen.blit(self.title_font.render("Maps Selection", True, (0, 0, 0)), self.map_title_pos)
-        map_text = self.font.render(MAPS[self.state.map_index], True, (50, 50, 50))
+        self.screen.blit(self._text(self.title_font, "Maps Selection", (0, 0, 0)), self.map_title_pos)
+        map_text = self._text(self.font, MAPS[self.state.map_index], (50, 50, 50))
         self.screen.blit(map_text, map_text.get_rect(center=self.map_text_pos))
 
-        self.screen.blit(self.title_font.render("Algorithms", True, (0, 0, 0)), self.algo_title_pos)
-        algo_text = self.font.render(ALGORITHMS[self.state.algo_index], True, (50, 50, 50))
+        self.screen.blit(self._text(self.title_font, "Algorithms", (0, 0, 0)), self.algo_title_pos)
+        algo_text = self._text(self.font, ALGORITHMS[self.state.algo_index], (50, 50, 50))
         self.screen.blit(algo_text, algo_text.get_rect(center=self.algo_text_pos))
 
-        self.screen.blit(self.title_font.render("Statistics", True, (0, 0, 0)), self.stats_title_pos)
+        self.screen.blit(self._text(self.title_font, "Statistics", (0, 0, 0)), self.stats_title_pos)
+        for i, line in enumerate(self._stats_lines()):
+            self.screen.blit(self._text(self.font, line, (0, 0, 0)), (self.stats_title_pos[0], self.stats_start_y + i * 35))
+
+    def _stats_lines(self):
         info = self.state
         if info.status == 'success':
             mem = info.peak_memory
-            mem_text = f"{mem/(1024*1024):.2f} MB" if mem > 1024*1024 else f"{mem/1024:.2f} KB"
+            # Lời giải lấy từ cache của một lần giải với metrics='off'/'counters' không có bộ nhớ đỉnh
+            if mem is None: mem_text = "-"
+            else: mem_text = f"{mem/(1024*1024):.2f} MB" if mem > 1024*1024 else f"{mem/1024:.2f} KB"
             lines = [
                 f"Search Time: {info.search_time:.4f} s", f"Memory Used: {mem_text}",
                 f"States Explored: {info.num_expanded:,}", f"Solution Steps: {len(info.solution_path)-1}",
-                f"Current Step: {info.current_step} / {len(info.solution_path)-1}", f"Total cost: {info.solution_path[info.current_step].gn} / {info.solution_path[-1].gn}"
+                f"Current Step: {info.current_step} / {len(info.solution_path)-1}", f"Total cost: {info.solution_path.cost_at(info.current_step)} / {info.solution_path.cost}"
             ]
         elif info.status == 'failed': lines = [f"{ALGORITHMS[info.algo_index]} failed to solve."]
-        elif info.status == 'solving': lines = ["Solving... please wait"]
+        elif info.status == 'solving':
+            lines = ["Solving... please wait"]
+            if info.bound is not None:
+                # ARA*: lời giải tốt nhất hiện có, chi phí không quá bound lần tối ưu
+                lines.append(f"Best cost: {info.solution_path.cost} (<= {info.bound:.2f}x optimal)")
+            if info.progress:
+                progress = info.progress
+                lines += [
+                    f"Elapsed: {progress['elapsed']:.1f} s", f"States Explored: {progress['expanded']:,}",
+                    f"Frontier Size: {progress['frontier']:,}", f"Nodes/sec: {progress['rate']:,.0f}"
+                ]
         else: lines = ["Ready to solve."]
-
-        for i, line in enumerate(lines):
-            self.screen.blit(self.font.render(line, True, (0, 0, 0)), (self.stats_title_pos[0], self.stats_start_y + i * 35))
+        if info.hint_worker is not None:
+            # Phím H bị vô hiệu khi bảng gợi ý đang được dựng
+            progress = info.hint_worker.progress
+            lines.append(f"Building hint table: {progress['expanded']:,} states" if progress else "Building hint table...")
+        elif info.status == 'ready':
+            lines.append("Press H for a hint.")
+        return lines
+
+    def _button_look(self, name):
+        """(màu nền, nhãn, màu chữ) của một nút theo trạng thái hiện tại."""
+        text_map = {"map_left":"◀", "map_right":"▶", "algo_left":"◀", "algo_right":"▶", "Back":"⏮", "Next":"⏭", "Play":"▶", "Pause":"⏸", "Reset":"↺"}
+        # Khi đang giải, nút Solve trở thành nút Cancel
+        cancel = name == "Solve" and self.state.status == 'solving'
+        disabled = (name in ["Play", "Pause", "Back", "Next", "Reset"] and not self.state.solution_path) or \
+                   (name == "Play" and self.state.play_mode) or \
+                   (name == "Pause" and not self.state.play_mode)
+        
+        color = (200, 90, 90) if cancel else (100, 180, 100) if name == "Solve" else (230, 230, 230)
+        if disabled: color = (180, 180, 180)
+        text_color = (100, 100, 100) if disabled else (0, 0, 0)
+        return color, "Cancel" if cancel else text_map.get(name, name), text_color
 
     def draw_buttons(self):
-        text_map = {"map_left":"◀", "map_right":"▶", "algo_left":"◀", "algo_right":"▶", "Back":"⏮", "Next":"⏭", "Play":"▶", "Pause":"⏸", "Reset":"↺"}
         for name, rect in self.buttons.items():
-            disabled = self.state.status == 'solving' or \
-                       (name in ["Play", "Pause", "Back", "Next", "Reset"] and not self.state.solution_path) or \
-                       (name == "Play" and self.state.play_mode) or \
-                       (name == "Pause" and not self.state.play_mode)
-            
-            color = (100, 180, 100) if name == "Solve" else (230, 230, 230)
-            if disabled: color = (180, 180, 180)
-            
+            color, text, text_color = self._button_look(name)
             pygame.draw.rect(self.screen, color, rect, border_radius=8)
             pygame.draw.rect(self.screen, (150, 150, 150), rect, 1, border_radius=8)
             
-            text_color = (100, 100, 100) if disabled else (0, 0, 0)
-            label = (self.font if name == "Solve" else self.button_font).render(text_map.get(name, name), True, text_color)
+            label = self._text(self.font if name == "Solve" else self.button_font, text, text_color)
             self.screen.blit(label, label.get_rect(center=rect.center))
 
     def draw_slider(self):
@@ -216,7 +335,7 @@ class UI:
         pygame.draw.rect(self.screen, (100, 120, 200), handle, border_radius=5)
         pygame.draw.rect(self.screen, (20, 40, 100), handle, 1, border_radius=5)
         
-        speed_label = self.font.render("Speed", True, (0, 0, 0))
+        speed_label = self._text(self.font, "Speed", (0, 0, 0))
         self.screen.blit(speed_label, speed_label.get_rect(midright=(self.slider_rect.left - 15, self.slider_rect.centery)))
 
 class GameState:
@@ -235,19 +354,104 @@ class GameState:
         self.peak_memory = 0
         self.num_expanded = 0
 
-        self.board = type('Board', (), {'goal_position': self._find_goal_position(game_map)})()
-        self.current_state = solvers.State(game_map, solvers.get_objects_info(game_map))
-
-    def _find_goal_position(self, game_map):
-        for i, row in enumerate(game_map):
-            for j, val in enumerate(row):
-                if val == -2: return (i, j)
-        return (-1, -1)
+        # Tiến trình giải đang chạy và tiến độ mới nhất của nó
+        self.worker = None
+        self.progress = None
+        # Cận chất lượng của lời giải tạm thời (ARA*) đang được hiển thị
+        self.bound = None
+        # Bảng khoảng cách cho phím H, dựng trong một tiến trình riêng ở lần gợi ý đầu tiên
+        self.hint_table = None
+        self.hint_worker = None
+
+        # PuzzleSpec được biên dịch một lần cho mỗi map và dùng chung với solvers
+        self.game_map = game_map
+        self.board = solvers.get_puzzle_spec(game_map)
+        self.current_state = self.board.initial_map_state()
+
+    def next_optimal_state(self):
+        """Trạng thái sau nước đi tối ưu tiếp theo, tra từ bảng khoảng cách (không cần giải lại)."""
+        next_offsets = self.hint_table.best_move(self.board.encode(self.current_state.objects))
+        if next_offsets is None:
+            return None
+        return solvers.State(*self.board.decode(next_offsets), spec=self.board)
+
+    def hint(self):
+        """Đi một nước tối ưu từ trạng thái đang hiển thị (phím H), không cần giải lại."""
+        if self.status == 'solving' or self.hint_worker is not None:
+            return
+        if self.hint_table is None:
+            # Lần đầu: dựng bảng trong tiến trình riêng để vòng lặp vẽ không bị dừng;
+            # phím H bị vô hiệu cho đến khi bảng sẵn sàng (update_solve đọc tiến độ)
+            self.hint_worker = worker.TableWorker(self.game_map)
+            return
+        next_state = self.next_optimal_state()
+        if next_state is None:
+            return
+        # Bàn cờ đã rời khỏi lời giải đang hiển thị: Solve sẽ giải tiếp từ trạng thái mới
+        self.current_state = next_state
+        self.solution_path = []
+        self.current_step = 0
+        self.play_mode = False
+        self.status = 'ready'
 
     def solve(self):
-        """Chạy thuật toán giải và cập nhật trạng thái."""
-        solution_path, expanded_nodes, search_time, memory_used = solvers.solve(self.current_state.game_map, ALGORITHMS[self.algo_index])
-        
+        """Bắt đầu giải: lấy ngay từ cache nếu đã biết, nếu không thì chạy trong một tiến trình riêng."""
+        game_map = self.current_state.game_map
+        algorithm = ALGORITHMS[self.algo_index]
+        # Lời giải được lưu trong cache (bộ nhớ + sqlite): giải lại một map đã biết chỉ mất vài ms
+        result = cache.cached_result(game_map, algorithm, compact=True)
+        if result is not None:
+            self._set_result(result)
+            return
+        # Tiến trình riêng không tranh GIL với vòng lặp vẽ và có thể dừng ngay (Cancel)
+        # Đo bộ nhớ bằng RSS (psutil) thay vì tracemalloc để thời gian tìm kiếm không bị chậm đi
+        self.status = 'solving'
+        self.progress = None
+        self.bound = None
+        self.worker = worker.SolveWorker(game_map, algorithm, metrics='rss')
+
+    def update_solve(self):
+        """Đọc tiến độ của tiến trình giải và của tiến trình dựng bảng gợi ý (gọi mỗi khung hình)."""
+        if self.hint_worker is not None and self.hint_worker.poll():
+            self.hint_table = self.hint_worker.result
+            self.hint_worker = None
+        if self.worker is None:
+            return
+        done = self.worker.poll()
+        self.progress = self.worker.progress
+        solution = self.worker.solution
+        if not done and solution is not None and solution[0] is not self.solution_path:
+            # ARA* gửi lời giải tốt hơn sau mỗi vòng: hiển thị ngay, không chờ lời giải tối ưu
+            self.solution_path, self.bound = solution
+            self.current_step = 0
+            self.current_state = self.solution_path[0]
+        if done:
+            result = self.worker.result
+            self.worker = None
+            if result is None:
+                self.solution_path = []
+                self.status = 'failed'
+            else:
+                self._set_result(result)
+
+    def cancel_solve(self):
+        """Dừng ngay tiến trình giải đang chạy."""
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+            self.progress = None
+            self.status = 'ready'
+
+    def close(self):
+        """Dừng mọi tiến trình con (giải và dựng bảng gợi ý) khi rời phiên chơi này."""
+        self.cancel_solve()
+        if self.hint_worker is not None:
+            self.hint_worker.cancel()
+            self.hint_worker = None
+
+    def _set_result(self, result):
+        # solution_path là một solution.Solution: chỉ lưu danh sách nước đi, trạng thái ở bước k được dựng lại khi cần
+        solution_path, expanded_nodes, search_time, memory_used = result
         if solution_path:
             self.solution_path = solution_path
             self.status = 'success'
@@ -6,7 +6,6 @@ import json
 import gui
 import solvers
 import time
-import threading
 
 def load_all_maps_from_file(filename="maps.txt"):
     """Tải tất cả các map từ một file JSON duy nhất."""
@@ -51,6 +50,7 @@ class Game:
             self.handle_events()
             self.update()
             self.draw()
+            self.clock.tick(gui.FPS) # Giới hạn số khung hình để không chiếm trọn một nhân CPU
         
         pygame.quit()
         sys.exit()
@@ -59,6 +59,7 @@ class Game:
         """Xử lý tất cả input từ người dùng."""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                self.game_state.close()
                 self.running = False
             
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
@@ -70,11 +71,11 @@ class Game:
             if event.type == pygame.MOUSEMOTION and self.dragging_slider:
                 self._update_slider(event.pos[0])
 
-    def _handle_mouse_down(self, pos):
-        # Không cho phép click khi đang giải
-        if self.game_state.status == 'solving':
-            return
+            # Phím H: đi một nước tối ưu (tra bảng khoảng cách của retrograde)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                self.game_state.hint()
 
+    def _handle_mouse_down(self, pos):
         # Kiểm tra click vào các nút
         for name, rect in self.ui.buttons.items():
             if rect.collidepoint(pos):
@@ -97,6 +98,10 @@ class Game:
     def _handle_button_click(self, name):
         gs = self.game_state # Viết tắt cho gọn
 
+        # Đổi map/thuật toán thì dừng các tiến trình con cũ (giải, dựng bảng gợi ý)
+        if name in ("map_left", "map_right", "algo_left", "algo_right"):
+            gs.close()
+
         if name == "map_left":
             new_idx = (gs.map_index - 1) % len(self.all_maps)
             self.game_state = gui.GameState(self.all_maps[new_idx], map_index=new_idx, algo_index=gs.algo_index)
@@ -116,9 +121,9 @@ class Game:
             self.game_state = gui.GameState(self.all_maps[gs.map_index], map_index=gs.map_index, algo_index=gs.algo_index)
             self.ui.state = self.game_state # Cập nhật state cho UI
         elif name == "Solve" and gs.status == 'ready':
-            gs.status = 'solving'
-            solve_thread = threading.Thread(target=gs.solve) # Chạy giải thuật trong một luồng riêng
-            solve_thread.start()
+            gs.solve() # Chạy giải thuật trong một tiến trình riêng
+        elif name == "Solve" and gs.status == 'solving':
+            gs.cancel_solve() # Nút Cancel
         
         # Các nút điều khiển animation
         elif gs.solution_path:
@@ -141,8 +146,9 @@ class Game:
                 gs.play_mode = False
 
     def update(self):
-        """Cập nhật trạng thái cho animation."""
+        """Cập nhật trạng thái cho animation và tiến độ giải."""
         gs = self.game_state
+        gs.update_solve()
         if gs.play_mode and gs.solution_path:
             now = time.time() * 1000
             if now - getattr(gs, 'last_step_time', 0) > gs.step_delay:
@@ -154,9 +160,8 @@ class Game:
                     gs.play_mode = False
 
     def draw(self):
-        """Vẽ tất cả mọi thứ lên màn hình."""
-        self.ui.draw()
-        pygame.display.flip()
+        """Vẽ các vùng thay đổi và chỉ đưa các vùng đó lên màn hình."""
+        pygame.display.update(self.ui.render())
 
 if __name__ == '__main__':
     game = Game()
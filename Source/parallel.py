@@ -0,0 +1,281 @@
+import heapq
+import multiprocessing
+import os
+import queue
+import solvers
+
+# Hash-distributed A* (HDA*): every state is owned by one worker process, chosen
+# by its Zobrist key (key % processes). Each worker keeps the open list and the
+# best known gn (with the parent) of the states it owns, expands them in f order,
+# and sends the children it generates to their owners in batches through the
+# owners' queues. Messages of a worker:
+#   to another worker: ('work', [(offsets, gn, key, parent offsets), ...])
+#   to the coordinator: ('incumbent', cost, offsets), ('idle', rank),
+#     ('progress', rank, expanded, open size), ('ack', wave, rank, sent, received, idle),
+#     ('parent', offsets), ('stats', rank, {...}), ('error', rank, message)
+# and of the coordinator (the calling process) to a worker:
+#   ('bound', cost), ('probe', wave), ('trace', offsets), ('stop',)
+# The expansion order is only locally best-first, so a state reached again with
+# a lower gn is always reopened. A goal reached by a worker becomes the
+# incumbent, broadcast to every worker, which then drop the states with
+# f >= incumbent (the heuristic is admissible, so none of them leads to a
+# cheaper goal). The search is over when every worker is idle and no batch is
+# in flight; the coordinator checks it with waves of probes (Mattern's four
+# counters: two consecutive waves in which every worker is idle and reports the
+# same sent/received batch counts, with as many batches sent as received), so
+# the incumbent is then optimal. The path is traced back from the goal by asking
+# the owner of each state for its parent.
+# A worker that dies without reporting an error (killed, crashed, out of memory)
+# never answers again: the coordinator checks the workers' exit codes on every
+# progress report and whenever the outbox stays empty for WAVE_PERIOD, and
+# raises instead of waiting forever.
+BATCH_SIZE = 256      # children buffered for one owner before the batch is sent
+ROUND_SIZE = 64       # expansions between two reads of the inbox
+IDLE_TIMEOUT = 0.05   # seconds between two orphan checks of an idle worker
+WAVE_PERIOD = 0.05    # seconds without messages before the coordinator starts a wave
+
+def _worker(rank, processes, game_map, heuristic, moves, slide_cost, inboxes, outbox):
+    """Entry point of an HDA* worker process."""
+    parent_pid = os.getppid()
+    try:
+        spec = solvers.get_puzzle_spec(game_map)
+        goal_pos = spec.goal_position
+        _, generate_children = solvers.create_initial_state(game_map, 'bitboard', moves, slide_cost)
+        priority = solvers.make_a_star_priority(game_map, heuristic, moves, slide_cost)
+        inbox = inboxes[rank]
+        best = {}      # (key: offsets, value: (lowest gn, parent offsets))
+        closed = set()
+        heap = []
+        counter = 0
+        incumbent = float('inf')
+        buffers = [[] for _ in range(processes)]
+        sent = received = 0
+        counters = dict.fromkeys(('expanded', 'generated', 'duplicates', 'reopened', 'peak_frontier'), 0)
+        idle = False
+
+        def accept(offsets, gn, key, parent):
+            nonlocal counter, incumbent
+            record = best.get(offsets)
+            if record is not None and record[0] <= gn:
+                counters['duplicates'] += 1
+                return
+            best[offsets] = (gn, parent)
+            state = solvers.BitboardState(spec, offsets, gn, None, key)
+            if state.is_goal(goal_pos):
+                if gn < incumbent:
+                    incumbent = gn
+                    outbox.put(('incumbent', gn, offsets))
+                return
+            fn = priority(state, goal_pos)
+            if fn >= incumbent:
+                return
+            counter += 1
+            heapq.heappush(heap, (fn, counter, state))
+
+        def flush(owner):
+            nonlocal sent
+            inboxes[owner].put(('work', buffers[owner]))
+            buffers[owner] = []
+            sent += 1
+
+        while True:
+            try:
+                message = inbox.get(timeout=IDLE_TIMEOUT) if not heap else inbox.get_nowait()
+            except queue.Empty:
+                message = None
+                if not heap:
+                    if os.getppid() != parent_pid:
+                        os._exit(1)
+                    continue
+            if message is not None:
+                kind = message[0]
+                if kind == 'work':
+                    received += 1
+                    for item in message[1]:
+                        accept(*item)
+                    idle = False
+                elif kind == 'bound':
+                    incumbent = min(incumbent, message[1])
+                elif kind == 'probe':
+                    outbox.put(('ack', message[1], rank, sent, received, not heap))
+                elif kind == 'trace':
+                    outbox.put(('parent', best[message[1]][1]))
+                elif kind == 'stop':
+                    counters['closed_size'] = len(closed)
+                    outbox.put(('stats', rank, counters))
+                    return
+                continue
+
+            # expand a round of states, then send every pending batch
+            for _ in range(ROUND_SIZE):
+                if not heap:
+                    break
+                fn, _, state = heapq.heappop(heap)
+                if fn >= incumbent:
+                    # the lowest f is above the incumbent: nothing left to expand
+                    heap.clear()
+                    break
+                offsets = state.offsets
+                if best[offsets][0] < state.gn:
+                    continue
+                counters['expanded'] += 1
+                if not counters['expanded'] % solvers.REPORT_INTERVAL:
+                    if os.getppid() != parent_pid:
+                        os._exit(1)
+                    outbox.put(('progress', rank, counters['expanded'], len(heap)))
+                if offsets in closed:
+                    counters['reopened'] += 1
+                closed.add(offsets)
+                for child in generate_children(state):
+                    counters['generated'] += 1
+                    if child.gn >= incumbent:
+                        continue
+                    owner = child.key % processes
+                    if owner == rank:
+                        accept(child.offsets, child.gn, child.key, offsets)
+                    else:
+                        buffers[owner].append((child.offsets, child.gn, child.key, offsets))
+                        if len(buffers[owner]) >= BATCH_SIZE:
+                            flush(owner)
+                counters['peak_frontier'] = max(counters['peak_frontier'], len(heap))
+            for owner in range(processes):
+                if buffers[owner]:
+                    flush(owner)
+            if not heap and not idle:
+                idle = True
+                outbox.put(('idle', rank))
+    except Exception as error:
+        outbox.put(('error', rank, f"{type(error).__name__}: {error}"))
+
+# HDA* solver
+#   processes: worker processes (default: CPU count)
+# Solutions of the same cost as A_star_solver for the same heuristic (see HEURISTICS), with
+# the bitboard backend. Statistics (metrics, see METRICS): the node counters
+# are summed over the workers (peak_frontier is the sum of their peaks), phases
+# are not timed, and peak_memory only covers the calling process. progress is
+# called with the summed counters as the workers report them.
+def hda_star_solver(game_map, heuristic='blocking', moves='step', slide_cost='length', processes=None,
+                    metrics='counters', progress=None):
+    stats = solvers.SearchStats(metrics, progress)
+    stats.start()
+    spec = solvers.get_puzzle_spec(game_map)
+    unit_cost = moves == 'slide' and slide_cost == 'unit'
+    # check the options and build the pattern database (saved to disk) before
+    # the workers load it
+    solvers.create_initial_state(game_map, 'bitboard', moves, slide_cost)
+    solvers.make_a_star_priority(game_map, heuristic, moves, slide_cost)
+
+    processes = processes or os.cpu_count() or 1
+    context = multiprocessing.get_context('spawn')
+    inboxes = [context.Queue() for _ in range(processes)]
+    outbox = context.Queue()
+    workers = [context.Process(target=_worker, args=(rank, processes, game_map, heuristic, moves, slide_cost, inboxes, outbox),
+                               daemon=True) for rank in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    stopping = False
+
+    def check_workers():
+        """Raise if a worker exited before it was stopped, or with an error code."""
+        for rank, worker in enumerate(workers):
+            if worker.exitcode is not None and (worker.exitcode != 0 or not stopping):
+                raise RuntimeError(f"HDA* worker {rank} exited unexpectedly (exit code {worker.exitcode})")
+
+    def receive(kinds):
+        """Next message of one of the given kinds (progress reports are applied on the way)."""
+        while True:
+            try:
+                message = outbox.get(timeout=WAVE_PERIOD)
+            except queue.Empty:
+                check_workers()
+                continue
+            if message[0] == 'error':
+                raise RuntimeError(f"HDA* worker {message[1]} failed: {message[2]}")
+            if message[0] == 'progress':
+                update_progress(message)
+                check_workers()
+            if message[0] in kinds:
+                return message
+
+    expanded = [0] * processes
+    frontier = [0] * processes
+
+    def update_progress(message):
+        _, rank, expanded[rank], frontier[rank] = message
+        stats.expanded = sum(expanded)
+        if stats.reporting:
+            stats.report(sum(frontier))
+
+    try:
+        initial_state = spec.initial_state()
+        inboxes[initial_state.key % processes].put(('work', [(initial_state.offsets, 0, initial_state.key, None)]))
+        sent = 1
+        incumbent, goal_offsets = float('inf'), None
+        wave, acks, last_counts = 0, None, None
+        while True:
+            try:
+                message = outbox.get(timeout=WAVE_PERIOD)
+            except queue.Empty:
+                check_workers()
+                message = ('tick',)
+            kind = message[0]
+            # start a wave of probes on an idle worker, a quiet period, or right
+            # after a wave in which every worker was idle
+            start_wave = kind in ('idle', 'tick')
+            if kind == 'error':
+                raise RuntimeError(f"HDA* worker {message[1]} failed: {message[2]}")
+            elif kind == 'progress':
+                update_progress(message)
+                check_workers()
+            elif kind == 'incumbent' and message[1] < incumbent:
+                _, incumbent, goal_offsets = message
+                for inbox in inboxes:
+                    inbox.put(('bound', incumbent))
+            elif kind == 'ack' and message[1] == wave:
+                acks[message[2]] = message[3:]
+                if len(acks) == processes:
+                    counts = tuple(acks[rank] for rank in range(processes))
+                    all_idle = all(idle for _, _, idle in counts)
+                    if all_idle and counts == last_counts and \
+                            sent + sum(count[0] for count in counts) == sum(count[1] for count in counts):
+                        break
+                    last_counts = counts if all_idle else None
+                    acks = None
+                    start_wave = all_idle
+            if start_wave and acks is None:
+                wave += 1
+                acks = {}
+                for inbox in inboxes:
+                    inbox.put(('probe', wave))
+
+        # trace the path back from the goal
+        offsets_path = []
+        offsets = goal_offsets
+        while offsets is not None:
+            offsets_path.append(offsets)
+            inboxes[spec.zobrist_key(offsets) % processes].put(('trace', offsets))
+            offsets = receive(('parent',))[1]
+        offsets_path.reverse()
+        solution_steps = solvers.path_from_offsets(spec, offsets_path, unit_cost) if offsets_path else []
+
+        stopping = True
+        for inbox in inboxes:
+            inbox.put(('stop',))
+        totals = dict.fromkeys(('expanded', 'generated', 'duplicates', 'reopened', 'peak_frontier', 'closed_size'), 0)
+        for _ in range(processes):
+            for name, value in receive(('stats',))[2].items():
+                totals[name] += value
+        for name, value in totals.items():
+            setattr(stats, name, value)
+    finally:
+        for worker in workers:
+            worker.join(timeout=1)
+            if worker.is_alive():
+                worker.kill()
+                worker.join()
+        for inbox in inboxes:
+            inbox.cancel_join_thread()
+
+    stats.stop()
+    return stats.result(solution_steps)
@@ -0,0 +1,162 @@
+import solvers
+
+# Partial-order pruning with sleep sets (pruning='sleep' of BFS, UCS and A*).
+# Two moves of different pieces are independent when the cells they sweep (from
+# the old to the new position, both included) do not overlap: either order is
+# legal, costs the same and reaches the same state, so only one order needs to
+# be generated. A state carries a sleep set of moves that another, already
+# generated ordering covers; they are skipped before their child is built. When
+# a state expands its k-th move, the child's sleep set is every move of the
+# state's sleep set or of its moves 1..k-1 that is independent of the k-th one.
+# A move is (piece index, new offset, swept cells); the piece of a sleeping move
+# has not moved since it fell asleep (two moves of a piece both sweep its cells,
+# so they are never independent), so the move still applies. Sleep sets are
+# tuples: they are built for every child but rarely compared.
+# With duplicate detection a state may be reached again along an ordering the
+# first one's sleep set relied on, so the sleep set of a state reached again
+# with the same gn (depth for BFS) becomes the intersection of both, and the
+# state is expanded again if it was expanded already with moves now awake.
+# Solutions have the same cost as without pruning.
+
+# Generate the children of a BitboardState that are not asleep, with their sleep sets
+#   sleep: tuple of sleeping moves of the state
+#   slide: a piece moves any free distance (see generate_slide_children)
+#   unit_cost: a slide costs 1, otherwise object.length per cell
+# Returns (children and sleep sets, count of moves skipped)
+def generate_sleep_children(current_state, sleep, slide=False, unit_cost=False):
+    spec = current_state.spec
+    offsets = current_state.offsets
+    occupancy = spec.occupancy(offsets)
+
+    # legal moves: (index, new offset, swept cells, cost)
+    legal = []
+    for index, offset in enumerate(offsets):
+        masks = spec.masks[index]
+        mask = masks[offset]
+        others = occupancy ^ mask
+        length = spec.lengths[index]
+        if slide:
+            for new_offsets_range in (range(offset - 1, -1, -1), range(offset + 1, spec.limits[index] + 1)):
+                sweep = mask
+                for new_offset in new_offsets_range:
+                    if masks[new_offset] & others:
+                        break
+                    sweep |= masks[new_offset]
+                    legal.append((index, new_offset, sweep, 1 if unit_cost else length * abs(new_offset - offset)))
+        else:
+            if offset > 0 and not masks[offset - 1] & others:
+                legal.append((index, offset - 1, mask | masks[offset - 1], length))
+            if offset < spec.limits[index] and not masks[offset + 1] & others:
+                legal.append((index, offset + 1, mask | masks[offset + 1], length))
+
+    children = []
+    skipped = 0
+    asleep = {(index, new_offset) for index, new_offset, _ in sleep}
+    # moves that may sleep in a child: the sleeping ones and those expanded so far
+    candidates = list(sleep)
+    for index, new_offset, sweep, cost in legal:
+        if asleep and (index, new_offset) in asleep:
+            skipped += 1
+            continue
+        zobrist = spec.zobrist[index]
+        new_offsets = offsets[:index] + bytes((new_offset,)) + offsets[index + 1:]
+        child = solvers.BitboardState(spec, new_offsets, current_state.gn + cost, current_state,
+                                      current_state.key ^ zobrist[offsets[index]] ^ zobrist[new_offset])
+        children.append((child, tuple([move for move in candidates if not move[2] & sweep]) if candidates else ()))
+        candidates.append((index, new_offset, sweep))
+
+    return children, skipped
+
+# graph_search with sleep-set pruning (bitboard backend only)
+#   frontier, priority, reopen: as graph_search (priority None: BFS, the depth
+#   of a state stands for its gn)
+#   moves, slide_cost: action model, see create_initial_state
+# Moves skipped while asleep are counted in stats.pruned.
+def sleep_set_search(game_map, frontier, priority=None, moves='step', slide_cost='length', reopen=False,
+                     metrics='counters', progress=None):
+    stats = solvers.SearchStats(metrics, progress)
+    stats.start()
+    timed = stats.timed
+    reporting = stats.reporting
+    clock = solvers.time.perf_counter
+    if timed and priority is not None:
+        priority = stats.timed_priority(priority, 'hashing')
+
+    goal_pos = solvers.get_puzzle_spec(game_map).goal_position
+    initial_state, _ = solvers.create_initial_state(game_map, 'bitboard', moves, slide_cost)
+    slide = moves == 'slide'
+    unit_cost = slide and slide_cost == 'unit'
+
+    expansion = set()
+    best_cost = {initial_state: 0}          # (key: state, value: lowest gn, or depth for BFS)
+    sleeps = {initial_state: ()}            # (key: state, value: sleep set at that gn)
+    frontier.push(initial_state, priority(initial_state, goal_pos) if priority is not None else 0)
+
+    solution_steps = []
+    while frontier:
+        if timed:
+            lap = clock()
+        current_state = frontier.pop()
+        if timed:
+            lap = stats.lap('frontier', lap)
+        if current_state in expansion:
+            continue
+        stats.expanded += 1
+        if reporting and not stats.expanded % solvers.REPORT_INTERVAL:
+            stats.report(len(frontier))
+
+        if current_state.is_goal(goal_pos):
+            temp_state = current_state
+            while temp_state:
+                solution_steps.append(temp_state)
+                temp_state = temp_state.parent
+            solution_steps.reverse()
+            break
+
+        expansion.add(current_state)
+        child_states, skipped = generate_sleep_children(current_state, sleeps[current_state], slide, unit_cost)
+        stats.pruned += skipped
+        if timed:
+            lap = stats.lap('generate', lap)
+        depth = best_cost[current_state] + 1
+        children = []
+        priorities = []
+        for child_state, child_sleep in child_states:
+            stats.generated += 1
+            cost = child_state.gn if priority is not None else depth
+            known_cost = best_cost.get(child_state)
+            if known_cost is None or cost < known_cost:
+                if child_state in expansion:
+                    if not reopen:
+                        stats.duplicates += 1
+                        continue
+                    expansion.discard(child_state)
+                    stats.reopened += 1
+                best_cost[child_state] = cost
+                sleeps[child_state] = child_sleep
+            elif cost == known_cost and not set(sleeps[child_state]).issubset(child_sleep):
+                # reached again along another ordering: wake up the moves it does not cover
+                sleeps[child_state] = tuple(set(sleeps[child_state]).intersection(child_sleep))
+                if child_state not in expansion:
+                    stats.duplicates += 1
+                    continue
+                expansion.discard(child_state)
+                stats.reopened += 1
+            else:
+                stats.duplicates += 1
+                continue
+            if priority is not None:
+                priorities.append(priority(child_state, goal_pos))
+            children.append(child_state)
+        if timed:
+            lap = stats.lap('hashing', lap)
+
+        frontier.push_children(children, priorities or [0] * len(children))
+        if timed:
+            stats.lap('frontier', lap)
+        if len(frontier) > stats.peak_frontier:
+            stats.peak_frontier = len(frontier)
+
+    stats.closed_size = len(expansion)
+    stats.stop()
+    return stats.result(solution_steps)
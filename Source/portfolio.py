@@ -0,0 +1,87 @@
+from multiprocessing.connection import wait
+import time
+import solvers
+from worker import SolveWorker
+
+# Algorithm portfolio: the same map is solved by several algorithms at once,
+# one worker process each (see worker.SolveWorker), and the first result that
+# meets the requested guarantee wins; the other searches are killed.
+#   guarantee: 'any' (first solution found) or 'optimal' (first solution of a
+#              cost-optimal algorithm for the action model, see optimal_algorithms)
+# Every algorithm of the portfolio is complete, so the first "no solution"
+# result ends the race whatever the guarantee.
+# IDA* is left out of the default portfolio: it does not finish Map 4 or Map 9
+# in minutes, and a worker that never wins only takes a CPU from the others.
+PORTFOLIO_ALGORITHMS = ('BFS', 'DFS', 'UCS', 'A*', 'BI-UCS')
+GUARANTEES = ('any', 'optimal')
+
+def optimal_algorithms(moves='step', slide_cost='length'):
+    """Algorithms whose solutions have the lowest cost for an action model."""
+    if moves == 'slide' and slide_cost == 'unit':
+        # every move costs 1: BFS counts moves ('BI-BFS' reports length costs)
+        return {'BFS', 'UCS', 'A*', 'IDA*', 'ARA*'}
+    return {'UCS', 'A*', 'BI-UCS', 'IDA*', 'ARA*'}
+
+def _summary(worker, wall_time):
+    """Comparison record of a finished worker."""
+    if worker.result is None:
+        return {'status': 'error', 'error': worker.error, 'wall_time': wall_time}
+    solution_steps = worker.result.solution_steps
+    return {
+        'status': 'solved' if solution_steps else 'no solution',
+        'path_length': len(solution_steps) - 1 if solution_steps else None,
+        'cost': solution_steps.cost if solution_steps else None,
+        'expanded_nodes': worker.result.expanded_nodes,
+        'search_time': worker.result.search_time,
+        'wall_time': wall_time,
+    }
+
+def portfolio_solve(game_map, algorithms=PORTFOLIO_ALGORITHMS, guarantee='optimal', collect=False, use_cache=True,
+                    **options):
+    """Race algorithms on a map and return the SearchResult of the winner.
+
+    options: solver options of solvers.solve (backend, moves, slide_cost, heuristic, metrics)
+    collect: let every algorithm finish instead of killing the losers
+    use_cache: the workers read and fill the solution cache (see worker.SolveWorker);
+               False when the race is measured
+    The result also has result.algorithm (the winner, None if every algorithm
+    failed) and result.portfolio ({algorithm: comparison record}); search_time
+    is the wall time of the race.
+    """
+    if guarantee not in GUARANTEES:
+        raise ValueError(f"Unknown guarantee: {guarantee}")
+    optimal = optimal_algorithms(options.get('moves', 'step'), options.get('slide_cost', 'length'))
+    start_time = time.perf_counter()
+    workers = {algorithm: SolveWorker(game_map, algorithm, use_cache, **options) for algorithm in algorithms}
+    report = {}
+    winner = None
+    try:
+        pending = dict(workers)
+        while pending and (winner is None or collect):
+            wait([worker.connection for worker in pending.values()] + [worker.process.sentinel for worker in pending.values()])
+            for algorithm, worker in list(pending.items()):
+                if not worker.poll():
+                    continue
+                del pending[algorithm]
+                report[algorithm] = _summary(worker, time.perf_counter() - start_time)
+                result = worker.result
+                if winner is None and result is not None and \
+                        (not result.solution_steps or guarantee == 'any' or algorithm in optimal):
+                    winner = algorithm
+    finally:
+        for worker in workers.values():
+            worker.cancel()
+    for algorithm in algorithms:
+        report.setdefault(algorithm, {'status': 'cancelled'})
+
+    if winner is None:
+        errors = "; ".join(f"{algorithm}: {record.get('error')}" for algorithm, record in report.items())
+        raise RuntimeError(f"Every algorithm of the portfolio failed ({errors})")
+    winning_result = workers[winner].result
+    solution_steps = winning_result.solution_steps.to_states() if winning_result.solution_steps else []
+    result = solvers.SearchResult(solution_steps, winning_result.expanded_nodes, time.perf_counter() - start_time,
+                                  winning_result.peak_memory)
+    result.stats = winning_result.stats
+    result.algorithm = winner
+    result.portfolio = report
+    return result
@@ -0,0 +1,170 @@
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+import hashlib
+import heapq
+import mmap
+import os
+import solvers
+
+# Retrograde distance tables
+# The whole state space reachable from a map's initial state is enumerated once,
+# and the exact cost to the goal of every state is computed by a backward
+# Dijkstra from the goal states. States are ranked by their packed key (the
+# piece offsets, bits_per_piece bits each): the table is a sorted array of
+# keys plus a parallel array of distances, both written to TABLE_CACHE_DIR and
+# memory-mapped, so the optimal next move of any state is a lookup.
+TABLE_VERSION = 1
+TABLE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cache", "retrograde")
+UNREACHABLE = 0xFFFF  # distance of states that cannot reach the goal
+
+class DistanceTable:
+    # Constructor
+    #   moves, slide_cost: action model and cost, see solvers.create_initial_state
+    #   progress: progress(states, frontier_size), called for every state handled
+    #             while the table is built (both passes)
+    def __init__(self, game_map, moves='step', slide_cost='length', progress=None):
+        self.game_map = game_map
+        self.spec = solvers.get_puzzle_spec(game_map)
+        self.moves = moves
+        self.slide_cost = slide_cost
+        _, self._generate_children = solvers.create_initial_state(game_map, 'bitboard', moves, slide_cost)
+        self.bits_per_piece = max(limit.bit_length() for limit in self.spec.limits)
+        if self.bits_per_piece * len(self.spec.ids) > 64:
+            raise ValueError("Map has too many pieces for 64-bit state keys")
+
+        cache_key = hashlib.sha1(repr((tuple(map(tuple, game_map)), moves, slide_cost, TABLE_VERSION)).encode()).hexdigest()
+        self.keys_path = os.path.join(TABLE_CACHE_DIR, f"{cache_key}.keys")
+        self.distances_path = os.path.join(TABLE_CACHE_DIR, f"{cache_key}.dist")
+        if not (os.path.exists(self.keys_path) and os.path.exists(self.distances_path)):
+            self._build(progress)
+        self._open()
+
+    # Pack a tuple/bytes of offsets into an integer key
+    def pack(self, offsets):
+        key = 0
+        for offset in offsets:
+            key = (key << self.bits_per_piece) | offset
+        return key
+
+    def unpack(self, key):
+        offsets = bytearray(len(self.spec.ids))
+        mask = (1 << self.bits_per_piece) - 1
+        for index in range(len(offsets) - 1, -1, -1):
+            offsets[index] = key & mask
+            key >>= self.bits_per_piece
+        return bytes(offsets)
+
+    # Rank of a state in the table (None if it is not reachable from the initial state)
+    def rank(self, offsets):
+        key = self.pack(offsets)
+        rank = bisect_left(self.keys, key)
+        if rank < len(self.keys) and self.keys[rank] == key:
+            return rank
+        return None
+
+    # Exact cost to the goal of a state (None if the goal cannot be reached)
+    def distance(self, offsets):
+        rank = self.rank(offsets)
+        if rank is None or self.distances[rank] == UNREACHABLE:
+            return None
+        return self.distances[rank]
+
+    # Offsets after the optimal next move (None at the goal or if it cannot be reached)
+    def best_move(self, offsets):
+        distance = self.distance(offsets)
+        if not distance:
+            return None
+        for child_state in self._generate_children(solvers.BitboardState(self.spec, bytes(offsets))):
+            child_distance = self.distance(child_state.offsets)
+            if child_distance is not None and child_state.gn + child_distance == distance:
+                return child_state.offsets
+        return None
+
+    # Optimal path (list of offsets) from a state to the goal
+    def optimal_path(self, offsets):
+        if self.distance(offsets) is None:
+            return []
+        path = [bytes(offsets)]
+        while True:
+            next_offsets = self.best_move(path[-1])
+            if next_offsets is None:
+                return path
+            path.append(next_offsets)
+
+    def close(self):
+        self.keys.release()
+        self.distances.release()
+        for memory_map in self._memory_maps:
+            memory_map.close()
+
+    # Enumerate the reachable states, then run the backward Dijkstra on their ranks.
+    # Only the packed keys are kept: the neighbours of a state are generated again
+    # when it is settled (moves are reversible with the same cost), so memory stays
+    # at a few bytes per state instead of holding every edge
+    def _build(self, progress=None):
+        spec = self.spec
+
+        # forward enumeration
+        seen = {self.pack(spec.initial_offsets)}
+        queue = [spec.initial_offsets]
+        while queue:
+            for child_state in self._generate_children(solvers.BitboardState(spec, queue.pop())):
+                key = self.pack(child_state.offsets)
+                if key not in seen:
+                    seen.add(key)
+                    queue.append(child_state.offsets)
+            if progress is not None:
+                progress(len(seen), len(queue))
+        keys = array('Q', sorted(seen))
+        del seen
+        distances = array('H', [UNREACHABLE]) * len(keys)
+
+        # backward Dijkstra from the goal states
+        boat = spec.boat_index
+        frontier = [(0, rank) for rank, key in enumerate(keys)
+                    if spec.masks[boat][self.unpack(key)[boat]] & spec.goal_bit]
+        heapq.heapify(frontier)
+        settled = bytearray(len(keys))
+        settled_count = 0
+        while frontier:
+            distance, rank = heapq.heappop(frontier)
+            if settled[rank]:
+                continue
+            settled[rank] = 1
+            settled_count += 1
+            if distance >= UNREACHABLE:
+                raise ValueError("Distance too large for the 16-bit table")
+            distances[rank] = distance
+            if progress is not None:
+                progress(len(keys) + settled_count, len(frontier))
+            for child_state in self._generate_children(solvers.BitboardState(spec, self.unpack(keys[rank]))):
+                neighbour_rank = bisect_left(keys, self.pack(child_state.offsets))
+                cost = distance + child_state.gn
+                if not settled[neighbour_rank] and cost < distances[neighbour_rank]:
+                    distances[neighbour_rank] = cost
+                    heapq.heappush(frontier, (cost, neighbour_rank))
+
+        os.makedirs(TABLE_CACHE_DIR, exist_ok=True)
+        for path, values in ((self.keys_path, keys), (self.distances_path, distances)):
+            with open(path + '.tmp', 'wb') as file:
+                values.tofile(file)
+            os.replace(path + '.tmp', path)
+
+    def _open(self):
+        self._memory_maps = []
+        views = []
+        for path, typecode in ((self.keys_path, 'Q'), (self.distances_path, 'H')):
+            with open(path, 'rb') as file:
+                memory_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._memory_maps.append(memory_map)
+            views.append(memoryview(memory_map).cast(typecode))
+        self.keys, self.distances = views
+
+# Distance table of a map, built on first use and then loaded from disk
+@lru_cache(maxsize=16)
+def _distance_table(map_tuple, moves, slide_cost):
+    return DistanceTable(map_tuple, moves, slide_cost)
+
+def get_distance_table(game_map, moves='step', slide_cost='length'):
+    return _distance_table(tuple(map(tuple, game_map)), moves, slide_cost)
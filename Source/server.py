@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import sys
+import solvers
+
+# Local solver service: JSON lines over TCP, a Unix socket or stdin/stdout.
+# Every request line is a JSON object
+#   {"id": ..., "map": [[...], ...], "algorithm": "A*", "timeout": 30,
+#    "backend": ..., "moves": ..., "slide_cost": ..., "heuristic": ..., "metrics": ..., "processes": ...,
+#    "pruning": ..., "deadline": ...}
+# ("id" is echoed back, every other field but "map" is optional) and gets one
+# response line, in completion order:
+#   {"id": ..., "ok": true, "solved": ..., "moves": [[object id, direction, distance], ...],
+#    "path_length": ..., "cost": ..., "stats": {...}, "coalesced": ...}
+#   ("bound" is added for 'ARA*': the cost is at most bound times the optimal one)
+#   {"id": ..., "ok": false, "error": "..."}
+# Searches run in a pool of worker processes started once with the server (one
+# search per process at a time), and concurrent requests for the same canonical
+# map, algorithm and options share one search (see solvers.canonical_map). A
+# request that times out gets an error; once no request waits for a search any
+# more, its process is killed and replaced by a fresh one, so abandoned searches
+# do not hold the pool. Like worker.SolveWorker, the processes use the 'spawn'
+# start method and are not daemonic ('HDA*' starts processes of its own).
+# The pool waits for its pipes with the event loop's reader callbacks, not with
+# a thread each: the default executor (a few threads) would otherwise cap the
+# number of searches running at once, and hold a thread per abandoned search
+# until its process is killed.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_TIMEOUT = 60.0
+OPTIONS = ("backend", "moves", "slide_cost", "heuristic", "metrics", "processes", "pruning", "deadline")
+
+def solve_canonical(map_tuple, algorithm, options):
+    """Solve a canonical map in a worker process and return the solution with canonical ids."""
+    result = solvers.solve([list(row) for row in map_tuple], algorithm, **options)
+    if result is None:
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    solution_steps = result.solution_steps
+    solution = {
+        "solved": bool(solution_steps),
+        "moves": solvers.extract_moves(solution_steps),
+        "path_length": len(solution_steps) - 1 if solution_steps else None,
+        "cost": solution_steps[-1].gn if solution_steps else None,
+        "stats": result.stats.as_dict(),
+    }
+    bound = getattr(result, "bound", None)
+    if bound is not None:
+        solution["bound"] = bound if math.isfinite(bound) else None
+    return solution
+
+def _serve_searches(connection):
+    """Entry point of a pool process: answer the searches sent through the pipe, one at a time."""
+    connection.send(('ready', os.getpid()))
+    while True:
+        try:
+            map_tuple, algorithm, options = connection.recv()
+        except EOFError:
+            return
+        try:
+            connection.send(('done', solve_canonical(map_tuple, algorithm, options)))
+        except Exception as error:
+            try:
+                connection.send(('error', error))
+            except Exception:  # an error that cannot be pickled
+                connection.send(('error', RuntimeError(f"{type(error).__name__}: {error}")))
+
+async def _receive(connection):
+    """Next message of a pipe, received once the event loop sees it readable."""
+    loop = asyncio.get_running_loop()
+    readable = loop.create_future()
+
+    def on_readable():
+        if not readable.done():
+            readable.set_result(None)
+    try:
+        loop.add_reader(connection.fileno(), on_readable)
+    except NotImplementedError:  # event loops without reader callbacks (Windows)
+        return await loop.run_in_executor(None, connection.recv)
+    try:
+        await readable
+    finally:
+        loop.remove_reader(connection.fileno())
+    return connection.recv()
+
+class WorkerPool:
+    """Warm worker processes running one search each; a search is cancelled by killing its process."""
+
+    def __init__(self, size):
+        self.context = multiprocessing.get_context('spawn')
+        self.idle = asyncio.Queue()
+        self.processes = set()
+        self.starting = set()  # tasks waiting for a process to be ready
+        for _ in range(size):
+            self._spawn()
+
+    def _spawn(self):
+        """Start a process; it joins the idle ones once it has imported the solvers."""
+        connection, child_connection = self.context.Pipe()
+        process = self.context.Process(target=_serve_searches, args=(child_connection,))
+        process.start()
+        child_connection.close()
+        process.connection = connection
+        self.processes.add(process)
+
+        async def ready():
+            try:
+                await _receive(connection)
+            except (EOFError, OSError):  # killed while starting
+                return
+            self.idle.put_nowait(process)
+        task = asyncio.ensure_future(ready())
+        self.starting.add(task)
+        task.add_done_callback(self.starting.discard)
+
+    def _kill(self, process):
+        self.processes.discard(process)
+        process.kill()
+        process.join()
+
+    async def start(self):
+        """Wait until every process has started."""
+        await asyncio.gather(*self.starting)
+
+    async def run(self, map_tuple, algorithm, options):
+        """Solve in the next idle process; cancelling the call kills and replaces the process."""
+        process = await self.idle.get()
+        try:
+            process.connection.send((map_tuple, algorithm, options))
+            kind, payload = await _receive(process.connection)
+        except asyncio.CancelledError:
+            self._kill(process)
+            self._spawn()
+            raise
+        except (EOFError, OSError):
+            self._kill(process)
+            self._spawn()
+            raise RuntimeError("Solver process exited unexpectedly") from None
+        self.idle.put_nowait(process)
+        if kind == 'error':
+            raise payload
+        return payload
+
+    def close(self):
+        for process in list(self.processes):
+            self._kill(process)
+
+class SolverService:
+    """Warm worker pool with request coalescing and per-request timeouts."""
+
+    def __init__(self, workers=None, timeout=DEFAULT_TIMEOUT):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.pool = None
+        # (canonical map, algorithm, options) -> [task of the running search, requests waiting for it]
+        self.in_flight = {}
+
+    def _pool(self):
+        if self.pool is None:
+            self.pool = WorkerPool(self.workers)
+        return self.pool
+
+    async def start(self):
+        """Start every worker process now instead of on the first requests."""
+        await self._pool().start()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+
+    async def _search(self, map_tuple, algorithm, options, timeout):
+        """(solution, coalesced) of a request; the search is shared with identical running requests
+        and cancelled once every request waiting for it has timed out."""
+        key = (map_tuple, algorithm, tuple(sorted(options.items())))
+        search = self.in_flight.get(key)
+        coalesced = search is not None
+        if search is None:
+            task = asyncio.ensure_future(self._pool().run(map_tuple, algorithm, options))
+            search = self.in_flight[key] = [task, 0]
+
+            def done(_):
+                if self.in_flight.get(key) is search:
+                    del self.in_flight[key]
+                # retrieve the error even when every waiting request timed out
+                if not task.cancelled():
+                    task.exception()
+            task.add_done_callback(done)
+        task = search[0]
+        search[1] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout), coalesced
+        finally:
+            search[1] -= 1
+            if not search[1] and not task.done():
+                # nobody waits for it any more: later identical requests start a new search
+                if self.in_flight.get(key) is search:
+                    del self.in_flight[key]
+                task.cancel()
+
+    async def handle(self, request):
+        """Answer one request (a decoded JSON object) with a response dict."""
+        response = {"id": request.get("id") if isinstance(request, dict) else None}
+        try:
+            if not isinstance(request, dict) or "map" not in request:
+                raise ValueError("A request must be an object with a 'map' field")
+            map_tuple, ids = solvers.canonical_map(request["map"])
+            options = {option: request[option] for option in OPTIONS if option in request}
+            solution, coalesced = await self._search(map_tuple, request.get("algorithm", "A*"), options,
+                                                     request.get("timeout", self.timeout))
+        except asyncio.TimeoutError:
+            response.update({"ok": False, "error": "Timed out"})
+        except Exception as error:
+            response.update({"ok": False, "error": f"{type(error).__name__}: {error}"})
+        else:
+            response.update(solution)
+            response.update({
+                "ok": True,
+                "moves": [[ids[object_id], direction, distance] for object_id, direction, distance in solution["moves"]],
+                "coalesced": coalesced,
+            })
+        return response
+
+    async def handle_line(self, line):
+        """Answer one request line with a response line."""
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            return json.dumps({"id": None, "ok": False, "error": f"Invalid JSON: {error}"}) + "\n"
+        return json.dumps(await self.handle(request)) + "\n"
+
+    async def serve_connection(self, reader, writer):
+        """Answer the request lines of a socket connection concurrently."""
+        async def answer(line):
+            writer.write((await self.handle_line(line)).encode())
+            await writer.drain()
+
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(answer(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve_stdio(self):
+        """Answer the request lines of stdin on stdout until stdin is closed."""
+        loop = asyncio.get_running_loop()
+
+        async def answer(line):
+            sys.stdout.write(await self.handle_line(line))
+            sys.stdout.flush()
+
+        tasks = set()
+        while line := await loop.run_in_executor(None, sys.stdin.readline):
+            if line.strip():
+                task = asyncio.create_task(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+
+async def serve(args):
+    service = SolverService(args.workers, args.timeout)
+    try:
+        await service.start()
+        if args.stdio:
+            await service.serve_stdio()
+            return
+        if args.unix:
+            server = await asyncio.start_unix_server(service.serve_connection, path=args.unix)
+        else:
+            server = await asyncio.start_server(service.serve_connection, args.host, args.port)
+        print(f"Serving on {args.unix or f'{args.host}:{args.port}'} with {service.workers} workers", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the solvers as JSON lines, without the GUI.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--stdio", action="store_true", help="read requests on stdin and answer on stdout")
+    mode.add_argument("--unix", metavar="PATH", help="listen on a Unix socket")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("-t", "--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="default timeout of a request in seconds (default: %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+from array import array
+import solvers
+
+# Compact solution: the initial map plus the moves of the solution, three bytes
+# per move (object id, direction code, distance) in an array. The board after
+# k moves is rebuilt on demand from the nearest checkpoint (piece offsets saved
+# every CHECKPOINT_INTERVAL moves), so a long solution does not keep one full
+# State per step alive. A Solution can be indexed like a list of State
+# (len(solution), solution[k], solution[-1]).
+#
+# Text format (one line per move, so solutions diff cleanly):
+#   rush-hour-solution 1
+#   cost length            (or 'unit': every move costs 1)
+#   map
+#   -1 -1 -1 ...           (one line per map row)
+#   moves
+#   4 down 1               (object id, direction, distance)
+FORMAT_HEADER = "rush-hour-solution 1"
+DIRECTIONS = ('up', 'down', 'left', 'right')
+CHECKPOINT_INTERVAL = 32
+
+class Solution:
+    """Initial map + move list of a solution, with lazy replay of the states."""
+
+    def __init__(self, game_map, moves, unit_cost=False):
+        self.game_map = tuple(map(tuple, game_map))
+        self.unit_cost = unit_cost
+        self.spec = solvers.get_puzzle_spec(game_map)
+        self.moves = array('B')
+        for object_id, direction, distance in moves:
+            if direction not in DIRECTIONS:
+                raise ValueError(f"Unknown direction: {direction}")
+            self.moves.extend((object_id, DIRECTIONS.index(direction), distance))
+        self._replay()
+        self._last_state = None
+
+    @classmethod
+    def from_states(cls, solution_steps, unit_cost=False):
+        """Solution of a solver's path (list of State)."""
+        return cls(solution_steps[0].game_map, solvers.extract_moves(solution_steps), unit_cost)
+
+    def __len__(self):
+        """Number of states (moves + 1), like the list of State of a solver."""
+        return len(self.moves) // 3 + 1
+
+    def __getitem__(self, step):
+        return self.state_at(step)
+
+    @property
+    def cost(self):
+        return self.costs[-1]
+
+    def cost_at(self, step):
+        """Total cost after the first step moves."""
+        return self.costs[step]
+
+    def move(self, index):
+        """(object id, direction, distance) of a move."""
+        object_id, direction, distance = self.moves[3 * index: 3 * index + 3]
+        return object_id, DIRECTIONS[direction], distance
+
+    def iter_moves(self):
+        for index in range(len(self) - 1):
+            yield self.move(index)
+
+    def offsets_at(self, step):
+        """Piece offsets (see solvers.PuzzleSpec) after the first step moves."""
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError("solution step out of range")
+        checkpoint = step // CHECKPOINT_INTERVAL
+        offsets = bytearray(self.checkpoints[checkpoint])
+        for index in range(checkpoint * CHECKPOINT_INTERVAL, step):
+            self._apply(offsets, *self.move(index))
+        return bytes(offsets)
+
+    def state_at(self, step):
+        """State after the first step moves (the last one is kept, so stepping back and forth is cheap)."""
+        if step < 0:
+            step += len(self)
+        if self._last_state is not None and self._last_state[0] == step:
+            return self._last_state[1]
+        state = solvers.State(*self.spec.decode(self.offsets_at(step)), gn=self.costs[step], spec=self.spec)
+        self._last_state = (step, state)
+        return state
+
+    def to_states(self):
+        """Full list of State (with parent pointers), as returned by the solvers."""
+        return solvers.apply_moves(self.game_map, list(self.iter_moves()), self.unit_cost)
+
+    def to_text(self):
+        lines = [FORMAT_HEADER, f"cost {'unit' if self.unit_cost else 'length'}", "map"]
+        lines += [" ".join(str(cell) for cell in row) for row in self.game_map]
+        lines.append("moves")
+        lines += [f"{object_id} {direction} {distance}" for object_id, direction, distance in self.iter_moves()]
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def from_text(cls, text):
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if len(lines) < 4 or lines[0] != FORMAT_HEADER or lines[2] != "map" or "moves" not in lines:
+            raise ValueError("Not a rush-hour-solution file")
+        cost = lines[1].split()
+        if cost[:1] != ["cost"] or cost[1:] not in (["length"], ["unit"]):
+            raise ValueError(f"Invalid cost line: {lines[1]}")
+        moves_line = lines.index("moves")
+        game_map = [[int(cell) for cell in line.split()] for line in lines[3:moves_line]]
+        moves = []
+        for line in lines[moves_line + 1:]:
+            object_id, direction, distance = line.split()
+            moves.append((int(object_id), direction, int(distance)))
+        return cls(game_map, moves, cost[1] == "unit")
+
+    def save(self, path):
+        with open(path, 'w', encoding="utf-8") as file:
+            file.write(self.to_text())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding="utf-8") as file:
+            return cls.from_text(file.read())
+
+    def _apply(self, offsets, object_id, direction, distance):
+        """Apply a move to offsets in place and return the index of the moved piece."""
+        index = self._indices[object_id]
+        offsets[index] += distance if direction in ('down', 'right') else -distance
+        return index
+
+    def _replay(self):
+        """Check every move once and record the checkpoints and the cost of every step."""
+        spec = self.spec
+        self._indices = {object_id: index for index, object_id in enumerate(spec.ids)}
+        offsets = bytearray(spec.initial_offsets)
+        occupancy = spec.occupancy(offsets)
+        self.checkpoints = [bytes(offsets)]
+        self.costs = array('L', [0])
+        for step, (object_id, direction, distance) in enumerate(self.iter_moves(), 1):
+            if object_id not in self._indices:
+                raise ValueError(f"Move {step}: unknown object {object_id}")
+            index = self._indices[object_id]
+            old_offset = offsets[index]
+            if (direction in ('up', 'down')) != (spec.orientations[index] == 0):
+                raise ValueError(f"Move {step}: object {object_id} cannot move {direction}")
+            new_offset = old_offset + (distance if direction in ('down', 'right') else -distance)
+            if distance < 1 or not 0 <= new_offset <= spec.limits[index]:
+                raise ValueError(f"Move {step}: object {object_id} leaves the board")
+            # every cell swept by the piece must be free
+            masks = spec.masks[index]
+            others = occupancy ^ masks[old_offset]
+            swept = 0
+            for offset in range(min(old_offset, new_offset), max(old_offset, new_offset) + 1):
+                swept |= masks[offset]
+            if swept & others:
+                raise ValueError(f"Move {step}: object {object_id} is blocked")
+            offsets[index] = new_offset
+            occupancy = others | masks[new_offset]
+            self.costs.append(self.costs[-1] + (1 if self.unit_cost else spec.lengths[index] * distance))
+            if step % CHECKPOINT_INTERVAL == 0:
+                self.checkpoints.append(bytes(offsets))
@@ -1,5 +1,11 @@
-from collections import deque
+from collections import deque, namedtuple
+from functools import lru_cache, partial
+from itertools import islice
+import hashlib
 import heapq
+import os
+import pickle
+import random
 import time
 import tracemalloc
 
@@ -28,7 +34,7 @@ class Object:
 # State class represents a state in the puzzle
 class State:
     # Constructor
-    def __init__(self, game_map, objects, gn = 0, parent = None):
+    def __init__(self, game_map, objects, gn = 0, parent = None, key = None, spec = None):
         # The puzzle map
         self.game_map = game_map
         # Object array to store all objects in the map
@@ -43,6 +49,14 @@ class State:
         self.parent = parent
         # store the information of the current's state map as unchangable tuple
         self.map_tuple = tuple(map(tuple, self.game_map))
+        # PuzzleSpec of the map (shared with the parent), its zobrist table gives the keys
+        if spec is None:
+            spec = parent.spec if parent is not None else get_puzzle_spec(game_map)
+        self.spec = spec
+        # Zobrist key of the state, updated incrementally by generate_child_state
+        if key is None:
+            key = spec.zobrist_key(spec.encode(objects))
+        self.key = key
         
     # Check if the current state is the goal state
     def is_goal(self, goal_position):
@@ -53,13 +67,13 @@ class State:
     def __lt__(self, other_state):
         return self.fn <  other_state.fn
     
-    # hash current map_tuple for quick look up
+    # hash the Zobrist key for quick look up
     def __hash__(self):
-        return hash(self.map_tuple)
+        return self.key
     
-    # check if 2 map_tuple are equal
+    # check if 2 states are equal (map_tuple only compared on equal keys)
     def __eq__(self, other_state):
-        return self.map_tuple == other_state.map_tuple
+        return self.key == other_state.key and self.map_tuple == other_state.map_tuple
     
     # calculate heuristic function
     # h(n) = number of objects blocking the main object (boat)
@@ -76,7 +90,7 @@ class State:
                         blocking_object.add(self.game_map[row][goal_col])
                 manhattan_distance = goal_row - main_object.max_bound
             else:
-                for row in range(goal_col + 1, main_object.min_bound):
+                for row in range(goal_row + 1, main_object.min_bound):
                     if self.game_map[row][goal_col] > 1:
                         blocking_object.add(self.game_map[row][goal_col])
                 manhattan_distance = main_object.min_bound - goal_row
@@ -101,6 +115,12 @@ class State:
         self.hn = manhattan_distance + len(blocking_object)
         self.fn = self.hn + self.gn
         
+# Zobrist key of the child state where one object moved by delta (-1 or 1)
+# (same keys as BitboardState, from the zobrist table of the state's PuzzleSpec)
+def moved_key(current_state, object, delta):
+    zobrist = current_state.spec.zobrist[current_state.spec.ids.index(object.id)]
+    return current_state.key ^ zobrist[object.min_bound] ^ zobrist[object.min_bound + delta]
+
 # Get objects' information of the initial map
 def get_objects_info(game_map):
     game_map_row_count = len(game_map)
@@ -167,7 +187,7 @@ def generate_child_state(current_state):
                 new_objects[object_id] = Object(object_id, object.length, object.orientation, new_positions)
                 
                 # Add to frontier
-                frontier.append(State(new_game_map, new_objects, current_state.gn + cost, current_state))
+                frontier.append(State(new_game_map, new_objects, current_state.gn + cost, current_state, moved_key(current_state, object, -1)))
                 
             # move down
             if object.max_bound + 1 < game_map_row_count and current_state.game_map[object.max_bound + 1][col] == 0 or current_state.game_map[object.max_bound + 1][col] == -2:
@@ -183,7 +203,7 @@ def generate_child_state(current_state):
                 new_objects[object_id] = Object(object_id, object.length, object.orientation, new_positions)
                 
                 # Add to frontier
-                frontier.append(State(new_game_map, new_objects, current_state.gn + cost, current_state))
+                frontier.append(State(new_game_map, new_objects, current_state.gn + cost, current_state, moved_key(current_state, object, 1)))
         # horizontal case
         else:
             row = list(object.positions)[0][0]
@@ -202,7 +222,7 @@ def generate_child_state(current_state):
                 new_objects[object_id] = Object(object_id, object.length, object.orientation, new_positions)
                 
                 # add to frontier
-                frontier.append(State(new_game_map, new_objects, current_state.gn + cost, current_state))
+                frontier.append(State(new_game_map, new_objects, current_state.gn + cost, current_state, moved_key(current_state, object, -1)))
             
             # move right
             if object.max_bound + 1 < game_map_col_count and current_state.game_map[row][object.max_bound + 1] == 0 or current_state.game_map[row][object.max_bound + 1] == -2:
@@ -218,263 +238,1418 @@ def generate_child_state(current_state):
                 new_objects[object_id] = Object(object_id, object.length, object.orientation, new_positions)
                 
                 # add to frontier
-                frontier.append(State(new_game_map, new_objects, current_state.gn + cost, current_state))
+                frontier.append(State(new_game_map, new_objects, current_state.gn + cost, current_state, moved_key(current_state, object, 1)))
                 
     return frontier
     
-# A-star solver
-def A_star_solver(game_map):
-    # Start tracking search time, memory used, expanded node count
-    tracemalloc.start()
-    start_time = time.time()
-    expanded_nodes = 0
-    
-    # find goal's position
-    goal_pos = (-1, -1)
+# PuzzleSpec class stores the static information of a map, compiled once and
+# shared by every state of a search: walls, gate and each piece's length,
+# orientation and fixed lane. Only the piece offsets change between states.
+# Each cell (row, col) is bit number row * col_count + col of an integer mask.
+class PuzzleSpec:
+    __slots__ = ('map_tuple', 'row_count', 'col_count', 'goal_position', 'goal_bit', 'wall_mask',
+                 'ids', 'lengths', 'orientations', 'lanes', 'steps', 'limits', 'masks',
+                 'zobrist', 'initial_offsets', 'boat_index', 'goal_distances', 'lane_masks')
+
+    # Constructor
+    def __init__(self, game_map):
+        # static map with the pieces removed (walls -1, gate -2, empty 0)
+        self.map_tuple = tuple(tuple(cell if cell < 0 else 0 for cell in row) for row in game_map)
+        self.row_count = len(game_map)
+        self.col_count = len(game_map[0])
+        self.goal_position = find_goal_position(game_map)
+        goal_row, goal_col = self.goal_position
+        self.goal_bit = 1 << (goal_row * self.col_count + goal_col)
+
+        # walls (-1) are always occupied, the gate (-2) is a free cell
+        wall_mask = 0
+        for i in range(self.row_count):
+            for j in range(self.col_count):
+                if game_map[i][j] == -1:
+                    wall_mask |= 1 << (i * self.col_count + j)
+        self.wall_mask = wall_mask
+
+        # per piece data, in the same order as get_objects_info
+        objects = get_objects_info(game_map)
+        lanes = []   # fixed column (vertical) or row (horizontal)
+        steps = []   # shift that moves a piece by one cell
+        limits = []  # largest offset a piece can reach
+        masks = []   # masks[index][offset]: cells of a piece at an offset
+        for object in objects.values():
+            if object.orientation == 0:
+                lane = next(iter(object.positions))[1]
+                step = self.col_count
+                base_mask = sum(1 << (k * self.col_count + lane) for k in range(object.length))
+                limit = self.row_count - object.length
+            else:
+                lane = next(iter(object.positions))[0]
+                step = 1
+                base_mask = ((1 << object.length) - 1) << (lane * self.col_count)
+                limit = self.col_count - object.length
+            lanes.append(lane)
+            steps.append(step)
+            limits.append(limit)
+            masks.append(tuple(base_mask << (offset * step) for offset in range(limit + 1)))
+        self.ids = tuple(objects)
+        self.lengths = tuple(object.length for object in objects.values())
+        self.orientations = tuple(object.orientation for object in objects.values())
+        self.lanes = tuple(lanes)
+        self.steps = tuple(steps)
+        self.limits = tuple(limits)
+        self.masks = tuple(masks)
+        # zobrist[index][offset]: random 64-bit value of a piece at an offset
+        # (fixed seed, so every process agrees on the keys of a map)
+        zobrist_random = random.Random(0x5EED)
+        self.zobrist = tuple(tuple(zobrist_random.getrandbits(64) for _ in range(limit + 1)) for limit in limits)
+        self.initial_offsets = bytes(object.min_bound for object in objects.values())
+
+        # heuristic tables of the boat, indexed by the boat's offset
+        self.boat_index = self.ids.index(1)
+        self.goal_distances, self.lane_masks = self._boat_lane_tables()
+
+    # Precompute manhattan distance and the cells between the boat and the gate
+    # for every offset of the boat (same rule as State.calc_heuristic)
+    def _boat_lane_tables(self):
+        boat = self.boat_index
+        goal_row, goal_col = self.goal_position
+        length = self.lengths[boat]
+        goal_distances = []
+        lane_masks = []
+        for offset in range(self.limits[boat] + 1):
+            min_bound, max_bound = offset, offset + length - 1
+            goal = goal_row if self.orientations[boat] == 0 else goal_col
+            if goal > max_bound:
+                lane = range(max_bound + 1, goal)
+                goal_distances.append(goal - max_bound)
+            else:
+                lane = range(goal + 1, min_bound)
+                goal_distances.append(min_bound - goal)
+
+            lane_mask = 0
+            for k in lane:
+                # vertical case
+                if self.orientations[boat] == 0:
+                    lane_mask |= 1 << (k * self.col_count + goal_col)
+                # horizontal case
+                else:
+                    lane_mask |= 1 << (goal_row * self.col_count + k)
+            lane_masks.append(lane_mask)
+        return tuple(goal_distances), tuple(lane_masks)
+
+    # Occupancy mask (walls and pieces) of a tuple/bytes of offsets
+    def occupancy(self, offsets):
+        occupancy = self.wall_mask
+        masks = self.masks
+        for index, offset in enumerate(offsets):
+            occupancy |= masks[index][offset]
+        return occupancy
+
+    # Zobrist key of a tuple/bytes of offsets
+    def zobrist_key(self, offsets):
+        key = 0
+        zobrist = self.zobrist
+        for index, offset in enumerate(offsets):
+            key ^= zobrist[index][offset]
+        return key
+
+    # Offsets of the objects dict of a State
+    def encode(self, objects):
+        return bytes(objects[object_id].min_bound for object_id in self.ids)
+
+    # Build the initial BitboardState of the map
+    def initial_state(self):
+        return BitboardState(self, self.initial_offsets)
+
+    # Build the initial State (full game_map) of the map
+    def initial_map_state(self):
+        return State(*self.decode(self.initial_offsets), spec=self)
+
+    # Convert piece offsets back to a game_map and an objects dict
+    def decode(self, offsets):
+        game_map = [list(row) for row in self.map_tuple]
+        objects = {}
+        for index, offset in enumerate(offsets):
+            object_id = self.ids[index]
+            positions = []
+            for k in range(offset, offset + self.lengths[index]):
+                row, col = (k, self.lanes[index]) if self.orientations[index] == 0 else (self.lanes[index], k)
+                game_map[row][col] = object_id
+                positions.append((row, col))
+            objects[object_id] = Object(object_id, self.lengths[index], self.orientations[index], positions)
+        return game_map, objects
+
+# Compile (once per map) the PuzzleSpec of a game_map
+@lru_cache(maxsize=64)
+def _compile_puzzle_spec(map_tuple):
+    return PuzzleSpec(map_tuple)
+
+def get_puzzle_spec(game_map):
+    return _compile_puzzle_spec(tuple(map(tuple, game_map)))
+
+# BitboardState class represents a compact state: only the piece offsets are
+# stored (as bytes), everything else is shared through the PuzzleSpec
+class BitboardState:
+    __slots__ = ('spec', 'offsets', 'gn', 'hn', 'fn', 'parent', 'key')
+
+    # Constructor
+    def __init__(self, spec, offsets, gn = 0, parent = None, key = None):
+        # static data of the map
+        self.spec = spec
+        # offset of each piece along its lane
+        self.offsets = offsets
+        self.gn = gn
+        self.hn = 0
+        self.fn = 0
+        self.parent = parent
+        # Zobrist key, updated in O(1) from the parent's key by the child generator
+        self.key = spec.zobrist_key(offsets) if key is None else key
+
+    # occupied cells (walls and pieces)
+    @property
+    def occupancy(self):
+        return self.spec.occupancy(self.offsets)
+
+    # Check if the boat covers the gate
+    def is_goal(self, goal_position):
+        spec = self.spec
+        boat = spec.boat_index
+        return spec.masks[boat][self.offsets[boat]] & spec.goal_bit != 0
+
+    def __lt__(self, other_state):
+        return self.fn < other_state.fn
+
+    def __hash__(self):
+        return self.key
+
+    # offsets are only compared when the keys collide
+    def __eq__(self, other_state):
+        return self.key == other_state.key and self.offsets == other_state.offsets
+
+    # Same heuristic as State.calc_heuristic, computed with masks
+    # unit_cost: every slide costs 1, so the boat's distance only counts as one move
+    def calc_heuristic(self, goal_position, unit_cost = False):
+        spec = self.spec
+        boat = spec.boat_index
+        lane_mask = spec.lane_masks[self.offsets[boat]]
+        blocking_count = 0
+        if lane_mask:
+            for index, offset in enumerate(self.offsets):
+                if index != boat and spec.masks[index][offset] & lane_mask:
+                    blocking_count += 1
+        goal_distance = spec.goal_distances[self.offsets[boat]]
+        if unit_cost:
+            goal_distance = 1 if goal_distance > 0 else 0
+        self.hn = goal_distance + blocking_count
+        self.fn = self.hn + self.gn
+
+    # Materialise a State (game_map + objects) for the GUI
+    def to_state(self, parent = None):
+        game_map, objects = self.spec.decode(self.offsets)
+        return State(game_map, objects, self.gn, parent, spec=self.spec)
+
+# Generate child states of a BitboardState
+# A piece can slide when the cell uncovered by shifting its mask is free
+def generate_bitboard_children(current_state):
+    children = []
+    spec = current_state.spec
+    offsets = current_state.offsets
+    occupancy = spec.occupancy(offsets)
+
+    for index, offset in enumerate(offsets):
+        step = spec.steps[index]
+        mask = spec.masks[index][offset]
+        cost = spec.lengths[index]
+        zobrist = spec.zobrist[index]
+        key = current_state.key ^ zobrist[offset]
+
+        # move up (vertical) / left (horizontal)
+        if offset > 0 and not ((mask >> step) & ~mask & occupancy):
+            new_offsets = offsets[:index] + bytes((offset - 1,)) + offsets[index + 1:]
+            children.append(BitboardState(spec, new_offsets, current_state.gn + cost, current_state, key ^ zobrist[offset - 1]))
+
+        # move down (vertical) / right (horizontal)
+        if offset < spec.limits[index] and not ((mask << step) & ~mask & occupancy):
+            new_offsets = offsets[:index] + bytes((offset + 1,)) + offsets[index + 1:]
+            children.append(BitboardState(spec, new_offsets, current_state.gn + cost, current_state, key ^ zobrist[offset + 1]))
+
+    return children
+
+# Generate child states of a BitboardState where a piece slides any free
+# distance in one move (macro move)
+#   unit_cost: a slide costs 1, otherwise object.length per cell
+def generate_slide_children(current_state, unit_cost = False):
+    children = []
+    spec = current_state.spec
+    offsets = current_state.offsets
+    occupancy = spec.occupancy(offsets)
+
+    for index, offset in enumerate(offsets):
+        masks = spec.masks[index]
+        length = spec.lengths[index]
+        zobrist = spec.zobrist[index]
+        key = current_state.key ^ zobrist[offset]
+        # cells occupied by everything except this piece
+        others = occupancy ^ masks[offset]
+
+        # slide up (vertical) / left (horizontal), then down (vertical) / right (horizontal)
+        for new_offsets_range in (range(offset - 1, -1, -1), range(offset + 1, spec.limits[index] + 1)):
+            for new_offset in new_offsets_range:
+                if masks[new_offset] & others:
+                    break
+                cost = 1 if unit_cost else length * abs(new_offset - offset)
+                new_offsets = offsets[:index] + bytes((new_offset,)) + offsets[index + 1:]
+                children.append(BitboardState(spec, new_offsets, current_state.gn + cost, current_state, key ^ zobrist[new_offset]))
+
+    return children
+
+# Enumerate every goal configuration (boat covering the gate) compatible with
+# the initial pieces: no overlaps, pieces sharing a lane keep their order since
+# they can never pass each other, and every piece stays within the offsets it
+# can reach (see reachable_offset_ranges: immovable pieces keep their offset,
+# the others stay between the walls and locked pieces around them)
+def enumerate_goal_offsets(spec):
+    piece_count = len(spec.ids)
+    ranges = reachable_offset_ranges(spec)
+    # before[index]: pieces that stay before `index` in its lane
+    before = [[] for _ in range(piece_count)]
+    for i in range(piece_count):
+        for j in range(piece_count):
+            if i != j and spec.orientations[i] == spec.orientations[j] and spec.lanes[i] == spec.lanes[j] \
+                    and spec.initial_offsets[i] < spec.initial_offsets[j]:
+                before[j].append(i)
+
+    # candidate offsets of each piece, ignoring the other pieces
+    candidates = []
+    for index, (low, high) in enumerate(ranges):
+        candidates.append([offset for offset in range(low, high + 1)
+                           if index != spec.boat_index or spec.masks[index][offset] & spec.goal_bit])
+
+    # place the boat first, then the other pieces
+    order = [spec.boat_index] + [index for index in range(piece_count) if index != spec.boat_index]
+    offsets = [None] * piece_count
+
+    def fits(index, offset, occupancy):
+        if spec.masks[index][offset] & occupancy:
+            return False
+        # order inside a lane, checked against the pieces placed already
+        for other in before[index]:
+            if offsets[other] is not None and offsets[other] + spec.lengths[other] > offset:
+                return False
+        for other in range(piece_count):
+            if offsets[other] is not None and index in before[other] and offset + spec.lengths[index] > offsets[other]:
+                return False
+        return True
+
+    def place(position, occupancy):
+        if position == piece_count:
+            yield bytes(offsets)
+            return
+        index = order[position]
+        for offset in candidates[index]:
+            if not fits(index, offset, occupancy):
+                continue
+            offsets[index] = offset
+            new_occupancy = occupancy | spec.masks[index][offset]
+            # forward checking: every piece left must still have a place
+            if all(any(fits(other, other_offset, new_occupancy) for other_offset in candidates[other])
+                   for other in order[position + 1:]):
+                yield from place(position + 1, new_occupancy)
+            offsets[index] = None
+
+    yield from place(0, spec.wall_mask)
+
+# (lowest, highest) offset each piece can ever reach from the initial state.
+# Over-approximated by growing the ranges from the initial offsets until they
+# are stable: a piece may enter a cell unless it is a wall or a cell that another
+# piece covers at every offset of its current range. A reachable state has every
+# piece within its range (the piece that moves enters a cell that each other
+# piece leaves free where it stands), so no reachable state is left out; pieces
+# that can never move keep a single offset.
+def reachable_offset_ranges(spec):
+    piece_count = len(spec.ids)
+    low = list(spec.initial_offsets)
+    high = list(spec.initial_offsets)
+    changed = True
+    while changed:
+        changed = False
+        # cells covered by each piece wherever it is in its range
+        always = []
+        for index in range(piece_count):
+            cells = -1
+            for offset in range(low[index], high[index] + 1):
+                cells &= spec.masks[index][offset]
+            always.append(cells)
+        for index in range(piece_count):
+            masks = spec.masks[index]
+            blocked = spec.wall_mask
+            for other in range(piece_count):
+                if other != index:
+                    blocked |= always[other]
+            if low[index] > 0 and not masks[low[index] - 1] & ~masks[low[index]] & blocked:
+                low[index] -= 1
+                changed = True
+            if high[index] < spec.limits[index] and not masks[high[index] + 1] & ~masks[high[index]] & blocked:
+                high[index] += 1
+                changed = True
+    return list(zip(low, high))
+
+# Build a chain of BitboardState from a list of offsets
+#   unit_cost: every move costs 1, otherwise object.length per cell
+def path_from_offsets(spec, offsets_path, unit_cost = False):
+    solution_steps = []
+    parent = None
+    for offsets in offsets_path:
+        gn = 0
+        if parent is not None:
+            for index in range(len(offsets)):
+                if offsets[index] != parent.offsets[index]:
+                    if unit_cost:
+                        gn = parent.gn + 1
+                    else:
+                        gn = parent.gn + spec.lengths[index] * abs(offsets[index] - parent.offsets[index])
+        parent = BitboardState(spec, offsets, gn, parent)
+        solution_steps.append(parent)
+    return solution_steps
+
+# Find the gate (-2) position of a map
+def find_goal_position(game_map):
     for i in range(len(game_map)):
         for j in range(len(game_map[0])):
             if game_map[i][j] == -2:
-                goal_pos = (i, j)
-                break
-        
-        if goal_pos != (-1, -1):
+                return (i, j)
+    return (-1, -1)
+
+# Create the initial state and the child generator of a backend
+#   'map':      State with a full game_map (generate_child_state)
+#   'bitboard': compact BitboardState sharing a PuzzleSpec (generate_bitboard_children)
+# and of an action model (bitboard backend only for slides)
+#   moves:      'step' (one cell per move) or 'slide' (any distance per move)
+#   slide_cost: 'length' (object.length per cell) or 'unit' (1 per slide)
+def create_initial_state(game_map, backend='bitboard', moves='step', slide_cost='length'):
+    spec = get_puzzle_spec(game_map)
+    if moves not in ('step', 'slide'):
+        raise ValueError(f"Unknown action model: {moves}")
+    if backend == 'map':
+        if moves == 'slide':
+            raise ValueError("The 'map' backend only supports moves='step'")
+        return spec.initial_map_state(), generate_child_state
+    elif backend == 'bitboard':
+        if moves == 'slide':
+            return spec.initial_state(), partial(generate_slide_children, unit_cost=slide_cost == 'unit')
+        return spec.initial_state(), generate_bitboard_children
+    raise ValueError(f"Unknown backend: {backend}")
+
+# Convert a solution path of any backend to a list of State
+def to_map_states(solution_steps):
+    map_states = []
+    for step in solution_steps:
+        if isinstance(step, State):
+            map_states.append(step)
+        else:
+            map_states.append(step.to_state(map_states[-1] if map_states else None))
+    return map_states
+
+# Moves of a solution path (list of State): one (object id, direction, distance)
+# per step, direction is 'up'/'down' for vertical objects, 'left'/'right' for
+# horizontal ones and distance is in cells
+def extract_moves(solution_steps):
+    moves = []
+    for previous_state, current_state in zip(solution_steps, solution_steps[1:]):
+        for object_id, object in current_state.objects.items():
+            old_row, old_col = min(previous_state.objects[object_id].positions)
+            new_row, new_col = min(object.positions)
+            if (old_row, old_col) == (new_row, new_col):
+                continue
+            if object.orientation == 0:
+                moves.append((object_id, 'down' if new_row > old_row else 'up', abs(new_row - old_row)))
+            else:
+                moves.append((object_id, 'right' if new_col > old_col else 'left', abs(new_col - old_col)))
             break
-        
-    # Initial step for A-star sover
-    initial_objects = get_objects_info(game_map)
-    intitial_state = State(game_map, initial_objects)
-    intitial_state.calc_heuristic(goal_pos)
-    
-    # Initialize Frontier and Expansion order
-    frontier = [intitial_state]
-    expansion_order = set()
-    frontier_cost = dict()  # (key: current_state, value: cost)
-    frontier_cost[intitial_state] = 0  # Chi phí ban đầu là 0
+    return moves
+
+# Solution path (list of State) of a map from its moves (see extract_moves)
+#   unit_cost: every move costs 1 (moves='slide', slide_cost='unit')
+def apply_moves(game_map, moves, unit_cost = False):
+    spec = get_puzzle_spec(game_map)
+    offsets = bytearray(spec.initial_offsets)
+    offsets_path = [bytes(offsets)]
+    for object_id, direction, distance in moves:
+        offsets[spec.ids.index(object_id)] += distance if direction in ('down', 'right') else -distance
+        offsets_path.append(bytes(offsets))
+    return to_map_states(path_from_offsets(spec, offsets_path, unit_cost))
+
+# Canonical form of a map: the wood logs are renumbered 2, 3, ... in row-major
+# order of their first cell (the boat keeps id 1), so maps that only differ by
+# their ids give the same map tuple
+# Returns (canonical map tuple, {canonical id: original id})
+def canonical_map(game_map):
+    renumber = {1: 1}
+    for row in game_map:
+        for cell in row:
+            if cell > 1 and cell not in renumber:
+                renumber[cell] = len(renumber) + 1
+    canonical = tuple(tuple(renumber.get(cell, cell) for cell in row) for row in game_map)
+    return canonical, {new_id: old_id for old_id, new_id in renumber.items()}
     
-    # Solve
+# Heuristics of A* (bitboard backend), all admissible for the chosen cost:
+#   'blocking': State.calc_heuristic (manhattan distance + number of blockers)
+#   'blockers': blocker graph lower bound (blockers of blockers), see blocker_graph_heuristic
+#   'pdb':      pattern database of the boat and the pieces around its route
+#   'max':      max('blockers', 'pdb')
+HEURISTICS = ('blocking', 'blockers', 'pdb', 'max')
+
+# Blocker graph lower bound on the cost left to solve a state
+# Every piece blocking the boat's route must leave it; when a blocker can only
+# leave in one direction, the pieces in the way of that direction must move too
+# (and so on). Each piece is counted once with the largest distance it must
+# move, so the sum over pieces never overestimates.
+#   unit_cost: every slide costs 1 (moves='slide', slide_cost='unit')
+def blocker_graph_heuristic(state, unit_cost = False):
+    spec = state.spec
+    offsets = state.offsets
+    boat = spec.boat_index
+    goal_distance = spec.goal_distances[offsets[boat]]
+    if goal_distance <= 0:
+        return 0
+
+    masks = spec.masks
+    route = spec.lane_masks[offsets[boat]] | spec.goal_bit
+    queue = []
+    for index, offset in enumerate(offsets):
+        if index != boat and masks[index][offset] & route:
+            queue.append((index, masks[index][offset] & route))
+    required = {}  # (key: piece index, value: cells it must move at least)
+    visited = set()
+    while queue:
+        index, vacate_mask = queue.pop()
+        if (index, vacate_mask) in visited:
+            continue
+        visited.add((index, vacate_mask))
+
+        options = _clearing_options(spec, index, offsets[index], vacate_mask)
+        if not options:
+            continue
+        required[index] = max(required.get(index, 0), min(distance for distance, _ in options))
+        # only one way out: the pieces in the way must move as well
+        if len(options) == 1:
+            swept_mask = options[0][1]
+            for other, offset in enumerate(offsets):
+                if other != index and other != boat and masks[other][offset] & swept_mask:
+                    queue.append((other, masks[other][offset] & swept_mask))
+
+    if unit_cost:
+        return 1 + len(required)
+    hn = spec.lengths[boat] * goal_distance
+    for index, distance in required.items():
+        hn += spec.lengths[index] * distance
+    return hn
+
+# Ways for a piece to free the cells of vacate_mask, ignoring the other pieces:
+# (distance, cells swept) for the nearest free offset on each side of its lane
+@lru_cache(maxsize=None)
+def _clearing_options(spec, index, offset, vacate_mask):
+    masks = spec.masks[index]
+    options = []
+    for direction in (-1, 1):
+        new_offset = offset + direction
+        swept_mask = 0
+        while 0 <= new_offset <= spec.limits[index] and not masks[new_offset] & spec.wall_mask:
+            swept_mask |= masks[new_offset]
+            if not masks[new_offset] & vacate_mask:
+                options.append((abs(new_offset - offset), swept_mask & ~masks[offset]))
+                break
+            new_offset += direction
+    return tuple(options)
+
+# Pattern database: exact cost to the goal in an abstraction of the map that
+# only keeps the boat and the pieces that can cross its route (at most
+# PDB_MAX_PIECES pieces). Removing pieces only makes the puzzle easier, so the
+# cost in the abstraction is an admissible (and consistent) heuristic.
+# Databases are built on first use and cached to PDB_CACHE_DIR, keyed by map content.
+PDB_MAX_PIECES = 6
+PDB_VERSION = 1
+PDB_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cache", "pdb")
+
+class PatternDatabase:
+    # Constructor
+    def __init__(self, game_map, unit_cost = False, max_pieces = PDB_MAX_PIECES):
+        spec = get_puzzle_spec(game_map)
+        self.unit_cost = unit_cost
+        # abstract map with only the selected pieces
+        kept_ids = {spec.ids[index] for index in select_pattern_pieces(spec, max_pieces)}
+        abstract_map = [[cell if cell <= 0 or cell in kept_ids else 0 for cell in row] for row in game_map]
+        self.abstract_spec = PuzzleSpec(abstract_map)
+        # projection of a concrete state's offsets on the abstract pieces
+        self.projection = tuple(spec.ids.index(object_id) for object_id in self.abstract_spec.ids)
+
+        cache_key = hashlib.sha1(repr((tuple(map(tuple, game_map)), unit_cost, max_pieces, PDB_VERSION)).encode()).hexdigest()
+        self.cache_path = os.path.join(PDB_CACHE_DIR, f"{cache_key}.pkl")
+        self.distances = self._load()
+        if self.distances is None:
+            self.distances = self._build()
+            self._save()
+
+    # Cost to the goal of a concrete state (0 if the abstract state cannot reach it)
+    def lookup(self, offsets):
+        return self.distances.get(bytes([offsets[index] for index in self.projection]), 0)
+
+    # Backward Dijkstra from every abstract goal state
+    def _build(self):
+        spec = self.abstract_spec
+        if self.unit_cost:
+            generate_children = partial(generate_slide_children, unit_cost=True)
+        else:
+            generate_children = generate_bitboard_children
+        frontier = [(0, counter, offsets) for counter, offsets in enumerate(enumerate_goal_offsets(spec))]
+        counter = len(frontier)
+        distances = {}
+        while frontier:
+            gn, _, offsets = heapq.heappop(frontier)
+            if offsets in distances:
+                continue
+            distances[offsets] = gn
+            for child_state in generate_children(BitboardState(spec, offsets, gn)):
+                if child_state.offsets not in distances:
+                    counter += 1
+                    heapq.heappush(frontier, (child_state.gn, counter, child_state.offsets))
+        return distances
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'rb') as file:
+                return pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _save(self):
+        try:
+            os.makedirs(PDB_CACHE_DIR, exist_ok=True)
+            with open(self.cache_path, 'wb') as file:
+                pickle.dump(self.distances, file)
+        except OSError:
+            pass
+
+@lru_cache(maxsize=16)
+def _pattern_database(map_tuple, unit_cost):
+    return PatternDatabase(map_tuple, unit_cost)
+
+def get_pattern_database(game_map, unit_cost = False):
+    return _pattern_database(tuple(map(tuple, game_map)), unit_cost)
+
+# Pieces of the pattern database: the boat, then the pieces blocking its route
+# now, then the pieces that can reach the route
+def select_pattern_pieces(spec, max_pieces):
+    boat = spec.boat_index
+    boat_offset = spec.initial_offsets[boat]
+    goal_offsets = [offset for offset in range(spec.limits[boat] + 1) if spec.masks[boat][offset] & spec.goal_bit]
+    route = 0
+    for offset in range(min([boat_offset] + goal_offsets), max([boat_offset] + goal_offsets) + 1):
+        route |= spec.masks[boat][offset]
+
+    blocking, crossing = [], []
+    for index, offset in enumerate(spec.initial_offsets):
+        if index == boat:
+            continue
+        if spec.masks[index][offset] & route:
+            blocking.append(index)
+        elif any(mask & route for mask in spec.masks[index] if not mask & spec.wall_mask):
+            crossing.append(index)
+    return sorted([boat] + (blocking + crossing)[:max_pieces - 1])
+
+# Priority function of A* for a heuristic (see HEURISTICS)
+def make_a_star_priority(game_map, heuristic='blocking', moves='step', slide_cost='length'):
+    unit_cost = moves == 'slide' and slide_cost == 'unit'
+    if heuristic == 'blocking':
+        return a_star_unit_priority if unit_cost else a_star_priority
+    if heuristic not in HEURISTICS:
+        raise ValueError(f"Unknown heuristic: {heuristic}")
+    database = get_pattern_database(game_map, unit_cost) if heuristic in ('pdb', 'max') else None
+
+    def priority(state, goal_position):
+        if heuristic == 'blockers':
+            state.hn = blocker_graph_heuristic(state, unit_cost)
+        elif heuristic == 'pdb':
+            state.hn = database.lookup(state.offsets)
+        else:
+            state.hn = max(blocker_graph_heuristic(state, unit_cost), database.lookup(state.offsets))
+        state.fn = state.gn + state.hn
+        return state.fn
+    return priority
+
+# Run A* with every heuristic on a map and report how many nodes each one expands
+def compare_heuristics(game_map, heuristics=HEURISTICS, moves='step', slide_cost='length'):
+    report = {}
+    for heuristic in heuristics:
+        solution_steps, expanded_nodes, search_time, peak_memory = A_star_solver(game_map, 'bitboard', moves, slide_cost, heuristic, 'off')
+        report[heuristic] = {
+            'expanded_nodes': expanded_nodes,
+            'cost': solution_steps[-1].gn if solution_steps else None,
+            'search_time': search_time,
+        }
+    baseline = report.get('blocking', {}).get('expanded_nodes')
+    for heuristic, row in report.items():
+        row['expanded_ratio'] = row['expanded_nodes'] / baseline if baseline else None
+    return report
+
+# Frontier strategies used by graph_search
+# A frontier needs push(state, priority), pop() and __len__; push_children()
+# and mark_on_push are optional (see graph_search)
+
+# FIFO queue (BFS): a state is marked as seen as soon as it is pushed
+class FIFOFrontier:
+    mark_on_push = True
+
+    def __init__(self):
+        self.queue = deque()
+
+    def push(self, state, priority):
+        self.queue.append(state)
+
+    def push_children(self, children, priorities):
+        self.queue.extend(children)
+
+    def pop(self):
+        return self.queue.popleft()
+
+    def __len__(self):
+        return len(self.queue)
+
+# LIFO stack (DFS): children are pushed in reverse so the first child is expanded first
+class LIFOFrontier:
+    mark_on_push = False
+
+    def __init__(self):
+        self.stack = []
+
+    def push(self, state, priority):
+        self.stack.append(state)
+
+    def push_children(self, children, priorities):
+        self.stack.extend(reversed(children))
+
+    def pop(self):
+        return self.stack.pop()
+
+    def __len__(self):
+        return len(self.stack)
+
+# Binary heap (any priorities): entries are (priority, counter, state) so ties are
+# broken in insertion order without calling State.__lt__
+class HeapFrontier:
+    mark_on_push = False
+
+    def __init__(self):
+        self.heap = []
+        self.counter = 0
+
+    def push(self, state, priority):
+        self.counter += 1
+        heapq.heappush(self.heap, (priority, self.counter, state))
+
+    def push_children(self, children, priorities):
+        for child, priority in zip(children, priorities):
+            self.push(child, priority)
+
+    def pop(self):
+        return heapq.heappop(self.heap)[2]
+
+    def __len__(self):
+        return len(self.heap)
+
+# Bucket queue (UCS, A*) for integer priorities (gn and hn are integers): buckets[f]
+# holds the states of priority f, so push and pop are O(1) and no entry is ever
+# compared. The pop cursor only moves up while the priorities of new states do
+# not go below it (consistent heuristics); otherwise it moves back down.
+#   tie_break: order of the states of one bucket
+#     'h':    lowest hn (= priority - gn) first, newest first among equal hn
+#     'lifo': newest first
+#     'fifo': oldest first
+# Stale entries (a state pushed again with a lower gn, or expanded already) are
+# not removed: they stay in their bucket and graph_search skips them when popped.
+class BucketFrontier:
+    mark_on_push = False
+    TIE_BREAKS = ('h', 'lifo', 'fifo')
+
+    def __init__(self, tie_break='h'):
+        if tie_break not in self.TIE_BREAKS:
+            raise ValueError(f"Unknown tie-break: {tie_break}")
+        self.tie_break = tie_break
+        self.new_bucket = dict if tie_break == 'h' else deque
+        self.buckets = []
+        self.lowest = 0
+        self.size = 0
+
+    def push(self, state, priority):
+        buckets = self.buckets
+        if priority >= len(buckets):
+            buckets.extend(self.new_bucket() for _ in range(priority + 1 - len(buckets)))
+        if self.tie_break == 'h':
+            bucket = buckets[priority]
+            hn = priority - state.gn
+            if hn in bucket:
+                bucket[hn].append(state)
+            else:
+                bucket[hn] = [state]
+        else:
+            buckets[priority].append(state)
+        if priority < self.lowest:
+            self.lowest = priority
+        self.size += 1
+
+    def push_children(self, children, priorities):
+        for child, priority in zip(children, priorities):
+            self.push(child, priority)
+
+    def pop(self):
+        buckets = self.buckets
+        while not buckets[self.lowest]:
+            self.lowest += 1
+        bucket = buckets[self.lowest]
+        self.size -= 1
+        if self.tie_break == 'h':
+            hn = min(bucket)
+            states = bucket[hn]
+            state = states.pop()
+            if not states:
+                del bucket[hn]
+            return state
+        if self.tie_break == 'lifo':
+            return bucket.pop()
+        return bucket.popleft()
+
+    def __len__(self):
+        return self.size
+
+# Priority functions: priority(state, goal_position) -> number (lowest first)
+def ucs_priority(state, goal_position):
+    state.fn = state.gn
+    return state.fn
+
+def a_star_priority(state, goal_position):
+    state.calc_heuristic(goal_position)
+    return state.fn
+
+# A* priority when every slide costs 1 (moves='slide', slide_cost='unit')
+def a_star_unit_priority(state, goal_position):
+    state.calc_heuristic(goal_position, unit_cost=True)
+    return state.fn
+
+# Result of a solver: the 4-tuple (solution_steps, expanded_nodes, search_time, peak_memory)
+# with the SearchStats of the run in result.stats
+class SearchResult(namedtuple('SearchResult', ['solution_steps', 'expanded_nodes', 'search_time', 'peak_memory'])):
+    stats = None
+
+# Instrumentation of a search (metrics argument of the solvers)
+#   'off': search time and node counters only (the counters are plain integer
+#          increments and are always kept)
+#   'counters': also the time spent in each phase of PHASES
+#   'rss': counters plus the growth of the process RSS, sampled every
+#          REPORT_INTERVAL expansions (needs psutil)
+#   'tracemalloc': counters plus the peak of the traced Python allocations; this
+#          hooks every allocation and makes the search several times slower
+# peak_memory (bytes) is None in the 'off' and 'counters' modes.
+# progress: optional callback progress(stats, frontier_size) called every
+# REPORT_INTERVAL expansions, whatever the mode (e.g. to show live counters)
+METRICS = ('off', 'counters', 'rss', 'tracemalloc')
+# move generation, heuristic, duplicate detection (hash lookups), frontier operations
+PHASES = ('generate', 'heuristic', 'hashing', 'frontier')
+REPORT_INTERVAL = 1024
+
+class SearchStats:
+    __slots__ = ('metrics', 'generated', 'duplicates', 'reopened', 'pruned', 'expanded', 'peak_frontier',
+                 'closed_size', 'phase_times', 'search_time', 'peak_memory', 'progress', '_start_time', '_process', '_base_rss')
+
+    def __init__(self, metrics='counters', progress=None):
+        if metrics not in METRICS:
+            raise ValueError(f"Unknown metrics mode: {metrics}")
+        self.metrics = metrics
+        self.generated = 0       # children generated
+        self.duplicates = 0      # children dropped as already seen/expanded
+        self.reopened = 0        # expanded states pushed again with a lower gn
+        self.pruned = 0          # moves skipped by partial-order pruning
+        self.expanded = 0
+        self.peak_frontier = 0
+        self.closed_size = 0
+        self.phase_times = dict.fromkeys(PHASES, 0.0)
+        self.search_time = 0
+        self.peak_memory = None
+        self.progress = progress
+
+    # whether the phases are timed
+    @property
+    def timed(self):
+        return self.metrics != 'off'
+
+    # whether report must be called during the search
+    @property
+    def reporting(self):
+        return self.metrics == 'rss' or self.progress is not None
+
+    def start(self):
+        if self.metrics == 'tracemalloc':
+            tracemalloc.start()
+        elif self.metrics == 'rss':
+            # imported here: only metrics='rss' needs psutil (batch runs must not)
+            try:
+                import psutil
+            except ImportError:
+                raise ImportError("metrics='rss' needs psutil (pip install psutil)") from None
+            self._process = psutil.Process()
+            self._base_rss = self._process.memory_info().rss
+            self.peak_memory = 0
+        self._start_time = time.perf_counter()
+
+    # Add the time elapsed since start to a phase and return the current time
+    def lap(self, phase, start):
+        now = time.perf_counter()
+        self.phase_times[phase] += now - start
+        return now
+
+    # Wrap a priority function so its time counts as 'heuristic'; inside: phase
+    # whose lap also covers the priority calls (its time is taken out of it)
+    def timed_priority(self, priority, inside=None):
+        phase_times = self.phase_times
+        clock = time.perf_counter
+        def timed(state, goal_position):
+            start = clock()
+            value = priority(state, goal_position)
+            elapsed = clock() - start
+            phase_times['heuristic'] += elapsed
+            if inside is not None:
+                phase_times[inside] -= elapsed
+            return value
+        return timed
+
+    def sample_memory(self):
+        self.peak_memory = max(self.peak_memory, self._process.memory_info().rss - self._base_rss)
+
+    # Seconds since start
+    def elapsed(self):
+        return time.perf_counter() - self._start_time
+
+    # Periodic report during the search: RSS sample and progress callback
+    def report(self, frontier_size):
+        if self.metrics == 'rss':
+            self.sample_memory()
+        if self.progress is not None:
+            self.progress(self, frontier_size)
+
+    def stop(self):
+        self.search_time = time.perf_counter() - self._start_time
+        if self.metrics == 'tracemalloc':
+            _, self.peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        elif self.metrics == 'rss':
+            self.sample_memory()
+
+    # SearchResult of the finished search
+    def result(self, solution_steps):
+        result = SearchResult(to_map_states(solution_steps), self.expanded, self.search_time, self.peak_memory)
+        result.stats = self
+        return result
+
+    # Statistics saved by as_dict (not restarted, so 'rss' does not need psutil)
+    @classmethod
+    def from_dict(cls, stats):
+        self = cls()
+        for name, value in stats.items():
+            if name.startswith('time_'):
+                self.phase_times[name[len('time_'):]] = value
+            else:
+                setattr(self, name, value)
+        return self
+
+    # Flat dict of every statistic (phase times as time_<phase>)
+    def as_dict(self):
+        stats = {name: getattr(self, name) for name in ('metrics', 'generated', 'duplicates', 'reopened', 'pruned',
+                                                        'expanded', 'peak_frontier', 'closed_size', 'search_time',
+                                                        'peak_memory')}
+        for phase, phase_time in self.phase_times.items():
+            stats['time_' + phase] = phase_time
+        return stats
+
+# Shared search engine of every solver
+#   frontier: frontier strategy (FIFOFrontier, LIFOFrontier, HeapFrontier, BucketFrontier or a custom one)
+#   priority: priority function, or None for frontiers that ignore priorities
+# Duplicates are handled in one of three ways:
+#   - priority given: a child is pushed only if it is reached with a lower gn than
+#     before (the priority must grow with gn for a given state, like gn + hn)
+#   - frontier.mark_on_push: a child is pushed only the first time it is generated
+#   - otherwise: a child is pushed unless it is expanded already
+# States popped again after being expanded (stale entries) are skipped.
+# reopen: expand a closed state again when it is reached with a better priority
+# (needed for optimal A* with an inconsistent heuristic).
+# backend, moves and slide_cost are passed to create_initial_state.
+# metrics, progress: instrumentation mode and progress callback, see METRICS
+def graph_search(game_map, frontier, priority=None, backend='bitboard', moves='step', slide_cost='length', reopen=False,
+                 metrics='counters', progress=None):
+    # Start tracking search time, memory used, node counters
+    stats = SearchStats(metrics, progress)
+    stats.start()
+    timed = stats.timed
+    reporting = stats.reporting
+    clock = time.perf_counter
+    if timed and priority is not None:
+        priority = stats.timed_priority(priority, 'hashing')
+
+    goal_pos = get_puzzle_spec(game_map).goal_position
+    initial_state, generate_children = create_initial_state(game_map, backend, moves, slide_cost)
+
+    mark_on_push = getattr(frontier, 'mark_on_push', False)
+    expansion = set()
+    seen = {initial_state} if mark_on_push else None
+    best_cost = {initial_state: initial_state.gn}  # (key: state, value: lowest gn pushed)
+    frontier.push(initial_state, priority(initial_state, goal_pos) if priority is not None else 0)
+
     solution_steps = []
-    while frontier != []:
-        # using priority queue to get the state with lowest(fn value) in the Frontier
-        current_state = heapq.heappop(frontier)
-        expanded_nodes += 1
-        
+    while frontier:
+        if timed:
+            lap = clock()
+        current_state = frontier.pop()
+        if timed:
+            lap = stats.lap('frontier', lap)
+        if current_state in expansion:
+            continue
+        stats.expanded += 1
+        if reporting and not stats.expanded % REPORT_INTERVAL:
+            stats.report(len(frontier))
+
         # Check for goal
         if current_state.is_goal(goal_pos):
-            solved_steps = []
             temp_state = current_state
             while temp_state:
-                solved_steps.append(temp_state)
+                solution_steps.append(temp_state)
                 temp_state = temp_state.parent
-            solution_steps = solved_steps[::-1]
+            solution_steps.reverse()
             break
-        
-        # add state to the Expansion order list to avoid revisting
-        expansion_order.add(current_state)
-        
+
+        # add state to the expansion set to avoid revisiting
+        expansion.add(current_state)
+
         # generate child states
-        child_states = generate_child_state(current_state)
+        if timed:
+            child_states = list(generate_children(current_state))
+            lap = stats.lap('generate', lap)
+        else:
+            child_states = generate_children(current_state)
+        children = []
+        priorities = []
         for child_state in child_states:
-            if child_state in expansion_order:
+            stats.generated += 1
+            if child_state in expansion and not reopen:
+                stats.duplicates += 1
                 continue
-            
-            # add to frontier
-            child_state.calc_heuristic(goal_pos)
-            if child_state not in frontier_cost or child_state.fn < frontier_cost[child_state]:
-                # Nếu trạng thái con chưa tồn tại trong frontier, thêm vào
-                frontier_cost[child_state] = child_state.fn
-                heapq.heappush(frontier, child_state)
-    
+            if priority is not None:
+                if child_state in best_cost and best_cost[child_state] <= child_state.gn:
+                    stats.duplicates += 1
+                    continue
+                if child_state in expansion:
+                    expansion.discard(child_state)
+                    stats.reopened += 1
+                best_cost[child_state] = child_state.gn
+                priorities.append(priority(child_state, goal_pos))
+            elif mark_on_push:
+                if child_state in seen:
+                    stats.duplicates += 1
+                    continue
+                seen.add(child_state)
+            children.append(child_state)
+        if timed:
+            lap = stats.lap('hashing', lap)
+
+        if hasattr(frontier, 'push_children'):
+            frontier.push_children(children, priorities or [0] * len(children))
+        else:
+            for child_state, child_priority in zip(children, priorities or [0] * len(children)):
+                frontier.push(child_state, child_priority)
+        if timed:
+            stats.lap('frontier', lap)
+        if len(frontier) > stats.peak_frontier:
+            stats.peak_frontier = len(frontier)
+
     # Calculate search time, memory used
-    search_time = time.time() - start_time
-    _, peak_memory = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
-    
-    # Return result
-    if solution_steps != []:
-        return solution_steps, expanded_nodes, search_time, peak_memory
-    else:
-        return [], expanded_nodes, search_time, peak_memory
-
-def ucs_solver(game_map):
-    # Theo dõi thời gian tìm kiếm, bộ nhớ đã sử dụng
-    start_time = time.time()
-    tracemalloc.start()
-
-    initial_objects = get_objects_info(game_map)
-    initial_state = State(game_map, initial_objects)
-
-    expansion = set()  # Sử dụng set để lưu trạng thái đã mở rộng
-    frontier = [initial_state]  # Sử dụng danh sách để lưu trạng thái trong frontier
-    frontier_cost = dict()  # (key: current_state, value: cost)
-    frontier_cost[initial_state] = 0  # Chi phí ban đầu là 0
-
-    # find goal's position
-    goal_pos = (-1, -1)
-    for i in range(len(game_map)):
-        for j in range(len(game_map[0])):
-            if game_map[i][j] == -2:
-                goal_pos = (i, j)
-                break
-        
-        if goal_pos != (-1, -1):
-            break
+    stats.closed_size = len(expansion)
+    stats.stop()
 
-    solution_steps = []  # Danh sách để lưu các bước giải quyết
-    while frontier:
-        current_state = heapq.heappop(frontier)  # Lấy trạng thái có chi phí thấp nhất
-        frontier_cost.pop(current_state, None)  # Xóa trạng thái khỏi frontier_cost
-        expansion.add(current_state)  # Thêm trạng thái hiện tại vào tập đã mở rộng
+    return stats.result(solution_steps)
 
-        # Check for goal
-        if current_state.is_goal(goal_pos):
-            temp_state = current_state
-            while temp_state:
-                solution_steps.insert(0, temp_state)  # Thêm trạng thái vào đầu danh sách
-                temp_state = temp_state.parent
+# Partial-order pruning of BFS, UCS and A* (see partial_order.py)
+#   'none':  every ordering of independent moves is generated
+#   'sleep': sleep sets skip the orderings another one covers (bitboard backend only)
+PRUNINGS = ('none', 'sleep')
+
+# graph_search, or its sleep-set variant for pruning='sleep'
+def pruned_graph_search(game_map, frontier, priority=None, backend='bitboard', moves='step', slide_cost='length',
+                        reopen=False, pruning='none', metrics='counters', progress=None):
+    if pruning == 'none':
+        return graph_search(game_map, frontier, priority, backend, moves, slide_cost, reopen, metrics, progress)
+    if pruning not in PRUNINGS:
+        raise ValueError(f"Unknown pruning: {pruning}")
+    if backend != 'bitboard':
+        raise ValueError(f"pruning='{pruning}' only supports the 'bitboard' backend")
+    # imported here: partial_order imports solvers
+    import partial_order
+    return partial_order.sleep_set_search(game_map, frontier, priority, moves, slide_cost, reopen, metrics, progress)
+
+# A-star solver
+# heuristic: see HEURISTICS (only 'blocking' works with the 'map' backend)
+def A_star_solver(game_map, backend='bitboard', moves='step', slide_cost='length', heuristic='blocking', metrics='counters', progress=None,
+                  pruning='none'):
+    if backend == 'map' and heuristic != 'blocking':
+        raise ValueError("The 'map' backend only supports heuristic='blocking'")
+    priority = make_a_star_priority(game_map, heuristic, moves, slide_cost)
+    # the blocker graph bound is not always consistent
+    reopen = heuristic in ('blockers', 'max')
+    return pruned_graph_search(game_map, BucketFrontier(), priority, backend, moves, slide_cost, reopen, pruning, metrics,
+                               progress)
+
+def ucs_solver(game_map, backend='bitboard', moves='step', slide_cost='length', metrics='counters', progress=None,
+               pruning='none'):
+    return pruned_graph_search(game_map, BucketFrontier(), ucs_priority, backend, moves, slide_cost, pruning=pruning,
+                               metrics=metrics, progress=progress)
+
+def dfs_solver(game_map, backend='bitboard', moves='step', slide_cost='length', metrics='counters', progress=None):
+    return graph_search(game_map, LIFOFrontier(), None, backend, moves, slide_cost, metrics=metrics, progress=progress)
 
-            break  # Thoát khỏi vòng lặp nếu tìm thấy đích
+# backend='numpy': layer-synchronous BFS on NumPy arrays (see vectorized.py)
+# backend='disk': BFS with the layers in sorted files (see external.py)
+def bfs_solver(game_map, backend='bitboard', moves='step', slide_cost='length', metrics='counters', progress=None,
+               pruning='none'):
+    if backend in ('numpy', 'disk') and pruning != 'none':
+        raise ValueError(f"pruning='{pruning}' only supports the 'bitboard' backend")
+    if backend == 'numpy':
+        # imported here: numpy is optional
+        import vectorized
+        return vectorized.layer_bfs_solver(game_map, moves, slide_cost, metrics, progress)
+    if backend == 'disk':
+        import external
+        return external.external_bfs_solver(game_map, moves, slide_cost, metrics, progress)
+    return pruned_graph_search(game_map, FIFOFrontier(), None, backend, moves, slide_cost, pruning=pruning, metrics=metrics,
+                               progress=progress)
 
-        # Get children states
-        children_states = generate_child_state(current_state)
+# Goal configurations seeded by the backward side of a bidirectional search at most
+# (Map 4, the largest shipped map, has about 95,000)
+MAX_GOAL_SEEDS = 100000
+
+# Bidirectional search
+# Slides are reversible and cost the same both ways, so the backward search is
+# a forward search started at cost 0 from every goal configuration the initial
+# state may reach (see enumerate_goal_offsets).
+#   cost: 'length' (UCS, cost = object.length per cell) or 'unit' (BFS, cost = 1 per move)
+#   moves: 'step' or 'slide', see create_initial_state
+# The side with fewer open states is expanded next. A cheaper solution than the
+# best meeting found so far still has to cross a move between a forward open
+# state and a backward open state, so the search stops when the two lowest open
+# costs plus the cheapest move reach the best meeting cost, and the result is
+# optimal for the chosen cost.
+# Large boards can have millions of goal configurations: past max_seeds of them
+# the backward frontier alone costs more than a whole unidirectional search, so
+# the search falls back to BFS ('unit') or UCS ('length').
+# metrics, progress: instrumentation mode and progress callback, see METRICS
+def bidirectional_solver(game_map, cost='length', moves='step', metrics='counters', progress=None,
+                         max_seeds=MAX_GOAL_SEEDS):
+    stats = SearchStats(metrics, progress)
+    stats.start()
+    timed = stats.timed
+    reporting = stats.reporting
+    clock = time.perf_counter
+
+    spec = get_puzzle_spec(game_map)
+    seeds = list(islice(enumerate_goal_offsets(spec), max_seeds + 1))
+    if len(seeds) > max_seeds:
+        if cost == 'unit':
+            return bfs_solver(game_map, moves=moves, metrics=metrics, progress=progress)
+        return ucs_solver(game_map, moves=moves, metrics=metrics, progress=progress)
+    initial_state, generate_children = create_initial_state(game_map, 'bitboard', moves)
+
+    # [open heap, best state object, expanded set] of each side
+    forward = [[(0, 0, initial_state)], {initial_state: initial_state}, set()]
+    backward = [[], {}, set()]
+    for counter, offsets in enumerate(seeds):
+        goal_state = BitboardState(spec, offsets)
+        backward[0].append((0, counter, goal_state))
+        backward[1][goal_state] = goal_state
+    counter = len(backward[0])
+
+    # cost of the cheapest move
+    epsilon = 1 if cost == 'unit' else min(spec.lengths)
+
+    best_cost = 0 if initial_state in backward[1] else float('inf')
+    meeting_state = initial_state if best_cost == 0 else None
+    while forward[0] and backward[0] and forward[0][0][0] + backward[0][0][0] + epsilon < best_cost:
+        # open states of a side: reached but not expanded (the heaps also hold stale entries)
+        if len(forward[1]) - len(forward[2]) <= len(backward[1]) - len(backward[2]):
+            side, other_side = forward, backward
+        else:
+            side, other_side = backward, forward
+        frontier, best, expansion = side
+        if timed:
+            lap = clock()
+        gn, _, current_state = heapq.heappop(frontier)
+        if timed:
+            lap = stats.lap('frontier', lap)
+        if current_state in expansion:
+            continue
+        expansion.add(current_state)
+        stats.expanded += 1
+        if reporting and not stats.expanded % REPORT_INTERVAL:
+            stats.report(len(forward[0]) + len(backward[0]))
 
-        for child_state in children_states:
+        if timed:
+            child_states = list(generate_children(current_state))
+            lap = stats.lap('generate', lap)
+        else:
+            child_states = generate_children(current_state)
+        children = []
+        for child_state in child_states:
+            stats.generated += 1
             if child_state in expansion:
+                stats.duplicates += 1
                 continue
+            if cost == 'unit':
+                child_state.gn = gn + 1
+            if child_state not in best or child_state.gn < best[child_state].gn:
+                best[child_state] = child_state
+                children.append(child_state)
+                # the two searches meet
+                other_state = other_side[1].get(child_state)
+                if other_state is not None and child_state.gn + other_state.gn < best_cost:
+                    best_cost = child_state.gn + other_state.gn
+                    meeting_state = child_state
+            else:
+                stats.duplicates += 1
+        if timed:
+            lap = stats.lap('hashing', lap)
 
-            child_state.fn = child_state.gn
-            if child_state not in frontier_cost or child_state.fn < frontier_cost[child_state]:
-                # Nếu trạng thái con chưa tồn tại trong frontier, thêm vào
-                frontier_cost[child_state] = child_state.fn
-                heapq.heappush(frontier, child_state)
+        for child_state in children:
+            counter += 1
+            heapq.heappush(frontier, (child_state.gn, counter, child_state))
+        if timed:
+            stats.lap('frontier', lap)
+        if len(forward[0]) + len(backward[0]) > stats.peak_frontier:
+            stats.peak_frontier = len(forward[0]) + len(backward[0])
 
-    # Tính toán thời gian tìm kiếm và bộ nhớ đã sử dụng
-    time_taken = time.time() - start_time
-    _, peak_memory = tracemalloc.get_traced_memory()  # Lấy thông tin bộ nhớ đã sử dụng
-    tracemalloc.stop()
+    # join the forward path (initial state -> meeting state) and the backward
+    # path (meeting state -> goal state)
+    solution_steps = []
+    if meeting_state is not None:
+        offsets_path = []
+        temp_state = forward[1][meeting_state]
+        while temp_state:
+            offsets_path.append(temp_state.offsets)
+            temp_state = temp_state.parent
+        offsets_path.reverse()
+        temp_state = backward[1][meeting_state].parent
+        while temp_state:
+            offsets_path.append(temp_state.offsets)
+            temp_state = temp_state.parent
+        solution_steps = path_from_offsets(spec, offsets_path)
 
-    if not solution_steps:
-        return [], len(expansion), time_taken, peak_memory  # Trả về None nếu không tìm thấy đường đi
+    stats.closed_size = len(forward[2]) + len(backward[2])
+    stats.stop()
 
-    return solution_steps, len(expansion), time_taken, peak_memory
+    return stats.result(solution_steps)
 
-def dfs_solver(game_map):
-    # Bắt đầu đo thời gian và bộ nhớ
-    start_time = time.time()
-    tracemalloc.start()
+# IDA* solver
+# Depth-first iterations with a growing f bound. A single BitboardState is
+# moved in place (make/unmake) instead of allocating a child State, and a
+# fixed-size transposition table (table_size slots, always replaced) remembers
+# for each state, across iterations, the lowest gn it was reached with and a
+# proven lower bound of its cost to the goal, learned when its subtree is
+# searched: h(n) = max(h(n), min over children (cost + h(child))). A searched
+# subtree that failed gets gn + h(n) above the bound, so a state reached again
+# with gn >= its stored gn is only searched once the bound passes gn + h(n):
+# within an iteration it is a transposition, and later iterations skip the
+# subtrees they know are still too expensive.
+# Statistics (metrics, see METRICS): moves are generated in place, so only the
+# heuristic phase is timed; duplicates are transposition table hits,
+# peak_frontier is the deepest path and closed_size the filled table slots.
+IDA_TABLE_SIZE = 1 << 18
 
-    # Tìm goal
-    goal_pos = (-1, -1)
-    for i in range(len(game_map)):
-        for j in range(len(game_map[0])):
-            if game_map[i][j] == -2:
-                goal_pos = (i, j)
-                break
-        if goal_pos != (-1, -1):
-            break
+def ida_star_solver(game_map, heuristic='blocking', moves='step', slide_cost='length', table_size=IDA_TABLE_SIZE,
+                    metrics='counters', progress=None):
+    stats = SearchStats(metrics, progress)
+    stats.start()
+    reporting = stats.reporting
 
-    # Khởi tạo trạng thái ban đầu
-    initial_objects = get_objects_info(game_map)
-    initial_state = State(game_map, initial_objects)
+    spec = get_puzzle_spec(game_map)
+    goal_pos = spec.goal_position
+    priority = make_a_star_priority(game_map, heuristic, moves, slide_cost)
+    if stats.timed:
+        priority = stats.timed_priority(priority)
+    unit_cost = moves == 'slide' and slide_cost == 'unit'
+    slide = moves == 'slide'
 
-    frontier = [initial_state]  # Stack cho DFS
-    expansion = set()
-    solution_steps = []
+    # the state moved in place, its occupancy and the moves made from the root
+    state = BitboardState(spec, bytearray(spec.initial_offsets))
+    occupancy = spec.occupancy(state.offsets)
+    path_moves = []  # (piece index, new offset)
 
-    while frontier:
-        current_state = frontier.pop()
+    # transposition table
+    table_keys = [None] * table_size
+    table_gn = [0] * table_size
+    table_hn = [0] * table_size
 
-        # Goal test
-        if current_state.is_goal(goal_pos):
-            temp = current_state
-            while temp:
-                solution_steps.insert(0, temp)
-                temp = temp.parent
-            break
+    # returns None when a goal is found, else the lowest f above the bound
+    def search(gn, hn, bound):
+        nonlocal occupancy
+        if gn + hn > bound:
+            return gn + hn
+        if state.is_goal(goal_pos):
+            return None
+        stats.expanded += 1
+        if reporting and not stats.expanded % REPORT_INTERVAL:
+            stats.report(len(path_moves))
+        if len(path_moves) > stats.peak_frontier:
+            stats.peak_frontier = len(path_moves)
 
-        if current_state in expansion:
-            continue
-        expansion.add(current_state)
+        offsets = state.offsets
+        next_bound = float('inf')
+        best_child_hn = float('inf')
+        for index in range(len(offsets)):
+            offset = offsets[index]
+            masks = spec.masks[index]
+            zobrist = spec.zobrist[index]
+            others = occupancy ^ masks[offset]
+            for direction in (-1, 1):
+                new_offset = offset + direction
+                while 0 <= new_offset <= spec.limits[index] and not masks[new_offset] & others:
+                    cost = 1 if unit_cost else spec.lengths[index] * abs(new_offset - offset)
+                    child_gn = gn + cost
+                    # make the move
+                    offsets[index] = new_offset
+                    occupancy = others | masks[new_offset]
+                    state.key ^= zobrist[offset] ^ zobrist[new_offset]
+                    state.gn = child_gn
+                    stats.generated += 1
 
-        # Sinh các trạng thái con
-        children = generate_child_state(current_state)
-        for child in reversed(children):  # reversed để duyệt đúng thứ tự
-            if child not in expansion:
-                frontier.append(child)
+                    slot = state.key % table_size
+                    if table_keys[slot] == state.key:
+                        # known state: its stored hn is at least the heuristic
+                        child_hn = table_hn[slot]
+                        duplicate = child_gn >= table_gn[slot]
+                        if not duplicate:
+                            table_gn[slot] = child_gn
+                    else:
+                        priority(state, goal_pos)
+                        child_hn = state.hn
+                        duplicate = False
+                        table_keys[slot] = state.key
+                        table_gn[slot] = child_gn
+                        table_hn[slot] = child_hn
 
-    # Đo thời gian và bộ nhớ
-    time_taken = time.time() - start_time
-    _, peak_memory = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
+                    if child_gn + child_hn > bound:
+                        # above the bound, or reached before from a lower or equal gn
+                        # with a proven hn that is still too high
+                        if duplicate:
+                            stats.duplicates += 1
+                        next_bound = min(next_bound, child_gn + child_hn)
+                    else:
+                        path_moves.append((index, new_offset))
+                        result = search(child_gn, child_hn, bound)
+                        if result is None:
+                            return None
+                        path_moves.pop()
+                        next_bound = min(next_bound, result)
+                        if table_keys[slot] == state.key:
+                            child_hn = table_hn[slot]
+                    best_child_hn = min(best_child_hn, cost + child_hn)
 
-    if not solution_steps:
-        return [], len(expansion), time_taken, peak_memory
+                    # unmake the move
+                    offsets[index] = offset
+                    occupancy = others | masks[offset]
+                    state.key ^= zobrist[offset] ^ zobrist[new_offset]
+                    if not slide:
+                        break
+                    new_offset += direction
 
-    return solution_steps, len(expansion), time_taken, peak_memory
+        # learn a better heuristic value for this state
+        slot = state.key % table_size
+        if table_keys[slot] == state.key:
+            table_hn[slot] = max(table_hn[slot], best_child_hn)
+        return next_bound
 
-def bfs_solver(game_map):
-    tracemalloc.start()
-    start_time = time.time()
-    expanded_nodes = 0
-    
-    # Find goal position 
-    goal_pos = (-1, -1)
-    for i in range(len(game_map)):
-        for j in range(len(game_map[0])):
-            if game_map[i][j] == -2:
-                goal_pos = (i, j)
-                break
-        if goal_pos != (-1, -1):
-            break
-    
-    initial_objects = get_objects_info(game_map)
-    initial_state = State(game_map, initial_objects)
-    
-    frontier = [initial_state]
-    expansion = set()
-    frontier_states = {initial_state}  
-    
+    priority(state, goal_pos)
+    root_slot = state.key % table_size
+    table_keys[root_slot] = state.key
+    table_hn[root_slot] = state.hn
+    # no goal configuration compatible with the initial pieces: nothing to search
+    bound = state.hn if next(enumerate_goal_offsets(spec), None) is not None else float('inf')
     solution_steps = []
-    
-    # BFS main loop 
-    while frontier:
-        # BFS: lấy phần tử đầu tiên (FIFO) 
-        current_state = frontier.pop(0)
-        frontier_states.discard(current_state)
-        expansion.add(current_state)
-        expanded_nodes += 1
-        
-        # Check for goal 
-        if current_state.is_goal(goal_pos):
-            temp_state = current_state
-            while temp_state:
-                solution_steps.insert(0, temp_state)
-                temp_state = temp_state.parent
+    while bound != float('inf'):
+        result = search(0, state.hn, bound)
+        if result is None:
+            offsets = bytearray(spec.initial_offsets)
+            offsets_path = [bytes(offsets)]
+            for index, new_offset in path_moves:
+                offsets[index] = new_offset
+                offsets_path.append(bytes(offsets))
+            solution_steps = path_from_offsets(spec, offsets_path, unit_cost)
             break
-        
-        child_states = generate_child_state(current_state)
-        
-        for child_state in child_states:
-            # Chỉ thêm vào frontier nếu chưa được expand và chưa có trong frontier
-            if child_state not in expansion and child_state not in frontier_states:
-                frontier.append(child_state)
-                frontier_states.add(child_state)
-    
-    # Calculate search time và memory 
-    search_time = time.time() - start_time
-    _, peak_memory = tracemalloc.get_traced_memory()
-    tracemalloc.stop()
+        bound = result
+        state.gn = 0
+        priority(state, goal_pos)
+
+    stats.closed_size = table_size - table_keys.count(None)
+    stats.stop()
+
+    return stats.result(solution_steps)
 
-    if solution_steps:
-        return solution_steps, expanded_nodes, search_time, peak_memory
-    else:
-        return [], expanded_nodes, search_time, peak_memory
+# Version of the solvers' output: bump it when a change alters the solutions or
+# statistics they return (cached solutions of other versions are dropped)
+SOLVER_VERSION = 3
 
-def solve(game_map, algorithm='A*'):
+# backend: 'bitboard' (default) or 'map', see create_initial_state ('BFS' also has
+# 'numpy' and 'disk', see bfs_solver)
+# moves, slide_cost: action model, see create_initial_state ('BI-BFS' always
+# counts moves, 'BI-UCS' always uses object.length per cell)
+# heuristic: heuristic of A* and IDA*, see HEURISTICS
+# metrics: instrumentation mode, see METRICS (the statistics are in result.stats)
+# progress: progress callback, see METRICS (not reported by 'PORTFOLIO')
+# guarantee, collect, use_cache: options of 'PORTFOLIO', which races several
+# algorithms in worker processes, see portfolio.portfolio_solve (use_cache=False
+# when measuring: the workers would otherwise answer from the solution cache)
+# processes: worker processes of 'HDA*' (parallel A*, bitboard backend only), see
+# parallel.hda_star_solver
+# pruning: partial-order pruning of 'BFS', 'UCS' and 'A*', see PRUNINGS
+# deadline, on_solution: options of 'ARA*' (anytime A*, bitboard backend only),
+# which reports improving solutions until the optimal one, see
+# anytime.ara_star_solver
+def solve(game_map, algorithm='A*', backend='bitboard', moves='step', slide_cost='length', heuristic='blocking',
+          metrics='counters', progress=None, guarantee='optimal', collect=False, processes=None, pruning='none',
+          deadline=None, on_solution=None, use_cache=True):
+    if pruning != 'none' and algorithm not in ('A*', 'UCS', 'BFS'):
+        raise ValueError(f"pruning='{pruning}' only applies to BFS, UCS and A*")
     if algorithm == 'A*':
-        return A_star_solver(game_map)
+        return A_star_solver(game_map, backend, moves, slide_cost, heuristic, metrics, progress, pruning)
     elif algorithm == 'UCS':
-        return ucs_solver(game_map)
+        return ucs_solver(game_map, backend, moves, slide_cost, metrics, progress, pruning)
     elif algorithm == 'DFS':
-        return dfs_solver(game_map)
+        return dfs_solver(game_map, backend, moves, slide_cost, metrics, progress)
     elif algorithm == 'BFS':
-        return bfs_solver(game_map)
+        return bfs_solver(game_map, backend, moves, slide_cost, metrics, progress, pruning)
+    elif algorithm == 'BI-BFS':
+        return bidirectional_solver(game_map, 'unit', moves, metrics, progress)
+    elif algorithm == 'BI-UCS':
+        return bidirectional_solver(game_map, 'length', moves, metrics, progress)
+    elif algorithm == 'IDA*':
+        return ida_star_solver(game_map, heuristic, moves, slide_cost, metrics=metrics, progress=progress)
+    elif algorithm == 'HDA*':
+        if backend != 'bitboard':
+            raise ValueError("'HDA*' only supports the 'bitboard' backend")
+        # imported here like portfolio: the workers import solvers themselves
+        import parallel
+        return parallel.hda_star_solver(game_map, heuristic, moves, slide_cost, processes, metrics, progress)
+    elif algorithm == 'ARA*':
+        if backend != 'bitboard':
+            raise ValueError("'ARA*' only supports the 'bitboard' backend")
+        # imported here: anytime imports solvers
+        import anytime
+        return anytime.ara_star_solver(game_map, heuristic, moves, slide_cost, deadline, on_solution, metrics=metrics,
+                                       progress=progress)
+    elif algorithm == 'PORTFOLIO':
+        # imported here: the portfolio workers import solvers themselves
+        import portfolio
+        return portfolio.portfolio_solve(game_map, guarantee=guarantee, collect=collect, use_cache=use_cache,
+                                         backend=backend, moves=moves,
+                                         slide_cost=slide_cost, heuristic=heuristic, metrics=metrics)
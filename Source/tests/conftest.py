@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules of Source import each other by name (import solvers)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
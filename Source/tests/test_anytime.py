@@ -0,0 +1,39 @@
+import json
+import os
+from types import SimpleNamespace
+import pytest
+import anytime
+import solvers
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = [item["data"] for item in json.load(file)]
+
+# A board on which the state popped when the deadline fired was the only open
+# state of an optimal path: left out of the bound, ARA* claimed its 22-cost
+# solution optimal (bound 1) while the optimum is 20
+SMALL_MAP = [[-1, -1, -1, -1, -1, -1, -1],
+             [-1, 0, 0, 0, 0, 6, -1],
+             [-1, 0, 0, 0, 0, 6, -1],
+             [-1, 0, 0, 5, 5, 2, -1],
+             [-1, 4, 0, 3, 0, 2, -1],
+             [-2, 4, 0, 3, 1, 1, -1],
+             [-1, -1, -1, -1, -1, -1, -1]]
+
+@pytest.mark.parametrize("game_map, heuristic, deadlines", [
+    (SMALL_MAP, "pdb", range(1, 200)),
+    (MAPS[2], "blocking", range(1, 3000, 37)),
+    (MAPS[8], "blocking", range(1, 3000, 37)),
+], ids=["small board", "Map 3", "Map 9"])
+def test_bound_holds_whenever_the_deadline_fires(game_map, heuristic, deadlines, monkeypatch):
+    # fake clock: one tick per reading, the deadline is checked before every expansion
+    monkeypatch.setattr(anytime, "DEADLINE_CHECK", 1)
+    optimal = solvers.solve(game_map, "UCS").solution_steps[-1].gn
+    for deadline in deadlines:
+        ticks = iter(range(10 ** 9))
+        monkeypatch.setattr(anytime, "time", SimpleNamespace(perf_counter=lambda: next(ticks)))
+        result = anytime.ara_star_solver(game_map, heuristic=heuristic, deadline=deadline)
+        if result.solution_steps:
+            assert result.solution_steps[-1].gn <= result.bound * optimal + 1e-9, deadline
+            if result.bound == 1:
+                assert result.solution_steps[-1].gn == optimal
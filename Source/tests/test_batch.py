@@ -0,0 +1,18 @@
+import json
+import os
+import batch
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = json.load(file)
+
+def test_records_have_peak_memory_by_default(tmp_path):
+    corpus = tmp_path / "maps.json"
+    corpus.write_text(json.dumps(MAPS[:1]), encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+    batch.main([str(corpus), "-a", "BFS,A*", "-w", "1", "-o", str(output)])
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert {record["algorithm"] for record in records} == {"BFS", "A*"}
+    for record in records:
+        assert record["error"] is None and record["solved"]
+        assert record["peak_memory"] > 0
@@ -0,0 +1,67 @@
+import copy
+from itertools import islice
+import json
+import os
+import random
+import time
+import pytest
+import generator
+import solvers
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = [item["data"] for item in json.load(file)]
+SOLVABLE = [0, 1, 2, 4, 5, 7, 8, 9]  # Map 4 is left out for time, Map 7 has no solution
+
+def reachable_offsets(spec):
+    """Every configuration reachable from the initial state."""
+    seen = {spec.initial_offsets}
+    stack = [spec.initial_offsets]
+    while stack:
+        for child in solvers.generate_bitboard_children(solvers.BitboardState(spec, stack.pop())):
+            if child.offsets not in seen:
+                seen.add(child.offsets)
+                stack.append(child.offsets)
+    return seen
+
+@pytest.mark.parametrize("index", SOLVABLE)
+@pytest.mark.parametrize("bidirectional, unidirectional", [("BI-UCS", "UCS"), ("BI-BFS", "BFS")])
+def test_bidirectional_expands_fewer_states(index, bidirectional, unidirectional):
+    both = solvers.solve(MAPS[index], bidirectional)
+    one = solvers.solve(MAPS[index], unidirectional)
+    assert len(both.solution_steps) == len(one.solution_steps)
+    if bidirectional == "BI-UCS":
+        assert both.solution_steps[-1].gn == one.solution_steps[-1].gn
+    assert both.expanded_nodes < one.expanded_nodes
+
+@pytest.mark.parametrize("index", [1, 4])
+def test_goal_seeds_cover_reachable_goals(index):
+    spec = solvers.get_puzzle_spec(MAPS[index])
+    seeds = set(solvers.enumerate_goal_offsets(spec))
+    reachable = reachable_offsets(spec)
+    goals = {offsets for offsets in reachable
+             if spec.masks[spec.boat_index][offsets[spec.boat_index]] & spec.goal_bit}
+    assert goals <= seeds
+
+def test_walled_off_boat_needs_no_search():
+    # a wall in the boat's lane: no goal state is consistent with the start
+    game_map = copy.deepcopy(MAPS[2])
+    game_map[1][5] = -1
+    assert next(solvers.enumerate_goal_offsets(solvers.get_puzzle_spec(game_map)), None) is None
+    result = solvers.solve(game_map, "BI-UCS")
+    assert not result.solution_steps and result.expanded_nodes == 0
+    assert solvers.solve(game_map, "UCS").expanded_nodes > 0
+
+def test_too_many_goal_seeds_fall_back_to_unidirectional_search():
+    fallback = solvers.bidirectional_solver(MAPS[2], 'length', max_seeds=100)
+    assert fallback.expanded_nodes == solvers.solve(MAPS[2], "UCS").expanded_nodes
+
+def test_seed_enumeration_is_bounded_on_a_large_board():
+    # a generated 8x8 board with 14 pieces has millions of goal configurations
+    board = generator.random_board(8, 14, rng=random.Random(0))
+    spec = solvers.get_puzzle_spec(board)
+    assert len(list(islice(solvers.enumerate_goal_offsets(spec), solvers.MAX_GOAL_SEEDS + 1))) > solvers.MAX_GOAL_SEEDS
+    start_time = time.perf_counter()
+    result = solvers.solve(board, "BI-UCS")
+    assert time.perf_counter() - start_time < 30
+    assert result.solution_steps[-1].gn == solvers.solve(board, "UCS").solution_steps[-1].gn
@@ -0,0 +1,21 @@
+import json
+import os
+from types import SimpleNamespace
+import pytest
+import cache
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = [item["data"] for item in json.load(file)]
+
+def test_entry_without_peak_memory_renders_in_the_gui():
+    gui = pytest.importorskip("gui")
+    store = cache.SolutionCache(":memory:")
+    solved = cache.cached_solve(MAPS[0], "A*", cache=store, metrics='off')
+    assert solved.peak_memory is None and not solved.cached
+    # what GameState.solve does when the map is already in the cache
+    state = gui.GameState(MAPS[0])
+    state._set_result(cache.cached_result(MAPS[0], "A*", cache=store, compact=True))
+    lines = gui.UI._stats_lines(SimpleNamespace(state=state))
+    assert "Memory Used: -" in lines
+    assert f"States Explored: {solved.expanded_nodes:,}" in lines
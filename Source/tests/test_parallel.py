@@ -0,0 +1,23 @@
+import json
+import multiprocessing
+import os
+import threading
+import pytest
+import parallel
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = [item["data"] for item in json.load(file)]
+
+def test_dead_worker_stops_the_search():
+    # a worker killed without a word must not leave the coordinator waiting forever
+    def kill_a_worker():
+        children = multiprocessing.active_children()
+        if children:
+            children[0].kill()
+        else:
+            threading.Timer(0.1, kill_a_worker).start()
+
+    threading.Timer(1.0, kill_a_worker).start()
+    with pytest.raises(RuntimeError, match="exited unexpectedly"):
+        parallel.hda_star_solver(MAPS[3], processes=2)
@@ -0,0 +1,26 @@
+import json
+import os
+import cache
+import portfolio
+import solvers
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = [item["data"] for item in json.load(file)]
+
+def test_portfolio_without_cache_searches():
+    # a planted entry in the shared cache file: workers that read the cache return it
+    shared = cache.get_cache()
+    key, _ = cache.cache_key(MAPS[0], "UCS", {})
+    shared.put(key, {"solved": False, "moves": [], "expanded_nodes": -1, "search_time": 0.0, "peak_memory": None,
+                     "stats": solvers.SearchStats().as_dict()})
+    try:
+        cached = portfolio.portfolio_solve(MAPS[0], algorithms=("UCS",))
+        assert cached.expanded_nodes == -1
+        searched = portfolio.portfolio_solve(MAPS[0], algorithms=("UCS",), use_cache=False)
+        assert searched.expanded_nodes == solvers.solve(MAPS[0], "UCS").expanded_nodes
+        assert searched.solution_steps
+    finally:
+        with shared.lock, shared.connection:
+            shared.memory.pop(key, None)
+            shared.connection.execute("DELETE FROM solutions WHERE key = ?", (key,))
@@ -0,0 +1,34 @@
+import json
+import os
+import time
+import pytest
+import retrograde
+import solvers
+import worker
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = [item["data"] for item in json.load(file)]
+
+@pytest.mark.parametrize("index", [0, 1, 9])
+def test_table_matches_ucs(index, tmp_path, monkeypatch):
+    monkeypatch.setattr(retrograde, "TABLE_CACHE_DIR", str(tmp_path))
+    table = retrograde.DistanceTable(MAPS[index])
+    spec = table.spec
+    result = solvers.solve(MAPS[index], "UCS")
+    assert table.distance(spec.initial_offsets) == result.solution_steps[-1].gn
+    # following best_move from the start is an optimal solution
+    path = table.optimal_path(spec.initial_offsets)
+    assert len(path) >= 2 and table.distance(path[-1]) == 0
+    assert table.best_move(path[-1]) is None
+
+def test_table_worker_builds_in_a_process():
+    # the GUI polls the worker every frame, the table is then loaded from its cache files
+    table_worker = worker.TableWorker(MAPS[1])
+    deadline = time.monotonic() + 120
+    while not table_worker.poll():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert table_worker.error is None
+    table = table_worker.result
+    assert table.distance(table.spec.initial_offsets) == solvers.solve(MAPS[1], "UCS").solution_steps[-1].gn
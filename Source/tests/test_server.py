@@ -0,0 +1,59 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import time
+import server
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = [item["data"] for item in json.load(file)]
+
+def test_timed_out_search_frees_its_worker():
+    # IDA* takes minutes on Map 4: with a single worker, the next request only
+    # gets an answer if the abandoned search was killed
+    async def scenario():
+        service = server.SolverService(workers=1)
+        try:
+            await service.start()
+            slow = await service.handle({"id": 1, "map": MAPS[3], "algorithm": "IDA*", "timeout": 0.5})
+            assert slow == {"id": 1, "ok": False, "error": "Timed out"}
+            start_time = time.perf_counter()
+            fast = await service.handle({"id": 2, "map": MAPS[0], "algorithm": "A*", "timeout": 10})
+            assert fast["ok"] and fast["solved"] and fast["cost"] == 29
+            assert time.perf_counter() - start_time < 10
+            assert not service.in_flight
+        finally:
+            service.close()
+    asyncio.run(scenario())
+
+def test_search_runs_while_a_request_waits_for_it():
+    async def scenario():
+        service = server.SolverService(workers=1)
+        try:
+            await service.start()
+            request = {"map": MAPS[1], "algorithm": "A*"}
+            impatient, patient = await asyncio.gather(service.handle({**request, "id": 1, "timeout": 0}),
+                                                      service.handle({**request, "id": 2, "timeout": 10}))
+            assert impatient["error"] == "Timed out"
+            assert patient["ok"] and patient["coalesced"] and patient["cost"] == 60
+        finally:
+            service.close()
+    asyncio.run(scenario())
+
+def test_waiting_searches_do_not_take_executor_threads():
+    # with a single executor thread, a search waited for in that thread would
+    # keep the answer of every other search waiting until it ends
+    async def scenario():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+        service = server.SolverService(workers=2)
+        try:
+            await service.start()
+            slow, fast = await asyncio.gather(
+                service.handle({"id": 1, "map": MAPS[3], "algorithm": "IDA*", "timeout": 6}),
+                service.handle({"id": 2, "map": MAPS[0], "algorithm": "A*", "timeout": 3}))
+            assert slow == {"id": 1, "ok": False, "error": "Timed out"}
+            assert fast["ok"] and fast["cost"] == 29
+        finally:
+            service.close()
+    asyncio.run(scenario())
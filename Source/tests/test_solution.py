@@ -0,0 +1,48 @@
+import json
+import os
+import pytest
+import solvers
+from solution import Solution
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = [item["data"] for item in json.load(file)]
+
+def solver_path(index, moves='step', slide_cost='length'):
+    return solvers.solve(MAPS[index], 'UCS', moves=moves, slide_cost=slide_cost, metrics='off').solution_steps
+
+@pytest.mark.parametrize("index", [0, 1, 2, 9])
+def test_replay_matches_the_solver_path(index):
+    solution_steps = solver_path(index)
+    solution = Solution.from_states(solution_steps)
+    assert len(solution) == len(solution_steps)
+    assert solution.cost == solution_steps[-1].gn
+    # read backwards, so every state is rebuilt from its checkpoint
+    for step in reversed(range(len(solution))):
+        assert solution[step].map_tuple == solution_steps[step].map_tuple
+        assert solution.cost_at(step) == solution_steps[step].gn
+    assert [state.map_tuple for state in solution.to_states()] == [state.map_tuple for state in solution_steps]
+
+@pytest.mark.parametrize("moves, slide_cost", [("step", "length"), ("slide", "length"), ("slide", "unit")])
+def test_text_round_trip(moves, slide_cost, tmp_path):
+    unit_cost = moves == 'slide' and slide_cost == 'unit'
+    solution_steps = solver_path(1, moves, slide_cost)
+    solution = Solution.from_states(solution_steps, unit_cost)
+    decoded = Solution.from_text(solution.to_text())
+    assert decoded.game_map == solution.game_map
+    assert decoded.unit_cost == unit_cost
+    assert list(decoded.iter_moves()) == solvers.extract_moves(solution_steps)
+    assert decoded.cost == solution_steps[-1].gn
+    path = tmp_path / "solution.txt"
+    solution.save(path)
+    assert Solution.load(path).to_text() == solution.to_text()
+
+def test_invalid_moves_are_rejected():
+    solution = Solution.from_states(solver_path(0))
+    object_id, direction, distance = solution.move(0)
+    with pytest.raises(ValueError):
+        Solution(MAPS[0], [(object_id, "sideways", distance)])
+    with pytest.raises(ValueError):
+        Solution(MAPS[0], [(max(solution.spec.ids) + 1, direction, distance)])
+    with pytest.raises(ValueError):
+        Solution.from_text("not a solution\n")
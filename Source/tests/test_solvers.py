@@ -0,0 +1,166 @@
+import json
+import os
+from functools import lru_cache
+import pytest
+import retrograde
+import solvers
+
+MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = [item["data"] for item in json.load(file)]
+
+# Every variant of an optimal solver must find the cost of plain UCS on every
+# shipped map, and every BFS variant the fewest moves. Map 7 has no solution;
+# Map 4 and Map 9 take seconds per search and only run with the cheaper variants.
+SMALL_MAPS = [0, 1, 2, 4, 5, 7, 9]
+UNSOLVABLE_MAP = 6
+LARGE_MAPS = [3, 8]
+
+@lru_cache(maxsize=None)
+def reference(index, moves='step', slide_cost='length'):
+    """Cost of plain UCS, or None without a solution."""
+    solution_steps = solvers.solve(MAPS[index], 'UCS', moves=moves, slide_cost=slide_cost, metrics='off').solution_steps
+    return solution_steps[-1].gn if solution_steps else None
+
+def cost_of(result):
+    return result.solution_steps[-1].gn if result.solution_steps else None
+
+def path_length_of(result):
+    return len(result.solution_steps) - 1 if result.solution_steps else None
+
+OPTIMAL_VARIANTS = {
+    "A*": ("A*", {}),
+    "A* map backend": ("A*", {"backend": "map"}),
+    "A* blockers": ("A*", {"heuristic": "blockers"}),
+    "A* pdb": ("A*", {"heuristic": "pdb"}),
+    "A* max": ("A*", {"heuristic": "max"}),
+    "A* sleep sets": ("A*", {"pruning": "sleep"}),
+    "UCS map backend": ("UCS", {"backend": "map"}),
+    "UCS sleep sets": ("UCS", {"pruning": "sleep"}),
+}
+LARGE_MAP_VARIANTS = ("A*", "A* pdb", "A* sleep sets")
+
+@pytest.mark.parametrize("index", SMALL_MAPS + [UNSOLVABLE_MAP])
+@pytest.mark.parametrize("variant", OPTIMAL_VARIANTS)
+def test_optimal_variants_match_ucs(variant, index):
+    algorithm, options = OPTIMAL_VARIANTS[variant]
+    assert cost_of(solvers.solve(MAPS[index], algorithm, metrics='off', **options)) == reference(index)
+
+@pytest.mark.parametrize("index", LARGE_MAPS)
+@pytest.mark.parametrize("variant", LARGE_MAP_VARIANTS)
+def test_optimal_variants_match_ucs_on_large_maps(variant, index):
+    algorithm, options = OPTIMAL_VARIANTS[variant]
+    assert cost_of(solvers.solve(MAPS[index], algorithm, metrics='off', **options)) == reference(index)
+
+BFS_VARIANTS = {
+    "bitboard": {},
+    "map backend": {"backend": "map"},
+    "numpy": {"backend": "numpy"},
+    "disk": {"backend": "disk"},
+    "sleep sets": {"pruning": "sleep"},
+}
+
+@pytest.mark.parametrize("index", SMALL_MAPS + [UNSOLVABLE_MAP])
+@pytest.mark.parametrize("variant", BFS_VARIANTS)
+def test_bfs_variants_find_the_fewest_moves(variant, index):
+    if variant == "numpy":
+        pytest.importorskip("numpy")
+    # reference: breadth-first search from both ends
+    expected = solvers.solve(MAPS[index], 'BI-BFS', metrics='off')
+    result = solvers.solve(MAPS[index], 'BFS', metrics='off', **BFS_VARIANTS[variant])
+    assert path_length_of(result) == path_length_of(expected)
+
+@pytest.mark.parametrize("index", SMALL_MAPS)
+def test_bitboard_children_match_map_children(index):
+    # both backends generate the same boards with the same costs along a solution
+    # (but the goal, which no search expands)
+    spec = solvers.get_puzzle_spec(MAPS[index])
+    for state in solvers.solve(MAPS[index], 'UCS', backend='map', metrics='off').solution_steps[:-1]:
+        bitboard_state = solvers.BitboardState(spec, spec.encode(state.objects), state.gn)
+        map_children = {(child.map_tuple, child.gn) for child in solvers.generate_child_state(state)}
+        bitboard_children = {(tuple(map(tuple, spec.decode(child.offsets)[0])), child.gn)
+                             for child in solvers.generate_bitboard_children(bitboard_state)}
+        assert bitboard_children == map_children
+
+@pytest.mark.parametrize("index", SMALL_MAPS + [UNSOLVABLE_MAP] + LARGE_MAPS)
+def test_puzzle_spec_round_trip(index):
+    spec = solvers.get_puzzle_spec(MAPS[index])
+    assert spec is solvers.get_puzzle_spec([list(row) for row in MAPS[index]])
+    game_map, objects = spec.decode(spec.initial_offsets)
+    assert game_map == MAPS[index]
+    assert spec.encode(objects) == spec.initial_offsets
+    for child in solvers.generate_bitboard_children(spec.initial_state()):
+        assert spec.encode(spec.decode(child.offsets)[1]) == child.offsets
+        assert child.key == spec.zobrist_key(child.offsets)
+
+FRONTIERS = {
+    "heap": (solvers.HeapFrontier, solvers.ucs_priority),
+    "heap A*": (solvers.HeapFrontier, solvers.a_star_priority),
+}
+
+@pytest.mark.parametrize("index", SMALL_MAPS + [UNSOLVABLE_MAP])
+@pytest.mark.parametrize("frontier", FRONTIERS)
+def test_frontiers_share_one_search_core(frontier, index):
+    frontier_class, priority = FRONTIERS[frontier]
+    assert cost_of(solvers.graph_search(MAPS[index], frontier_class(), priority, metrics='off')) == reference(index)
+    # the unordered frontiers: FIFO finds the fewest moves, LIFO any solution
+    fifo = solvers.graph_search(MAPS[index], solvers.FIFOFrontier(), metrics='off')
+    assert path_length_of(fifo) == path_length_of(solvers.solve(MAPS[index], 'BFS', metrics='off'))
+    lifo = solvers.graph_search(MAPS[index], solvers.LIFOFrontier(), metrics='off')
+    assert bool(lifo.solution_steps) == (reference(index) is not None)
+
+SLIDE_VARIANTS = {
+    "A*": {},
+    "A* pdb": {"heuristic": "pdb"},
+    "A* sleep sets": {"pruning": "sleep"},
+}
+
+@pytest.mark.parametrize("index", SMALL_MAPS)
+@pytest.mark.parametrize("slide_cost", ["length", "unit"])
+def test_slide_moves(index, slide_cost):
+    expected = reference(index, 'slide', slide_cost)
+    for variant, options in SLIDE_VARIANTS.items():
+        result = solvers.solve(MAPS[index], 'A*', moves='slide', slide_cost=slide_cost, metrics='off', **options)
+        assert cost_of(result) == expected, variant
+    if slide_cost == 'unit':
+        # every slide costs 1: BFS finds the optimal cost too
+        assert path_length_of(solvers.solve(MAPS[index], 'BFS', moves='slide', metrics='off')) == expected
+    else:
+        # a slide costs as much as its steps
+        assert expected == reference(index)
+
+# Admissibility: h never exceeds the exact cost to the goal (retrograde table) on
+# a sample of the reachable states of the small maps
+ADMISSIBILITY_MAPS = [0, 1, 2]
+ADMISSIBILITY_SAMPLE = 2000
+
+@pytest.mark.parametrize("moves, slide_cost", [("step", "length"), ("slide", "length"), ("slide", "unit")])
+@pytest.mark.parametrize("index", ADMISSIBILITY_MAPS)
+def test_heuristics_are_admissible(index, moves, slide_cost, tmp_path, monkeypatch):
+    monkeypatch.setattr(retrograde, "TABLE_CACHE_DIR", str(tmp_path))
+    table = retrograde.DistanceTable(MAPS[index], moves, slide_cost)
+    spec = table.spec
+    step = max(1, len(table.keys) // ADMISSIBILITY_SAMPLE)
+    samples = [table.unpack(table.keys[rank]) for rank in range(0, len(table.keys), step)]
+    checked = 0
+    try:
+        for heuristic in solvers.HEURISTICS:
+            priority = solvers.make_a_star_priority(MAPS[index], heuristic, moves, slide_cost)
+            for offsets in samples:
+                distance = table.distance(offsets)
+                if distance is None:
+                    continue
+                # gn is 0: the priority is hn
+                assert priority(solvers.BitboardState(spec, offsets), spec.goal_position) <= distance, heuristic
+                checked += 1
+    finally:
+        table.close()
+    assert checked
+
+@pytest.mark.parametrize("tie_break", solvers.BucketFrontier.TIE_BREAKS)
+@pytest.mark.parametrize("index", SMALL_MAPS)
+def test_bucket_tie_breaks_keep_the_optimal_cost(index, tie_break):
+    # the order within a bucket changes which optimal path is found, never its cost
+    for priority in (solvers.ucs_priority, solvers.a_star_priority):
+        result = solvers.graph_search(MAPS[index], solvers.BucketFrontier(tie_break), priority, metrics='off')
+        assert cost_of(result) == reference(index)
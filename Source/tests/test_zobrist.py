@@ -0,0 +1,24 @@
+import json
+import os
+import subprocess
+import sys
+import solvers
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAP_PATH = os.path.join(SOURCE_DIR, "Map", "maps.txt")
+with open(MAP_PATH, encoding="utf-8") as file:
+    MAPS = [item["data"] for item in json.load(file)]
+
+def test_zobrist_keys_are_shared_by_both_backends():
+    spec = solvers.get_puzzle_spec(MAPS[2])
+    state = spec.initial_map_state()
+    for child in solvers.generate_child_state(state):
+        assert child.key == spec.zobrist_key(spec.encode(child.objects))
+    assert state.key == spec.initial_state().key
+
+def test_zobrist_keys_are_reproducible_across_processes():
+    # HDA* sends a state to the process that owns its key: every process must agree
+    script = ("import json, solvers; maps = [item['data'] for item in json.load(open('Map/maps.txt'))]; "
+              "print([solvers.get_puzzle_spec(m).initial_state().key for m in maps])")
+    output = subprocess.run([sys.executable, "-c", script], cwd=SOURCE_DIR, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == str([solvers.get_puzzle_spec(m).initial_state().key for m in MAPS])
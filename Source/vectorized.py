@@ -0,0 +1,176 @@
+try:
+    import numpy as np
+except ImportError:  # only needed by backend='numpy'
+    np = None
+import solvers
+
+# Layer-synchronous BFS on NumPy arrays (backend='numpy' of bfs_solver).
+# A layer is an array with one row of piece offsets per state (see
+# solvers.PuzzleSpec), and the whole layer is expanded at once: for each piece
+# and direction the legal moves of every state are found with vectorised
+# lookups of the cell the piece slides into, in the occupancy bitboards of the
+# layer (one or more 64-bit words per state). States are deduplicated on an
+# integer key (the offsets packed in 64 bits, or the raw row bytes when they do
+# not fit) with np.unique. Moves are reversible, so a child of a state at depth
+# d is at depth d - 1, d or d + 1: only the previous layer and the current one
+# are searched (np.searchsorted on their sorted keys), never a visited set.
+# Every layer keeps the index of each state's parent in the previous layer, and
+# the path is rebuilt from the goal through these indices.
+
+def _words(mask, word_count):
+    """A bitboard split into 64-bit words."""
+    return [(mask >> (64 * word)) & 0xFFFFFFFFFFFFFFFF for word in range(word_count)]
+
+class LayerEncoding:
+    """Static NumPy tables of a map for the layered BFS."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        piece_count = len(spec.ids)
+        self.word_count = word_count = (spec.row_count * spec.col_count + 63) // 64
+        self.wall = np.array(_words(spec.wall_mask, word_count), dtype=np.uint64)
+        # masks[index][offset]: occupancy words of a piece at an offset
+        self.masks = [np.array([_words(mask, word_count) for mask in spec.masks[index]], dtype=np.uint64)
+                      for index in range(piece_count)]
+        # entering[index][direction][offset]: (word, bit) of the cell a piece
+        # slides into when it moves one cell from offset (direction 0: towards
+        # offset 0, direction 1: away from it); unused entries are 0
+        self.entering = []
+        for index in range(piece_count):
+            masks = spec.masks[index]
+            tables = []
+            for delta in (-1, 1):
+                words = np.zeros(len(masks), dtype=np.intp)
+                bits = np.zeros(len(masks), dtype=np.uint64)
+                for offset in range(len(masks)):
+                    if 0 <= offset + delta < len(masks):
+                        cell = (masks[offset + delta] & ~masks[offset]).bit_length() - 1
+                        words[offset], bits[offset] = cell // 64, 1 << (cell % 64)
+                tables.append((words, bits))
+            self.entering.append(tables)
+        boat = spec.boat_index
+        self.goal_offsets = np.array([bool(mask & spec.goal_bit) for mask in spec.masks[boat]])
+        # packed keys: each offset gets the bits of its largest value
+        widths = [max(1, limit.bit_length()) for limit in spec.limits]
+        self.packed = sum(widths) <= 64
+        self.shifts = np.array([sum(widths[:index]) for index in range(piece_count)], dtype=np.uint64)
+        self.offset_masks = np.array([(1 << width) - 1 for width in widths], dtype=np.uint64)
+        self.key_dtype = np.dtype(np.uint64) if self.packed else np.dtype((np.void, piece_count))
+
+    def occupancy(self, layer):
+        """Occupancy words (one row per state) of a layer."""
+        occupancy = np.tile(self.wall, (len(layer), 1))
+        for index, masks in enumerate(self.masks):
+            occupancy |= masks[layer[:, index]]
+        return occupancy
+
+    def keys(self, layer):
+        """Sortable key of every state of a layer."""
+        if self.packed:
+            return (layer.astype(np.uint64) << self.shifts).sum(axis=1, dtype=np.uint64)
+        return np.ascontiguousarray(layer).view(self.key_dtype).ravel()
+
+    def rows(self, keys):
+        """Layer (one row of offsets per state) of an array of keys."""
+        if self.packed:
+            return ((keys[:, None] >> self.shifts) & self.offset_masks).astype(np.uint8)
+        return np.ascontiguousarray(keys).view(np.uint8).reshape(len(keys), -1)
+
+    def children(self, layer, slide=False):
+        """(child rows, parent indices) of every move of every state of a layer."""
+        occupancy = self.occupancy(layer)
+        rows = np.arange(len(layer))
+        child_blocks = []
+        parent_blocks = []
+        for index in range(layer.shape[1]):
+            limit = self.spec.limits[index]
+            for direction, delta in enumerate((-1, 1)):
+                words, bits = self.entering[index][direction]
+                # states that can still move, and the offset they have reached
+                parents = rows
+                offsets = layer[:, index].astype(np.intp)
+                while len(parents):
+                    inside = offsets + delta >= 0 if delta < 0 else offsets + delta <= limit
+                    parents, offsets = parents[inside], offsets[inside]
+                    free = (occupancy[parents, words[offsets]] & bits[offsets]) == 0
+                    parents, offsets = parents[free], offsets[free] + delta
+                    if len(parents):
+                        children = layer[parents]
+                        children[:, index] = offsets
+                        child_blocks.append(children)
+                        parent_blocks.append(parents)
+                    if not slide:
+                        break
+        if not child_blocks:
+            return layer[:0], rows[:0]
+        return np.concatenate(child_blocks), np.concatenate(parent_blocks)
+
+def sorted_contains(sorted_keys, keys):
+    """Whether each key is in an array of sorted keys."""
+    if not len(sorted_keys):
+        return np.zeros(len(keys), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[positions] == keys
+
+# Layered BFS solver (same result as bfs_solver: fewest moves)
+# moves, slide_cost: action model, see create_initial_state
+# Statistics (metrics, see METRICS): a layer counts as expanded at once, so
+# phases are 'generate' (moves) and 'hashing' (keys and deduplication), and
+# progress is reported once per layer.
+def layer_bfs_solver(game_map, moves='step', slide_cost='length', metrics='counters', progress=None):
+    if np is None:
+        raise ImportError("backend='numpy' needs numpy")
+    if moves not in ('step', 'slide'):
+        raise ValueError(f"Unknown action model: {moves}")
+    stats = solvers.SearchStats(metrics, progress)
+    stats.start()
+    timed = stats.timed
+    spec = solvers.get_puzzle_spec(game_map)
+    encoding = LayerEncoding(spec)
+    boat = spec.boat_index
+
+    layer = np.frombuffer(spec.initial_offsets, dtype=np.uint8).reshape(1, -1).copy()
+    keys = encoding.keys(layer)
+    previous_keys = keys[:0]
+    # (rows, parent indices in the previous layer) of every layer
+    layers = [(layer, None)]
+    goal_index = 0 if encoding.goal_offsets[layer[0, boat]] else None
+    while goal_index is None and len(layer):
+        if timed:
+            lap = solvers.time.perf_counter()
+        children, parents = encoding.children(layer, moves == 'slide')
+        stats.expanded += len(layer)
+        stats.generated += len(children)
+        if timed:
+            lap = stats.lap('generate', lap)
+
+        child_keys = encoding.keys(children)
+        child_keys, first = np.unique(child_keys, return_index=True)
+        new = ~(sorted_contains(keys, child_keys) | sorted_contains(previous_keys, child_keys))
+        child_keys, first = child_keys[new], first[new]
+        stats.duplicates += len(children) - len(first)
+        layer, parents = children[first], parents[first]
+        previous_keys, keys = keys, child_keys
+        layers.append((layer, parents))
+        stats.closed_size += len(layer)
+        stats.peak_frontier = max(stats.peak_frontier, len(layer))
+        if timed:
+            stats.lap('hashing', lap)
+        if stats.reporting:
+            stats.report(len(layer))
+
+        goals = np.flatnonzero(encoding.goal_offsets[layer[:, boat]])
+        if len(goals):
+            goal_index = goals[0]
+
+    solution_steps = []
+    if goal_index is not None:
+        offsets_path = []
+        for rows, parents in reversed(layers[:len(layers)]):
+            offsets_path.append(rows[goal_index].tobytes())
+            if parents is not None:
+                goal_index = parents[goal_index]
+        offsets_path.reverse()
+        solution_steps = solvers.path_from_offsets(spec, offsets_path, moves == 'slide' and slide_cost == 'unit')
+    stats.stop()
+    return stats.result(solution_steps)
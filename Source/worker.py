@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import time
+import cache
+import retrograde
+import solvers
+from solution import Solution
+
+# Solving in a separate process (GUI, algorithm portfolio): the search does not
+# share the GIL with the caller, and cancelling it kills the process at once.
+# The worker uses the 'spawn' start method on every platform (forking a process
+# that runs pygame/SDL threads is unsafe) and only imports solvers and cache.
+# Workers are not daemonic so that they can start workers of their own (the
+# 'PORTFOLIO' algorithm); a worker whose parent died exits at its next progress
+# report instead, so killing a portfolio also stops the searches it started.
+# Messages sent by the worker through a pipe:
+#   ('progress', {'expanded', 'frontier', 'elapsed', 'rate'})   every PROGRESS_PERIOD seconds
+#   ('solution', {'moves', 'bound', 'expanded', 'elapsed'})      each better solution ('ARA*')
+#   ('done', {'moves', 'expanded_nodes', 'search_time', 'peak_memory', 'stats'})
+#   ('error', message)
+# The solution comes back as moves (see solvers.extract_moves), much cheaper
+# than pickling a State path, and result.solution_steps is a solution.Solution.
+# Solves go through the solution cache (cache.cached_solve) unless use_cache is
+# False (measurements: a cached result is a lookup, not a search).
+# TableWorker builds a retrograde distance table the same way (GUI hints): its
+# progress counts the states handled, and 'done' carries no payload, the table
+# being loaded from its cache files by the caller.
+PROGRESS_PERIOD = 0.1
+
+def _run(connection, game_map, algorithm, use_cache, options):
+    """Entry point of the worker process."""
+    last_report = 0.0
+    parent_pid = os.getppid()
+
+    def progress(stats, frontier_size):
+        nonlocal last_report
+        if os.getppid() != parent_pid:
+            os._exit(1)
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_PERIOD:
+            last_report = now
+            elapsed = stats.elapsed()
+            connection.send(('progress', {
+                'expanded': stats.expanded,
+                'frontier': frontier_size,
+                'elapsed': elapsed,
+                'rate': stats.expanded / elapsed if elapsed else 0,
+            }))
+
+    def on_solution(result, bound):
+        connection.send(('solution', {
+            'moves': solvers.extract_moves(result.solution_steps),
+            'bound': bound,
+            'expanded': result.expanded_nodes,
+            'elapsed': result.search_time,
+        }))
+
+    try:
+        solve = cache.cached_solve if use_cache else solvers.solve
+        result = solve(game_map, algorithm, progress=progress, on_solution=on_solution, **options)
+        if result is None:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        connection.send(('done', {
+            'moves': solvers.extract_moves(result.solution_steps) if result.solution_steps else None,
+            'expanded_nodes': result.expanded_nodes,
+            'search_time': result.search_time,
+            'peak_memory': result.peak_memory,
+            'stats': result.stats.as_dict(),
+        }))
+    except Exception as error:
+        connection.send(('error', f"{type(error).__name__}: {error}"))
+    finally:
+        connection.close()
+
+def _build_table(connection, game_map, moves, slide_cost):
+    """Entry point of a TableWorker process."""
+    last_report = 0.0
+    start_time = time.perf_counter()
+    parent_pid = os.getppid()
+
+    def progress(states, frontier_size):
+        nonlocal last_report
+        if os.getppid() != parent_pid:
+            os._exit(1)
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_PERIOD:
+            last_report = now
+            elapsed = now - start_time
+            connection.send(('progress', {
+                'expanded': states,
+                'frontier': frontier_size,
+                'elapsed': elapsed,
+                'rate': states / elapsed if elapsed else 0,
+            }))
+
+    try:
+        retrograde.DistanceTable(game_map, moves, slide_cost, progress=progress).close()
+        connection.send(('done', None))
+    except Exception as error:
+        connection.send(('error', f"{type(error).__name__}: {error}"))
+    finally:
+        connection.close()
+
+class SolveWorker:
+    """One solve running in a worker process; poll() it from the UI loop."""
+
+    def __init__(self, game_map, algorithm, use_cache=True, **options):
+        self.game_map = game_map
+        self.options = options
+        self.progress = None  # last progress message
+        self.solution = None  # (Solution, bound) of the best solution so far of an anytime search
+        self.result = None    # SearchResult once done
+        self.error = None
+        self.finished = False
+        self._start(_run, (game_map, algorithm, use_cache, options))
+
+    def _start(self, target, args):
+        context = multiprocessing.get_context('spawn')
+        self.connection, child_connection = context.Pipe(duplex=False)
+        self.process = context.Process(target=target, args=(child_connection,) + args)
+        self.process.start()
+        child_connection.close()
+
+    def poll(self):
+        """Read the pending messages without blocking; return True once the solve is over."""
+        if self.finished:
+            return True
+        try:
+            while self.connection.poll():
+                kind, payload = self.connection.recv()
+                if kind == 'progress':
+                    self.progress = payload
+                elif kind == 'solution':
+                    self.solution = (self._solution(payload['moves']), payload['bound'])
+                elif kind == 'done':
+                    self._finish(payload)
+                    return True
+                else:
+                    self.error = payload
+                    self._close()
+                    return True
+        except EOFError:
+            self.error = "Solver process exited unexpectedly"
+            self._close()
+            return True
+        return False
+
+    def cancel(self):
+        """Kill the search."""
+        if not self.finished:
+            self.process.kill()
+            self._close()
+
+    def _solution(self, moves):
+        unit_cost = self.options.get('moves') == 'slide' and self.options.get('slide_cost') == 'unit'
+        return Solution(self.game_map, moves, unit_cost)
+
+    def _finish(self, payload):
+        solution_steps = []
+        if payload['moves'] is not None:
+            solution_steps = self._solution(payload['moves'])
+        self.result = solvers.SearchResult(solution_steps, payload['expanded_nodes'], payload['search_time'], payload['peak_memory'])
+        self.result.stats = solvers.SearchStats.from_dict(payload['stats'])
+        self._close()
+
+    def _close(self):
+        self.finished = True
+        self.connection.close()
+        self.process.join()
+
+class TableWorker(SolveWorker):
+    """Retrograde distance table of a map built in a worker process; poll() it from the UI loop."""
+
+    def __init__(self, game_map, moves='step', slide_cost='length'):
+        self.game_map = game_map
+        self.options = {'moves': moves, 'slide_cost': slide_cost}
+        self.progress = None  # last progress message
+        self.solution = None
+        self.result = None    # retrograde.DistanceTable once built
+        self.error = None
+        self.finished = False
+        self._start(_build_table, (game_map, moves, slide_cost))
+
+    def _finish(self, payload):
+        self.result = retrograde.get_distance_table(self.game_map, **self.options)
+        self._close()